@@ -0,0 +1,268 @@
+# Almacén local de Search Analytics por día, con sincronización incremental
+
+import asyncio
+import json
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from response_cache import is_settled
+
+
+def _days_between(start_date: str, end_date: str) -> List[str]:
+    try:
+        start = datetime.strptime(start_date, "%Y-%m-%d").date()
+        end = datetime.strptime(end_date, "%Y-%m-%d").date()
+    except ValueError:
+        raise ValueError("Las fechas deben estar en formato YYYY-MM-DD")
+    if start > end:
+        raise ValueError("La fecha de inicio no puede ser posterior a la fecha de fin")
+    return [(start + timedelta(days=i)).isoformat() for i in range((end - start).days + 1)]
+
+
+class AnalyticsStore:
+    """
+    Almacén SQLite con las filas de Search Analytics de cada propiedad desglosadas
+    por día. Cada conjunto de filas se identifica por sitio, tipo de búsqueda y
+    dimensiones sincronizadas (por ejemplo "query,page").
+    """
+
+    def __init__(self, path: Path):
+        """
+        Args:
+            path: Ruta al fichero SQLite del almacén
+        """
+        self.path = Path(path).expanduser()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), timeout=10, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS sa_rows (
+                site_url TEXT NOT NULL,
+                search_type TEXT NOT NULL,
+                dimensions TEXT NOT NULL,
+                date TEXT NOT NULL,
+                keys TEXT NOT NULL,
+                clicks INTEGER NOT NULL,
+                impressions INTEGER NOT NULL,
+                position REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS sa_rows_lookup
+                ON sa_rows (site_url, search_type, dimensions, date);
+            CREATE TABLE IF NOT EXISTS sa_days (
+                site_url TEXT NOT NULL,
+                search_type TEXT NOT NULL,
+                dimensions TEXT NOT NULL,
+                date TEXT NOT NULL,
+                settled INTEGER NOT NULL,
+                row_count INTEGER NOT NULL,
+                synced_at REAL NOT NULL,
+                PRIMARY KEY (site_url, search_type, dimensions, date)
+            );
+            """
+        )
+        self._conn.commit()
+
+    @staticmethod
+    def _dimensions_key(dimensions: Optional[List[str]]) -> str:
+        return ",".join(d for d in (dimensions or []) if d != "date")
+
+    def days_to_sync(
+        self,
+        site_url: str,
+        start_date: str,
+        end_date: str,
+        dimensions: Optional[List[str]] = None,
+        search_type: Optional[str] = None,
+    ) -> List[str]:
+        """
+        Días del rango que faltan en el almacén o que se guardaron antes de ser definitivos.
+        """
+        days = _days_between(start_date, end_date)
+        with self._lock:
+            settled = {
+                row[0]
+                for row in self._conn.execute(
+                    "SELECT date FROM sa_days WHERE site_url = ? AND search_type = ? "
+                    "AND dimensions = ? AND date BETWEEN ? AND ? AND settled = 1",
+                    (site_url, search_type or "web", self._dimensions_key(dimensions), start_date, end_date),
+                )
+            }
+        return [day for day in days if day not in settled]
+
+    def covers(
+        self,
+        site_url: str,
+        start_date: str,
+        end_date: str,
+        dimensions: Optional[List[str]] = None,
+        search_type: Optional[str] = None,
+    ) -> bool:
+        """
+        Indica si todos los días del rango están en el almacén (definitivos o no).
+        """
+        days = _days_between(start_date, end_date)
+        with self._lock:
+            stored = self._conn.execute(
+                "SELECT COUNT(*) FROM sa_days WHERE site_url = ? AND search_type = ? "
+                "AND dimensions = ? AND date BETWEEN ? AND ?",
+                (site_url, search_type or "web", self._dimensions_key(dimensions), start_date, end_date),
+            ).fetchone()[0]
+        return stored == len(days)
+
+    def replace_day(
+        self,
+        site_url: str,
+        day: str,
+        rows: List[Dict[str, Any]],
+        dimensions: Optional[List[str]] = None,
+        search_type: Optional[str] = None,
+    ) -> None:
+        """
+        Sustituye las filas guardadas de un día por las filas formateadas recibidas.
+        """
+        dims_key = self._dimensions_key(dimensions)
+        dims = dims_key.split(",") if dims_key else []
+        search_type = search_type or "web"
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM sa_rows WHERE site_url = ? AND search_type = ? AND dimensions = ? AND date = ?",
+                (site_url, search_type, dims_key, day),
+            )
+            self._conn.executemany(
+                "INSERT INTO sa_rows (site_url, search_type, dimensions, date, keys, clicks, impressions, position) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    (
+                        site_url, search_type, dims_key, day,
+                        json.dumps([row.get(dim) for dim in dims], ensure_ascii=False),
+                        row.get("clicks", 0), row.get("impressions", 0), row.get("position", 0.0),
+                    )
+                    for row in rows
+                ),
+            )
+            self._conn.execute(
+                "INSERT OR REPLACE INTO sa_days (site_url, search_type, dimensions, date, settled, row_count, synced_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (site_url, search_type, dims_key, day, int(is_settled(day)), len(rows), time.time()),
+            )
+            self._conn.commit()
+
+    async def sync(
+        self,
+        client,
+        site_url: str,
+        start_date: str,
+        end_date: str,
+        dimensions: Optional[List[str]] = None,
+        search_type: Optional[str] = None,
+        concurrency: int = 4,
+        page_concurrency: int = 1,
+    ) -> Dict[str, Any]:
+        """
+        Descarga solo los días que faltan o que aún no eran definitivos y los guarda.
+
+        Args:
+            client: GSCClient con el que consultar la API
+            site_url: URL del sitio a sincronizar
+            start_date: Fecha de inicio (YYYY-MM-DD)
+            end_date: Fecha de fin (YYYY-MM-DD)
+            dimensions: Dimensiones que se guardan por día
+            search_type: Tipo de búsqueda (web, image, video, discover, googleNews)
+            concurrency: Días que se descargan a la vez
+            page_concurrency: Páginas que se piden a la vez dentro de cada día
+
+        Returns:
+            Dict[str, Any]: Resumen con los días y filas sincronizados
+        """
+        # Las lecturas y escrituras de SQLite no corren en el event loop
+        days = await asyncio.to_thread(
+            self.days_to_sync, site_url, start_date, end_date, dimensions, search_type
+        )
+        semaphore = asyncio.Semaphore(max(1, concurrency))
+        total_rows = 0
+
+        async def sync_day(day: str) -> None:
+            nonlocal total_rows
+            async with semaphore:
+                result = await client.get_search_analytics(
+                    site_url=site_url,
+                    start_date=day,
+                    end_date=day,
+                    dimensions=[d for d in (dimensions or []) if d != "date"] or None,
+                    search_type=search_type,
+                    row_limit=client.SHARD_ROW_LIMIT,
+                    fetch_all=True,
+                    page_concurrency=page_concurrency,
+                    compact=True,
+                )
+            await asyncio.to_thread(self.replace_day, site_url, day, result["rows"], dimensions, search_type)
+            total_rows += len(result["rows"])
+
+        await asyncio.gather(*(sync_day(day) for day in days))
+        return {
+            "siteUrl": site_url,
+            "dimensions": self._dimensions_key(dimensions),
+            "searchType": search_type or "web",
+            "daysSynced": len(days),
+            "rowsSynced": total_rows,
+        }
+
+    def query(
+        self,
+        site_url: str,
+        start_date: str,
+        end_date: str,
+        dimensions: Optional[List[str]] = None,
+        search_type: Optional[str] = None,
+        row_limit: Optional[int] = None,
+    ) -> Dict[str, Any]:
+        """
+        Consulta un rango desde el almacén con el mismo formato que
+        GSCClient.get_search_analytics. Las dimensiones deben coincidir con las
+        sincronizadas; se puede añadir `date` para obtener el desglose diario.
+
+        Returns:
+            Dict[str, Any]: Filas agregadas, ordenadas por clics descendentes
+        """
+        dimensions = list(dimensions or [])
+        dims_key = self._dimensions_key(dimensions)
+        stored_dims = dims_key.split(",") if dims_key else []
+        by_date = "date" in dimensions
+        group_by = "date, keys" if by_date else "keys"
+        sql = (
+            f"SELECT {group_by}, SUM(clicks), SUM(impressions), SUM(position * impressions) "
+            "FROM sa_rows WHERE site_url = ? AND search_type = ? AND dimensions = ? "
+            f"AND date BETWEEN ? AND ? GROUP BY {group_by} ORDER BY SUM(clicks) DESC, SUM(impressions) DESC"
+        )
+        params: List[Any] = [site_url, search_type or "web", dims_key, start_date, end_date]
+        if row_limit:
+            sql += " LIMIT ?"
+            params.append(row_limit)
+
+        rows = []
+        with self._lock:
+            for record in self._conn.execute(sql, params):
+                day = record[0] if by_date else None
+                keys, clicks, impressions, weighted_position = record[1:] if by_date else record
+                values = dict(zip(stored_dims, json.loads(keys)))
+                row = {dim: (day if dim == "date" else values.get(dim)) for dim in dimensions}
+                row["clicks"] = clicks
+                row["impressions"] = impressions
+                row["ctr"] = clicks / impressions if impressions else 0.0
+                row["position"] = weighted_position / impressions if impressions else 0.0
+                rows.append(row)
+        return {
+            "rows": rows,
+            "responseAggregationType": "",
+            "source": "store",
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
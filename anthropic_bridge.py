@@ -3,14 +3,20 @@
 Puente entre Anthropic (Claude) y Google Search Console CLI
 """
 import os
-import subprocess
+import asyncio
 import json
 import sys
 import re
-from datetime import datetime, timedelta
 from dotenv import load_dotenv
 import anthropic
 
+import context_builder
+import gsc_cli
+import intent_router
+from config import Config
+from gsc_client import GSCClient
+from site_inventory import SiteInventory
+
 load_dotenv(override=True)
 
 ANTHROPIC_API_KEY = os.getenv("ANTHROPIC_API_KEY")
@@ -18,7 +24,89 @@ if not ANTHROPIC_API_KEY:
     print("No se encontró ANTHROPIC_API_KEY en el entorno.", file=sys.stderr)
     sys.exit(1)
 
-client = anthropic.Anthropic(api_key=ANTHROPIC_API_KEY)
+client = anthropic.AsyncAnthropic(api_key=ANTHROPIC_API_KEY)
+
+# Cliente de GSC de larga duración: se crea una sola vez y se reutiliza en
+# todas las preguntas, en lugar de lanzar gsc_cli.py cada vez.
+_gsc_config = None
+_gsc_client = None
+_inventory = None
+# Consultas lanzadas de forma especulativa mientras Claude genera el comando
+_prefetched = {}
+
+def get_gsc_client():
+    global _gsc_config, _gsc_client
+    if _gsc_client is None:
+        _gsc_config = Config()
+        if not _gsc_config.has_backend:
+            raise RuntimeError("No se encontró el archivo de credenciales de Google.")
+        _gsc_client = GSCClient.from_config(_gsc_config)
+    return _gsc_client
+
+def get_site_inventory():
+    global _inventory
+    if _inventory is None:
+        client_gsc = get_gsc_client()
+        _inventory = SiteInventory(
+            client_gsc,
+            ttl=_gsc_config.sites_ttl,
+            snapshot_path=_gsc_config.sites_snapshot_path,
+        )
+    return _inventory
+
+def close_gsc_client():
+    global _gsc_client
+    if _gsc_client is not None:
+        _gsc_client.close()
+        _gsc_client = None
+
+async def ainput(prompt=""):
+    """input() sin bloquear el event loop (las tareas en segundo plano siguen avanzando)."""
+    return await asyncio.to_thread(input, prompt)
+
+async def stream_message(**kwargs):
+    """Pide una respuesta a Claude y la imprime token a token según llega."""
+    partes = []
+    async with client.messages.stream(**kwargs) as stream:
+        async for texto in stream.text_stream:
+            print(texto, end="", flush=True)
+            partes.append(texto)
+    print()
+    return "".join(partes).strip()
+
+def _clave_comando(args):
+    """
+    Clave hashable de un comando ya interpretado, independiente del orden de los
+    flags. Se serializa a JSON porque algunos valores son listas (por ejemplo
+    los dicts de --filter).
+    """
+    opciones = {k: v for k, v in vars(args).items() if k != "func"}
+    return json.dumps(opciones, sort_keys=True, default=str)
+
+def prefetch(command):
+    """
+    Lanza en segundo plano un comando que probablemente se va a pedir, para
+    solapar la consulta a GSC con la llamada a Claude. call_cli reutiliza el
+    resultado si el comando final coincide.
+    """
+    try:
+        args = gsc_cli.build_parser().parse_args(command.split())
+    except SystemExit:
+        return
+    clave = _clave_comando(args)
+    if clave not in _prefetched:
+        _prefetched[clave] = asyncio.create_task(
+            gsc_cli.run_command(get_gsc_client(), args, _gsc_config)
+        )
+
+def cancel_prefetch():
+    """Descarta las consultas especulativas que no se llegaron a usar."""
+    for tarea in _prefetched.values():
+        if tarea.done() and not tarea.cancelled():
+            # Marcar el error como recogido para que asyncio no lo avise al salir
+            tarea.exception()
+        tarea.cancel()
+    _prefetched.clear()
 
 # Instrucción para el LLM: sugiere comandos CLI si es necesario
 def build_system_prompt():
@@ -36,14 +124,18 @@ def build_system_prompt():
         "No expliques, solo responde con el comando CLI exacto."
     )
 
-def call_cli(command: str) -> str:
-    """Ejecuta el comando CLI y devuelve la salida."""
+async def call_cli(command: str, fechas=None) -> str:
+    """
+    Ejecuta el comando CLI y devuelve la salida. `fechas` es el rango pedido
+    por el usuario (start_date, end_date); si no se indica, se busca en el
+    propio comando y, en su defecto, se usan los últimos 6 meses.
+    """
     # Limpiar comillas dobles innecesarias en los argumentos
     cleaned_command = command.replace('"', '')
     # Detectar si falta --site-url o si el valor es solo un nombre de dominio
     if 'search-analytics' in cleaned_command:
         # Obtener lista de sitios del usuario
-        sites = get_user_sites()
+        sites = await get_user_sites()
         # Buscar --site-url o --site-url= en el comando
         m = re.search(r'--site-url[ =]([^ ]+)', cleaned_command)
         site_val = None
@@ -51,7 +143,7 @@ def call_cli(command: str) -> str:
             site_val = m.group(1)
             # Si solo es un nombre (sin punto), buscar coincidencia
             if '.' not in site_val:
-                matches = [s for s in sites if site_val in s]
+                matches = get_site_inventory().resolve(site_val)
                 if len(matches) == 1:
                     cleaned_command = cleaned_command.replace(site_val, matches[0])
                     site_val = matches[0]
@@ -60,12 +152,18 @@ def call_cli(command: str) -> str:
                 else:
                     return f"No se encontró ninguna propiedad que coincida con '{site_val}'."
             else:
+                # Si el dominio sugerido es otra forma de una propiedad (dominio,
+                # sc-domain:, sin www), usar esa propiedad
+                matches = get_site_inventory().resolve(site_val)
+                if site_val not in sites and len(matches) == 1:
+                    site_val = matches[0]
+                    cleaned_command = re.sub(r'--site-url[ =][^ ]+', f'--site-url {site_val}', cleaned_command)
                 # Si el dominio sugerido no está entre las propiedades, preguntar
                 if site_val not in sites:
                     props = '\n'.join(f"{i+1}. {s}" for i, s in enumerate(sites))
                     print(f"\nEl dominio sugerido ('{site_val}') no está entre tus propiedades. ¿Sobre cuál quieres consultar?\n{props}")
                     while True:
-                        sel = input("Elige el número de la propiedad: ").strip()
+                        sel = (await ainput("Elige el número de la propiedad: ")).strip()
                         if sel.isdigit() and 1 <= int(sel) <= len(sites):
                             site_val = sites[int(sel)-1]
                             # Reemplazar el site-url en el comando
@@ -81,7 +179,7 @@ def call_cli(command: str) -> str:
             props = '\n'.join(f"{i+1}. {s}" for i, s in enumerate(sites))
             print(f"\nTienes varias propiedades en Search Console. ¿Sobre cuál quieres consultar?\n{props}")
             while True:
-                sel = input("Elige el número de la propiedad: ").strip()
+                sel = (await ainput("Elige el número de la propiedad: ")).strip()
                 if sel.isdigit() and 1 <= int(sel) <= len(sites):
                     site_val = sites[int(sel)-1]
                     cleaned_command += f" --site-url {site_val}"
@@ -104,88 +202,71 @@ def call_cli(command: str) -> str:
                 print("No se detectó la URL de la página. La consulta se hará sobre todo el dominio.")
 
         # --- Manejo de fechas naturales y rangos ---
-        # SIEMPRE ignorar fechas sugeridas por Claude y calcularlas automáticamente
-        meses_match = re.search(r'ultim[oa]s? (\d+) mes', command, re.IGNORECASE)
-        rango_match = re.search(r'de ([a-zA-Z]+) (\d{4}) a ([a-zA-Z]+) (\d{4})', command, re.IGNORECASE)
-        fechas = None
-        if meses_match:
-            months = int(meses_match.group(1))
-            end_date = (datetime.today() - timedelta(days=2)).date()
-            start_date = (end_date - timedelta(days=months*30))
-            fechas = (start_date, end_date)
-        elif rango_match:
-            meses = {'enero':1,'febrero':2,'marzo':3,'abril':4,'mayo':5,'junio':6,'julio':7,'agosto':8,'septiembre':9,'octubre':10,'noviembre':11,'diciembre':12}
-            mes_ini = meses.get(rango_match.group(1).lower(), 1)
-            anio_ini = int(rango_match.group(2))
-            mes_fin = meses.get(rango_match.group(3).lower(), 12)
-            anio_fin = int(rango_match.group(4))
-            start_date = datetime(anio_ini, mes_ini, 1).date()
-            if mes_fin == 12:
-                end_date = datetime(anio_fin, 12, 31).date()
-            else:
-                end_date = (datetime(anio_fin, mes_fin+1, 1) - timedelta(days=1)).date()
-            # Ajustar end_date si es mayor que hoy-2
-            max_end = (datetime.today() - timedelta(days=2)).date()
-            if end_date > max_end:
-                end_date = max_end
-            fechas = (start_date, end_date)
-        else:
-            # Si no hay fechas, usar últimos 6 meses por defecto y delay de 2 días
-            end_date = (datetime.today() - timedelta(days=2)).date()
-            start_date = (end_date - timedelta(days=6*30))
-            fechas = (start_date, end_date)
+        # Ignorar las fechas sugeridas por Claude: se usan las que pidió el usuario
+        # o, si no hay, los últimos 6 meses con el retraso de 2 días de GSC
+        fechas = fechas or intent_router.parse_date_range(command) or intent_router.default_date_range()
         # Eliminar cualquier --start-date y --end-date del comando original
         cleaned_command = re.sub(r'--start-date[ =][^ ]+', '', cleaned_command)
         cleaned_command = re.sub(r'--end-date[ =][^ ]+', '', cleaned_command)
         # Añadir fechas calculadas
-        cleaned_command += f' --start-date {fechas[0].isoformat()} --end-date {fechas[1].isoformat()}'
-    args = [sys.executable, "gsc_cli.py"] + cleaned_command.strip().split()
+        cleaned_command += f' --start-date {fechas[0]} --end-date {fechas[1]}'
+    # El comando se interpreta con el parser de gsc_cli y se ejecuta en este proceso
+    try:
+        args = gsc_cli.build_parser().parse_args(cleaned_command.strip().split())
+    except SystemExit:
+        return f"Error ejecutando el comando: comando no válido: {cleaned_command.strip()}"
     try:
-        result = subprocess.run(args, capture_output=True, text=True, check=True)
-        return result.stdout
-    except subprocess.CalledProcessError as e:
-        return f"Error ejecutando el comando: {e.stderr}"
+        tarea = _prefetched.pop(_clave_comando(args), None)
+        if tarea is not None:
+            result = await tarea
+        else:
+            result = await gsc_cli.run_command(get_gsc_client(), args, _gsc_config)
+    except Exception as e:
+        return f"Error ejecutando el comando: {e}"
+    return json.dumps(result, indent=2, ensure_ascii=False)
 
-# Obtener lista de sitios del usuario usando el CLI
-def get_user_sites():
-    args = [sys.executable, "gsc_cli.py", "list-sites"]
+# Obtener lista de sitios del usuario desde el inventario (solo llama a la API si ha caducado)
+async def get_user_sites():
     try:
-        result = subprocess.run(args, capture_output=True, text=True, check=True)
-        data = json.loads(result.stdout)
-        return [s['siteUrl'] for s in data.get('sites', [])]
+        return await get_site_inventory().site_urls()
     except Exception:
         return []
 
 
-def main():
+async def main():
     print("¡Bienvenido! Escribe tu pregunta sobre Google Search Console (o 'salir' para terminar):")
     print("Puedes cambiar el modo de respuesta escribiendo: /modo texto, /modo json o /modo ambos\n")
     modo = "texto"  # Por defecto
     propiedad_actual = None
     ultimo_json = None
+    # Resultados interpretados de las dos últimas consultas, para resumirlos y compararlos
+    ultimo_resultado = None
+    resultado_anterior = None
     ultima_pregunta = None
     ultimo_rango = None  # (start_date, end_date)
-    sites = get_user_sites()
+    presupuesto = Config().context_token_budget
+    sites = await get_user_sites()
     while True:
+        cancel_prefetch()
         try:
             # Leer bytes y decodificar explícitamente para evitar UnicodeDecodeError
             print("Usuario: ", end="", flush=True)
-            user_input = sys.stdin.buffer.readline().decode("utf-8", errors="replace").strip()
+            linea = await asyncio.to_thread(sys.stdin.buffer.readline)
+            user_input = linea.decode("utf-8", errors="replace").strip()
         except Exception as e:
             print(f"\n[Error de entrada: {e}]")
             continue
         # Si el usuario menciona explícitamente un dominio, actualizar propiedad_actual
         propiedad_cambiada = False
-        for s in sites:
-            dominio_simple = s.replace('https://','').replace('http://','').replace('/','')
-            if dominio_simple in user_input or s in user_input or (s.startswith('sc-domain:') and s.replace('sc-domain:','') in user_input):
-                if propiedad_actual != s:
-                    propiedad_actual = s
-                    propiedad_cambiada = True
-                    ultimo_json = None
-                    ultimo_rango = None
-                    print(f"\nUsando la propiedad: {propiedad_actual}")
-                break
+        s = get_site_inventory().find_in_text(user_input)
+        if s and propiedad_actual != s:
+            propiedad_actual = s
+            propiedad_cambiada = True
+            ultimo_json = None
+            ultimo_resultado = None
+            resultado_anterior = None
+            ultimo_rango = None
+            print(f"\nUsando la propiedad: {propiedad_actual}")
         if user_input.lower() in ("salir", "exit", "quit"): break
         if user_input.lower().startswith("/modo"):
             nuevo_modo = user_input.lower().replace("/modo", "").strip()
@@ -207,54 +288,46 @@ def main():
             for idx, site in enumerate(sites):
                 print(f"  {idx+1}. {site}")
             while True:
-                seleccion = input("Selecciona el número de la propiedad a consultar o escribe el dominio: ").strip()
+                seleccion = (await ainput("Selecciona el número de la propiedad a consultar o escribe el dominio: ")).strip()
                 if seleccion.isdigit() and 1 <= int(seleccion) <= len(sites):
                     propiedad_actual = sites[int(seleccion)-1]
                     print(f"\nUsando la propiedad: {propiedad_actual}")
                     break
-                elif any(seleccion in s for s in sites):
-                    propiedad_actual = next(s for s in sites if seleccion in s)
+                elif coincidencias := get_site_inventory().resolve(seleccion):
+                    propiedad_actual = coincidencias[0]
                     print(f"\nUsando la propiedad: {propiedad_actual}")
                     break
                 else:
                     print("Dominio no válido. Intenta de nuevo.")
             contexto += f"La propiedad seleccionada es: {propiedad_actual}. "
-        response = client.messages.create(
-            model="claude-3-haiku-20240307",
-            max_tokens=100,
-            temperature=0,
-            system=build_system_prompt(),
-            messages=[{"role": "user", "content": contexto + user_input}]
-        )
-        content = response.content[0].text.strip()
 
         # 2. Detectar si la pregunta pide un rango de fechas diferente
-        def extraer_rango(pregunta):
-            meses_match = re.search(r'ultim[oa]s? (\d+) mes', pregunta, re.IGNORECASE)
-            rango_match = re.search(r'de ([a-zA-Z]+) (\d{4}) a ([a-zA-Z]+) (\d{4})', pregunta, re.IGNORECASE)
-            if meses_match:
-                months = int(meses_match.group(1))
-                end_date = (datetime.today() - timedelta(days=2)).date()
-                start_date = (end_date - timedelta(days=months*30))
-                return (start_date.isoformat(), end_date.isoformat())
-            elif rango_match:
-                meses = {'enero':1,'febrero':2,'marzo':3,'abril':4,'mayo':5,'junio':6,'julio':7,'agosto':8,'septiembre':9,'octubre':10,'noviembre':11,'diciembre':12}
-                mes_ini = meses.get(rango_match.group(1).lower(), 1)
-                anio_ini = int(rango_match.group(2))
-                mes_fin = meses.get(rango_match.group(3).lower(), 12)
-                anio_fin = int(rango_match.group(4))
-                start_date = datetime(anio_ini, mes_ini, 1).date()
-                if mes_fin == 12:
-                    end_date = datetime(anio_fin, 12, 31).date()
-                else:
-                    end_date = (datetime(anio_fin, mes_fin+1, 1) - timedelta(days=1)).date()
-                max_end = (datetime.today() - timedelta(days=2)).date()
-                if end_date > max_end:
-                    end_date = max_end
-                return (start_date.isoformat(), end_date.isoformat())
-            return None
+        nuevo_rango = intent_router.parse_date_range(user_input)
 
-        nuevo_rango = extraer_rango(user_input)
+        # Las preguntas habituales ("top queries últimos 3 meses", "list sites")
+        # se traducen localmente; solo las ambiguas pasan por Claude.
+        intent = intent_router.route(user_input, propiedad_actual)
+        if intent:
+            content = intent_router.to_command(intent)
+        else:
+            # Mientras Claude genera el comando, refrescar el inventario si ha caducado
+            # y adelantar la consulta más probable (query,page en el rango pedido o
+            # en los últimos 6 meses) para la propiedad seleccionada.
+            inventario = asyncio.create_task(get_user_sites())
+            fechas = nuevo_rango or intent_router.default_date_range()
+            prefetch(
+                f"search-analytics --site-url {propiedad_actual} --dimensions query,page --type web "
+                f"--start-date {fechas[0]} --end-date {fechas[1]}"
+            )
+            response = await client.messages.create(
+                model="claude-3-haiku-20240307",
+                max_tokens=100,
+                temperature=0,
+                system=build_system_prompt(),
+                messages=[{"role": "user", "content": contexto + user_input}]
+            )
+            content = response.content[0].text.strip()
+            sites = await inventario or sites
 
         # 3. Si la respuesta es un comando CLI válido, ejecutarlo
         if content.startswith("list-sites") or content.startswith("search-analytics"):
@@ -268,7 +341,7 @@ def main():
                 else:
                     ejecutar = False if ultimo_json else True
             if ejecutar:
-                output = call_cli(content)
+                output = await call_cli(content, nuevo_rango)
                 # Si se seleccionó una propiedad, recordarla
                 m = re.search(r'--site-url[ =]([^ ]+)', content)
                 if m:
@@ -277,72 +350,56 @@ def main():
                 try:
                     parsed = json.loads(output)
                     ultimo_json = output
+                    resultado_anterior, ultimo_resultado = ultimo_resultado, parsed
                 except Exception:
                     ultimo_json = None
+                    ultimo_resultado = None
                 ultimo_rango = nuevo_rango
             # Por defecto, solo mostrar la explicación de Claude
             if modo == "json":
                 print(f"\nRespuesta CLI (JSON):\n{ultimo_json}")
             else:
-                # Filtrar el JSON para mostrar solo los 10 primeros resultados relevantes por defecto
-                resumen = ""
-                def limpiar_keys_recursivo(obj):
-                    if isinstance(obj, dict):
-                        return {k: limpiar_keys_recursivo(v) for k, v in obj.items() if k != 'keys'}
-                    elif isinstance(obj, list):
-                        return [limpiar_keys_recursivo(x) for x in obj]
-                    else:
-                        return obj
-                try:
-                    parsed = json.loads(ultimo_json) if ultimo_json else {}
-                    # Limpiar recursivamente todo el JSON de 'keys', incluso si no hay 'rows'
-                    parsed_limpio = limpiar_keys_recursivo(parsed)
-                    if isinstance(parsed_limpio, dict) and 'rows' in parsed_limpio and isinstance(parsed_limpio['rows'], list):
-                        filas_limpias = parsed_limpio['rows']
-                        total = len(filas_limpias)
-                        top = filas_limpias[:10]
-                        resumen_dict = dict(parsed_limpio)
-                        resumen_dict['rows'] = top
-                        resumen = json.dumps(resumen_dict, ensure_ascii=False, indent=2)
-                        if total > 10:
-                            print(f"\nSe han encontrado {total} resultados. Mostrando los 10 primeros.")
-                            ver_mas = input("¿Quieres ver todos los resultados? (s/n): ").strip().lower()
-                            if ver_mas == 's':
-                                resumen_dict['rows'] = filas_limpias
-                                resumen = json.dumps(resumen_dict, ensure_ascii=False, indent=2)
-                    else:
-                        resumen = json.dumps(parsed_limpio, ensure_ascii=False, indent=2) if parsed_limpio else ""
-                except Exception:
-                    resumen = ultimo_json if ultimo_json and len(ultimo_json) < 6000 else (ultimo_json[:6000] + "... (truncado)" if ultimo_json else "")
-                explicacion = ""
+                # Claude recibe un resumen calculado en local (totales, principales
+                # filas, canibalizaciones, variaciones), nunca todas las filas
+                filas = ultimo_resultado.get("rows") if isinstance(ultimo_resultado, dict) else None
+                if modo == "texto" and isinstance(filas, list) and len(filas) > 10:
+                    print(f"\nSe han encontrado {len(filas)} resultados. Claude recibirá un resumen.")
+                    ver_mas = (await ainput("¿Quieres ver todos los resultados? (s/n): ")).strip().lower()
+                    if ver_mas == 's':
+                        print(f"\nRespuesta CLI (JSON):\n{ultimo_json}")
+                resumen = context_builder.build_context(
+                    ultimo_resultado, presupuesto, previous=resultado_anterior
+                ) if ultimo_json else ""
+                if modo == "ambos":
+                    print(f"\nRespuesta CLI (JSON):\n{ultimo_json}\n\nExplicación de Claude:")
+                else:
+                    print()
                 try:
                     # Si la pregunta es de seguimiento, pasar el último JSON y la última pregunta
                     if ultima_pregunta and ultimo_json:
                         prompt_explica = (
                             f"Pregunta anterior: {ultima_pregunta}\n"
-                            f"Respuesta anterior (JSON): {resumen}\n"
+                            f"Resumen de la respuesta anterior (JSON): {resumen}\n"
                             f"Nueva pregunta: {user_input}\n"
                             "Responde SOLO sobre la propiedad seleccionada. Explica en español de forma clara y útil, resalta insights, tendencias, posibles canibalizaciones y responde a la intención del usuario. Si no hay datos, indícalo de forma amable."
                         )
                     else:
                         prompt_explica = (
                             "Eres un experto en Google Search Console. Explica en español de forma clara y útil el siguiente resultado JSON de una consulta, "
-                            "resalta insights, tendencias, posibles canibalizaciones y responde a la intención del usuario. Si no hay datos, indícalo de forma amable.\n\n" + resumen
+                            "resalta insights, tendencias, posibles canibalizaciones y responde a la intención del usuario. Si no hay datos, indícalo de forma amable.\n"
+                            "Los datos son un resumen calculado sobre todas las filas: totales, filas principales, totales por dimensión, "
+                            "canibalizaciones (consultas con varias páginas) y variaciones frente a la consulta anterior.\n\n" + resumen
                         )
-                    r2 = client.messages.create(
+                    # La explicación se muestra en streaming según la genera Claude
+                    await stream_message(
                         model="claude-opus-4-1-20250805",
                         max_tokens=8192,
                         temperature=0,
                         system="",
                         messages=[{"role": "user", "content": prompt_explica}]
                     )
-                    explicacion = r2.content[0].text.strip()
                 except Exception as e:
-                    explicacion = f"No se pudo obtener explicación: {e}"
-                if modo == "ambos":
-                    print(f"\nRespuesta CLI (JSON):\n{ultimo_json}\n\nExplicación de Claude:\n{explicacion}")
-                else:
-                    print(f"\n{explicacion}")
+                    print(f"No se pudo obtener explicación: {e}")
             ultima_pregunta = user_input
         else:
             # Si la pregunta es de seguimiento y hay contexto, pasar el último JSON y la propiedad
@@ -350,11 +407,12 @@ def main():
                 x in user_input.lower() for x in ["solo lista", "solo urls", "sin explicación", "no expliques", "solo dame la lista", "únicamente listalas", "solo listalas", "solo los enlaces", "solo los links"]
             )
             if ultimo_json and propiedad_actual:
+                resumen = context_builder.build_context(ultimo_resultado, presupuesto)
                 if solo_lista:
                     prompt_explica = (
                         f"Propiedad: {propiedad_actual}\n"
                         f"Pregunta anterior: {ultima_pregunta}\n"
-                        f"Respuesta anterior (JSON): {ultimo_json}\n"
+                        f"Resumen de la respuesta anterior (JSON): {resumen}\n"
                         f"Nueva pregunta: {user_input}\n"
                         "Devuelve SOLO una lista de las URLs solicitadas, una por línea, sin explicación, sin contexto, sin insights, sin ningún texto adicional. No añadas títulos, ni comentarios, ni resúmenes. Solo la lista de URLs, nada más."
                     )
@@ -362,7 +420,7 @@ def main():
                     prompt_explica = (
                         f"Propiedad: {propiedad_actual}\n"
                         f"Pregunta anterior: {ultima_pregunta}\n"
-                        f"Respuesta anterior (JSON): {ultimo_json}\n"
+                        f"Resumen de la respuesta anterior (JSON): {resumen}\n"
                         f"Nueva pregunta: {user_input}\n"
                         "Eres un experto en Search Console y SEO conversacional.\n"
                         "Siempre responde con listas, comparativas y resúmenes claros.\n"
@@ -372,15 +430,14 @@ def main():
                         "Si no hay datos, indícalo de forma amable.\n"
                         "Si la pregunta es general, responde como un chat experto, no con respuestas predeterminadas."
                     )
-                r2 = client.messages.create(
+                print()
+                await stream_message(
                     model="claude-3-haiku-20240307",
                     max_tokens=500,
                     temperature=0,
                     system="",
                     messages=[{"role": "user", "content": prompt_explica}]
                 )
-                explicacion = r2.content[0].text.strip()
-                print(f"\n{explicacion}")
             else:
                 # Si no hay contexto, responde como chat general
                 if solo_lista:
@@ -401,15 +458,17 @@ def main():
                         "Si no hay datos, indícalo de forma amable.\n"
                         "Si la pregunta es general, responde como un chat experto, no con respuestas predeterminadas."
                     )
-                r2 = client.messages.create(
+                print()
+                await stream_message(
                     model="claude-3-haiku-20240307",
                     max_tokens=500,
                     temperature=0,
                     system="",
                     messages=[{"role": "user", "content": prompt_chat}]
                 )
-                explicacion = r2.content[0].text.strip()
-                print(f"\n{explicacion}")
 
 if __name__ == "__main__":
-    main()
+    try:
+        asyncio.run(main())
+    finally:
+        close_gsc_client()
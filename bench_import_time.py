@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Benchmark del tiempo de arranque de gsc_cli y del servidor MCP (main.py).
+
+Importa cada módulo en un proceso nuevo con `python -X importtime`, se queda con
+el mejor de varios intentos y falla (código de salida 1) si supera su
+presupuesto o si carga alguna de las dependencias pesadas que solo deben
+importarse al ejecutar un comando.
+
+    python bench_import_time.py
+    python bench_import_time.py --runs 10 --budget gsc_cli=80
+"""
+import argparse
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent
+
+# Presupuesto en milisegundos del import de cada punto de entrada
+BUDGETS_MS = {
+    "gsc_cli": 120.0,
+    "main": 120.0,
+}
+
+# Paquetes que no deben cargarse solo por importar los puntos de entrada
+HEAVY_MODULES = ("googleapiclient", "google.oauth2", "google.auth", "httplib2", "pydantic", "mcp", "anthropic", "pyarrow")
+
+
+def measure(module: str):
+    """
+    Importa `module` en un proceso nuevo y devuelve (microsegundos acumulados,
+    módulos importados).
+    """
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+    )
+    if completed.returncode != 0:
+        raise RuntimeError(f"No se pudo importar {module}:\n{completed.stderr}")
+    total = None
+    imported = []
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|", 2)
+        if not cumulative.strip().isdigit():
+            # Cabecera de la tabla
+            continue
+        name = name.strip()
+        imported.append(name)
+        if name == module:
+            total = int(cumulative)
+    if total is None:
+        raise RuntimeError(f"-X importtime no informó del módulo {module}")
+    return total, imported
+
+
+def parse_budget(value: str):
+    module, _, budget = value.partition("=")
+    try:
+        return module, float(budget)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Presupuesto inválido {value}: usa MODULO=MS")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Tiempo de import de los puntos de entrada")
+    parser.add_argument("--runs", type=int, default=5, help="Intentos por módulo; se usa el mejor (default: 5)")
+    parser.add_argument("--budget", type=parse_budget, action="append", default=[], help="Presupuesto MODULO=MS (se puede repetir)")
+    args = parser.parse_args()
+
+    budgets = dict(BUDGETS_MS)
+    budgets.update(args.budget)
+
+    failures = []
+    for module, budget in budgets.items():
+        # El primer import compila los .pyc: no cuenta
+        measure(module)
+        best, imported = min(measure(module) for _ in range(max(1, args.runs)))
+        heavy = sorted({
+            name for name in imported
+            if any(name == pkg or name.startswith(pkg + ".") for pkg in HEAVY_MODULES)
+        })
+        elapsed_ms = best / 1000
+        status = "ok" if elapsed_ms <= budget and not heavy else "FALLA"
+        print(f"{module:<10} {elapsed_ms:8.1f} ms  (presupuesto {budget:.0f} ms)  {status}")
+        if elapsed_ms > budget:
+            failures.append(f"{module} tarda {elapsed_ms:.1f} ms en importarse (presupuesto {budget:.0f} ms)")
+        if heavy:
+            failures.append(f"{module} importa dependencias pesadas al arrancar: {', '.join(heavy[:10])}")
+
+    for failure in failures:
+        print(failure, file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
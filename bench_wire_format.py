@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Benchmark de los formatos de respuesta de las herramientas MCP (wire_format.py).
+
+Serializa un resultado sintético de Search Analytics en cada formato y muestra
+los bytes, los tokens aproximados (4 caracteres por token, como context_builder)
+y el tiempo de serialización, el mejor de varios intentos.
+
+    python bench_wire_format.py
+    python bench_wire_format.py --rows 100000 --dimensions query,page,country
+"""
+import argparse
+import random
+import time
+
+from compact_rows import SearchAnalyticsRows
+from context_builder import CHARS_PER_TOKEN
+from wire_format import RESPONSE_FORMATS, serialize
+
+# Valores de ejemplo de cada dimensión
+SAMPLES = {
+    "query": lambda i: f"comprar zapatillas running talla {i % 47} oferta {i}",
+    "page": lambda i: f"https://www.tusitio.com/categoria/producto-{i % 5000}/",
+    "country": lambda i: ("esp", "mex", "arg", "col", "usa")[i % 5],
+    "device": lambda i: ("MOBILE", "DESKTOP", "TABLET")[i % 3],
+    "date": lambda i: f"2025-05-{i % 28 + 1:02d}",
+}
+
+
+def sample_rows(count: int, dimensions: list, seed: int = 0) -> SearchAnalyticsRows:
+    """
+    Resultado compacto con `count` filas de métricas aleatorias.
+    """
+    rng = random.Random(seed)
+    rows = SearchAnalyticsRows(dimensions)
+    rows.extend_raw(
+        {
+            "keys": [SAMPLES[dim](i) for dim in dimensions],
+            "clicks": rng.randint(0, 500),
+            "impressions": rng.randint(1, 20000),
+            "ctr": rng.random() / 5,
+            "position": rng.uniform(1, 60),
+        }
+        for i in range(count)
+    )
+    return rows
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Bytes y tiempo de serialización de cada formato de respuesta")
+    parser.add_argument("--rows", type=int, default=25000, help="Filas del resultado (default: 25000, una página de la API)")
+    parser.add_argument("--dimensions", default="query,page", help="Dimensiones separadas por coma (default: query,page)")
+    parser.add_argument("--runs", type=int, default=3, help="Intentos por formato; se usa el mejor (default: 3)")
+    args = parser.parse_args()
+
+    dimensions = [dim.strip() for dim in args.dimensions.split(",") if dim.strip()]
+    unknown = [dim for dim in dimensions if dim not in SAMPLES]
+    if unknown:
+        parser.error(f"Dimensiones sin datos de ejemplo: {', '.join(unknown)}")
+    rows = sample_rows(args.rows, dimensions)
+    print(f"{args.rows} filas, dimensiones {','.join(dimensions) or '-'}")
+    print(f"{'formato':<10} {'bytes':>12} {'tokens~':>10} {'vs json':>8} {'ms':>9}")
+
+    baseline = None
+    for fmt in RESPONSE_FORMATS:
+        best = None
+        for _ in range(max(1, args.runs)):
+            started = time.perf_counter()
+            text = serialize(rows, fmt)
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+        size = len(text.encode("utf-8"))
+        baseline = baseline or size
+        print(
+            f"{fmt:<10} {size:>12,} {len(text) // CHARS_PER_TOKEN:>10,} "
+            f"{size / baseline:>7.0%} {best * 1000:>9.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+# Representación compacta (por columnas) de los resultados de Search Analytics
+
+import sys
+from array import array
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Union
+
+
+class SearchAnalyticsRows:
+    """
+    Resultado de Search Analytics guardado por columnas: una lista de strings
+    internados por dimensión y arrays tipados para las métricas. Evita crear un
+    dict por fila; las filas se convierten al formato JSON habitual solo al
+    iterar o al llamar a to_dict().
+    """
+
+    __slots__ = (
+        "dimensions",
+        "columns",
+        "clicks",
+        "impressions",
+        "ctr",
+        "position",
+        "response_aggregation_type",
+    )
+
+    def __init__(self, dimensions: Optional[List[str]] = None, response_aggregation_type: str = ""):
+        """
+        Args:
+            dimensions: Dimensiones de las filas, en el orden de la API
+            response_aggregation_type: Tipo de agregación devuelto por la API
+        """
+        self.dimensions = list(dimensions or [])
+        self.columns: Dict[str, List[Optional[str]]] = {dim: [] for dim in self.dimensions}
+        self.clicks = array("q")
+        self.impressions = array("q")
+        self.ctr = array("d")
+        self.position = array("d")
+        self.response_aggregation_type = response_aggregation_type
+
+    @classmethod
+    def from_rows(
+        cls,
+        rows: Iterable[Dict[str, Any]],
+        dimensions: Optional[List[str]] = None,
+        response_aggregation_type: str = "",
+    ) -> "SearchAnalyticsRows":
+        """
+        Construye el contenedor a partir de filas ya formateadas (dicts).
+        """
+        result = cls(dimensions, response_aggregation_type)
+        result.extend(rows)
+        return result
+
+    def extend_raw(self, rows: Iterable[Dict[str, Any]]) -> None:
+        """
+        Añade filas crudas de la API (con `keys`) sin crear dicts intermedios.
+        """
+        columns = [self.columns[dim] for dim in self.dimensions]
+        intern = sys.intern
+        for row in rows:
+            keys = row.get("keys", [])
+            for i, column in enumerate(columns):
+                column.append(intern(keys[i]) if i < len(keys) else None)
+            self.clicks.append(int(row.get("clicks", 0)))
+            self.impressions.append(int(row.get("impressions", 0)))
+            self.ctr.append(row.get("ctr", 0.0))
+            self.position.append(row.get("position", 0.0))
+
+    def extend(self, rows: Iterable[Dict[str, Any]]) -> None:
+        """
+        Añade filas ya formateadas (dicts con las dimensiones por nombre).
+        """
+        intern = sys.intern
+        for row in rows:
+            for dim in self.dimensions:
+                value = row.get(dim)
+                self.columns[dim].append(intern(value) if isinstance(value, str) else value)
+            self.clicks.append(int(row.get("clicks", 0)))
+            self.impressions.append(int(row.get("impressions", 0)))
+            self.ctr.append(row.get("ctr", 0.0))
+            self.position.append(row.get("position", 0.0))
+
+    def __len__(self) -> int:
+        return len(self.clicks)
+
+    def row(self, index: int) -> Dict[str, Any]:
+        """
+        Devuelve la fila `index` con el formato de _format_search_analytics.
+        """
+        formatted_row = {}
+        for dim in self.dimensions:
+            value = self.columns[dim][index]
+            if value is not None:
+                formatted_row[dim] = value
+        formatted_row["clicks"] = self.clicks[index]
+        formatted_row["impressions"] = self.impressions[index]
+        formatted_row["ctr"] = self.ctr[index]
+        formatted_row["position"] = self.position[index]
+        return formatted_row
+
+    def __getitem__(self, index: Union[int, slice, str]) -> Any:
+        # Compatibilidad con el dict de get_search_analytics: result["rows"]
+        if index == "rows":
+            return self
+        if index == "responseAggregationType":
+            return self.response_aggregation_type
+        if isinstance(index, str):
+            raise KeyError(index)
+        if isinstance(index, slice):
+            result = SearchAnalyticsRows(self.dimensions, self.response_aggregation_type)
+            for dim in self.dimensions:
+                result.columns[dim] = self.columns[dim][index]
+            result.clicks = self.clicks[index]
+            result.impressions = self.impressions[index]
+            result.ctr = self.ctr[index]
+            result.position = self.position[index]
+            return result
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("Índice de fila fuera de rango")
+        return self.row(index)
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        for index in range(len(self)):
+            yield self.row(index)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Convierte el resultado al formato JSON de GSCClient.get_search_analytics.
+        """
+        return {
+            "rows": list(self),
+            "responseAggregationType": self.response_aggregation_type,
+        }
@@ -7,11 +7,15 @@ from pathlib import Path
 from typing import Optional
 from dotenv import load_dotenv
 
-from pydantic import BaseModel, Field 
+from pydantic import BaseModel, Field, model_validator
 
 logger = logging.getLogger(__name__)
 load_dotenv(override=True)
 
+# Directorio de la caché, el almacén y la instantánea de propiedades en modo stub,
+# para que los datos falsos nunca se mezclen con los reales
+STUB_DATA_DIR = Path.home() / ".cache" / "mcp-gsc" / "stub"
+
 class Config(BaseModel):
     """
     Configuración de los MCP de Google Search Console
@@ -23,10 +27,154 @@ class Config(BaseModel):
     )
 
     server_port: int = Field(
-        default=8080,
-        description="Puerto en el que se ejecutará el servidor MCP (por defecto: 8080)",
+        default_factory=lambda: int(os.environ.get("GSC_SERVER_PORT", 8080)),
+        description="Puerto en el que escucha el servidor MCP con el transporte HTTP "
+        "(GSC_SERVER_PORT, por defecto: 8080)",
+    )
+
+    server_host: str = Field(
+        default_factory=lambda: os.environ.get("GSC_SERVER_HOST", "127.0.0.1"),
+        description="Interfaz en la que escucha el servidor MCP con el transporte HTTP "
+        "(GSC_SERVER_HOST, por defecto: 127.0.0.1)",
+    )
+
+    stub_gsc: bool = Field(
+        default_factory=lambda: os.environ.get("GSC_STUB", "0") in ("1", "true", "yes"),
+        description="Responder con el backend falso de stub_gsc.py en lugar de la API, "
+        "sin credenciales y con sus propios ficheros en STUB_DATA_DIR (GSC_STUB=1)",
+    )
+
+    max_workers: int = Field(
+        default_factory=lambda: int(os.environ.get("GSC_MAX_WORKERS", 8)),
+        description="Número máximo de llamadas simultáneas a la API de Search Console. "
+        "Se puede definir con la variable de entorno GSC_MAX_WORKERS (por defecto: 8)",
+    )
+
+    request_timeout: float = Field(
+        default_factory=lambda: float(os.environ.get("GSC_REQUEST_TIMEOUT", 60)),
+        description="Tiempo máximo en segundos de cada llamada a la API de Search Console. "
+        "Se puede definir con la variable de entorno GSC_REQUEST_TIMEOUT (por defecto: 60)",
+    )
+
+    page_concurrency: int = Field(
+        default_factory=lambda: int(os.environ.get("GSC_PAGE_CONCURRENCY", 4)),
+        description="Páginas de resultados que se piden a la vez al paginar con fetch_all. "
+        "Se puede definir con la variable de entorno GSC_PAGE_CONCURRENCY (por defecto: 4)",
+    )
+
+    shard_concurrency: int = Field(
+        default_factory=lambda: int(os.environ.get("GSC_SHARD_CONCURRENCY", 4)),
+        description="Fragmentos de fechas que se consultan a la vez en el modo completo. "
+        "Se puede definir con la variable de entorno GSC_SHARD_CONCURRENCY (por defecto: 4)",
+    )
+
+    site_concurrency: int = Field(
+        default_factory=lambda: int(os.environ.get("GSC_SITE_CONCURRENCY", 4)),
+        description="Propiedades que se consultan a la vez con --all-sites o --site-pattern. "
+        "Se puede definir con la variable de entorno GSC_SITE_CONCURRENCY (por defecto: 4)",
+    )
+
+    project_qpm: float = Field(
+        default_factory=lambda: float(os.environ.get("GSC_PROJECT_QPM", 40000)),
+        description="Peticiones por minuto del proyecto de Google Cloud a la API "
+        "(GSC_PROJECT_QPM, por defecto: 40000, la cuota estándar)",
+    )
+
+    site_qpm: float = Field(
+        default_factory=lambda: float(os.environ.get("GSC_SITE_QPM", 1200)),
+        description="Peticiones por minuto a cada propiedad "
+        "(GSC_SITE_QPM, por defecto: 1200, la cuota estándar)",
+    )
+
+    max_retries: int = Field(
+        default_factory=lambda: int(os.environ.get("GSC_MAX_RETRIES", 5)),
+        description="Reintentos con backoff exponencial ante errores 429/5xx o de cuota "
+        "(GSC_MAX_RETRIES, por defecto: 5)",
+    )
+
+    cache_enabled: bool = Field(
+        default_factory=lambda: os.environ.get("GSC_CACHE", "1") not in ("0", "false", "no"),
+        description="Guardar en disco las respuestas de Search Analytics. "
+        "Se puede desactivar con GSC_CACHE=0",
+    )
+
+    cache_path: str = Field(
+        default_factory=lambda: os.environ.get(
+            "GSC_CACHE_PATH", str(Path.home() / ".cache" / "mcp-gsc" / "responses.sqlite")
+        ),
+        description="Ruta al fichero SQLite de la caché de respuestas (GSC_CACHE_PATH)",
+    )
+
+    cache_max_bytes: int = Field(
+        default_factory=lambda: int(os.environ.get("GSC_CACHE_MAX_MB", 256)) * 1024 * 1024,
+        description="Tamaño máximo de la caché; al superarlo se eliminan las respuestas "
+        "menos usadas (GSC_CACHE_MAX_MB, por defecto: 256 MB)",
+    )
+
+    cache_fresh_ttl: float = Field(
+        default_factory=lambda: float(os.environ.get("GSC_CACHE_FRESH_TTL", 3600)),
+        description="Segundos de validez de las respuestas que incluyen días recientes, "
+        "aún no definitivos (GSC_CACHE_FRESH_TTL, por defecto: 3600)",
+    )
+
+    store_path: str = Field(
+        default_factory=lambda: os.environ.get(
+            "GSC_STORE_PATH", str(Path.home() / ".cache" / "mcp-gsc" / "analytics.sqlite")
+        ),
+        description="Ruta al almacén local con las filas sincronizadas por día (GSC_STORE_PATH)",
+    )
+
+    sites_ttl: float = Field(
+        default_factory=lambda: float(os.environ.get("GSC_SITES_TTL", 3600)),
+        description="Segundos durante los que se reutiliza la lista de propiedades "
+        "(GSC_SITES_TTL, por defecto: 3600)",
+    )
+
+    sites_snapshot_path: str = Field(
+        default_factory=lambda: os.environ.get(
+            "GSC_SITES_SNAPSHOT", str(Path.home() / ".cache" / "mcp-gsc" / "sites.json")
+        ),
+        description="Instantánea en disco de la lista de propiedades para arrancar sin "
+        "llamar a la API (GSC_SITES_SNAPSHOT)",
+    )
+
+    result_store_max_bytes: int = Field(
+        default_factory=lambda: int(os.environ.get("GSC_RESULT_STORE_MB", 256)) * 1024 * 1024,
+        description="Memoria máxima de los resultados que el servidor MCP guarda para "
+        "paginarlos (GSC_RESULT_STORE_MB, por defecto: 256 MB)",
+    )
+
+    result_ttl: float = Field(
+        default_factory=lambda: float(os.environ.get("GSC_RESULT_TTL", 3600)),
+        description="Segundos durante los que un cursor de resultados sigue siendo válido "
+        "(GSC_RESULT_TTL, por defecto: 3600)",
     )
 
+    context_token_budget: int = Field(
+        default_factory=lambda: int(os.environ.get("GSC_CONTEXT_TOKENS", 4000)),
+        description="Tokens aproximados de datos de GSC que se incluyen en cada prompt "
+        "del LLM (GSC_CONTEXT_TOKENS, por defecto: 4000)",
+    )
+
+    @model_validator(mode="after")
+    def _stub_paths(self) -> "Config":
+        """
+        En modo stub, la caché, el almacén local y la instantánea de propiedades
+        van a STUB_DATA_DIR en lugar de a sus rutas habituales.
+        """
+        if self.stub_gsc:
+            self.cache_path = str(STUB_DATA_DIR / "responses.sqlite")
+            self.store_path = str(STUB_DATA_DIR / "analytics.sqlite")
+            self.sites_snapshot_path = str(STUB_DATA_DIR / "sites.json")
+        return self
+
+    @property
+    def has_backend(self) -> bool:
+        """
+        Hay algo a lo que preguntar: el backend stub o un fichero de credenciales.
+        """
+        return self.stub_gsc or self.google_credentials is not None
+
     @property
     def google_credentials(self) -> Optional[Path]:
         """
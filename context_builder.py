@@ -0,0 +1,198 @@
+# Resúmenes compactos de resultados de Search Analytics para los prompts del LLM
+
+import heapq
+import json
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import seo_analysis
+
+METRICS = ("clicks", "impressions", "ctr", "position")
+
+# Aproximación habitual para texto mezclado (JSON, español, URLs)
+CHARS_PER_TOKEN = 4
+
+# Filas por sección que se prueban, de más a menos, hasta caber en el presupuesto
+SECTION_SIZES = (20, 10, 5, 3, 1)
+
+
+def row_dimensions(rows: List[Dict[str, Any]]) -> List[str]:
+    """
+    Dimensiones presentes en las filas formateadas (todas las claves salvo métricas).
+    """
+    if not rows:
+        return []
+    return [key for key in rows[0] if key not in METRICS and key != "keys"]
+
+
+def _round(row: Dict[str, Any]) -> Dict[str, Any]:
+    compact = {k: v for k, v in row.items() if k != "keys"}
+    if "ctr" in compact:
+        compact["ctr"] = round(compact["ctr"], 4)
+    if "position" in compact:
+        compact["position"] = round(compact["position"], 1)
+    return compact
+
+
+def _aggregate(rows: Iterable[Dict[str, Any]], key_fn) -> Dict[Any, List[float]]:
+    # clave -> [clicks, impressions, position * impressions]
+    groups: Dict[Any, List[float]] = {}
+    for row in rows:
+        key = key_fn(row)
+        impressions = row.get("impressions", 0)
+        group = groups.get(key)
+        if group is None:
+            group = groups[key] = [0, 0, 0.0]
+        group[0] += row.get("clicks", 0)
+        group[1] += impressions
+        group[2] += row.get("position", 0.0) * impressions
+    return groups
+
+
+def _metrics(clicks: float, impressions: float, weighted_position: float) -> Dict[str, Any]:
+    return {
+        "clicks": clicks,
+        "impressions": impressions,
+        "ctr": round(clicks / impressions, 4) if impressions else 0.0,
+        "position": round(weighted_position / impressions, 1) if impressions else 0.0,
+    }
+
+
+def totals(rows: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Totales del conjunto de filas (CTR y posición ponderados por impresiones).
+    """
+    group = _aggregate(rows, lambda row: None).get(None, [0, 0, 0.0])
+    return {"rows": len(rows), **_metrics(*group)}
+
+
+def dimension_totals(rows: List[Dict[str, Any]], dimension: str, top_n: int) -> List[Dict[str, Any]]:
+    """
+    Valores de una dimensión con sus métricas agregadas, los `top_n` con más clics.
+    """
+    groups = _aggregate(rows, lambda row: row.get(dimension))
+    ordered = heapq.nlargest(top_n, groups.items(), key=lambda item: (item[1][0], item[1][1]))
+    return [{dimension: value, **_metrics(*group)} for value, group in ordered]
+
+
+def deltas(
+    rows: List[Dict[str, Any]],
+    previous_rows: List[Dict[str, Any]],
+    dimensions: List[str],
+    top_n: int,
+) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Mayores subidas y bajadas de clics respecto a un resultado anterior con las
+    mismas dimensiones.
+    """
+    def key_fn(row):
+        return tuple(row.get(dim) for dim in dimensions)
+
+    current = _aggregate(rows, key_fn)
+    previous = _aggregate(previous_rows, key_fn)
+    changes = []
+    for key in current.keys() | previous.keys():
+        clicks_now = current.get(key, [0])[0]
+        clicks_before = previous.get(key, [0])[0]
+        if clicks_now != clicks_before:
+            changes.append((clicks_now - clicks_before, key, clicks_now, clicks_before))
+    changes.sort(key=lambda change: change[0])
+
+    def describe(change: Tuple) -> Dict[str, Any]:
+        delta, key, clicks_now, clicks_before = change
+        return {**dict(zip(dimensions, key)), "clicks": clicks_now, "previousClicks": clicks_before, "delta": delta}
+
+    return {
+        "gains": [describe(change) for change in reversed(changes[-top_n:]) if change[0] > 0],
+        "losses": [describe(change) for change in changes[:top_n] if change[0] < 0],
+    }
+
+
+def _sections(
+    rows: List[Dict[str, Any]],
+    dimensions: List[str],
+    previous_rows: Optional[List[Dict[str, Any]]],
+    top_n: int,
+) -> Dict[str, Any]:
+    # Todas las agregaciones se calculan una sola vez con el tamaño máximo;
+    # al ajustar el presupuesto solo se recortan las listas
+    sections: Dict[str, Any] = {"totals": totals(rows)}
+    sections["topByClicks"] = [
+        _round(row) for row in heapq.nlargest(top_n, rows, key=lambda row: row.get("clicks", 0))
+    ]
+    sections["topByImpressions"] = [
+        _round(row) for row in heapq.nlargest(top_n, rows, key=lambda row: row.get("impressions", 0))
+    ]
+    if len(dimensions) > 1:
+        sections["byDimension"] = {dim: dimension_totals(rows, dim, top_n) for dim in dimensions}
+    if sorted(dimensions) == ["page", "query"]:
+        analysis = seo_analysis.analyze(rows, top_n=top_n)
+        sections["cannibalization"] = [
+            {
+                "query": item["query"],
+                "impressions": item["impressions"],
+                "pages": [
+                    {"page": page["page"], "clicks": page["clicks"], "position": round(page["position"], 1)}
+                    for page in item["pages"]
+                ],
+            }
+            for item in analysis["cannibalization"]
+        ]
+        sections["opportunities"] = [
+            {key: item[key] for key in ("query", "page", "impressions", "position", "missedClicks")}
+            for item in analysis["opportunities"]
+        ]
+        for item in sections["opportunities"]:
+            item["position"] = round(item["position"], 1)
+    if previous_rows and row_dimensions(previous_rows) == dimensions:
+        sections["deltas"] = deltas(rows, previous_rows, dimensions, top_n)
+    return sections
+
+
+def _truncate(value: Any, top_n: int) -> Any:
+    if isinstance(value, list):
+        return value[:top_n]
+    if isinstance(value, dict):
+        return {key: _truncate(item, top_n) for key, item in value.items()}
+    return value
+
+
+def build_context(
+    result: Any,
+    token_budget: int = 4000,
+    previous: Any = None,
+) -> str:
+    """
+    Texto JSON que resume un resultado para un prompt, sin superar el presupuesto.
+
+    Con filas de Search Analytics se incluyen los totales, las filas principales por
+    clics e impresiones, los totales por dimensión, las posibles canibalizaciones y
+    oportunidades de CTR (con dimensiones query y page, ver seo_analysis) y las
+    variaciones frente al resultado anterior. Se reduce el número de filas por
+    sección hasta que el texto cabe en `token_budget`.
+
+    Args:
+        result: Resultado ya interpretado (dict con "rows" u otro JSON)
+        token_budget: Tokens máximos aproximados del texto devuelto
+        previous: Resultado anterior con el que calcular variaciones (opcional)
+
+    Returns:
+        str: Resumen en JSON
+    """
+    budget_chars = max(1, token_budget) * CHARS_PER_TOKEN
+    rows = result.get("rows") if isinstance(result, dict) else None
+    if not isinstance(rows, list):
+        text = json.dumps(result, ensure_ascii=False, separators=(",", ":"))
+        return text if len(text) <= budget_chars else text[:budget_chars] + "... (truncado)"
+
+    dimensions = row_dimensions(rows)
+    previous_rows = previous.get("rows") if isinstance(previous, dict) else None
+    if not isinstance(previous_rows, list):
+        previous_rows = None
+
+    sections = _sections(rows, dimensions, previous_rows, SECTION_SIZES[0])
+    text = ""
+    for top_n in SECTION_SIZES:
+        text = json.dumps(_truncate(sections, top_n), ensure_ascii=False, separators=(",", ":"))
+        if len(text) <= budget_chars:
+            return text
+    return text[:budget_chars] + "... (truncado)"
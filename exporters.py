@@ -0,0 +1,204 @@
+# Escritores de filas de Search Analytics: salida en streaming y ficheros columnares
+
+import csv
+import json
+import sys
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, TextIO, Union
+
+METRICS = ["clicks", "impressions", "ctr", "position"]
+
+
+class NDJSONWriter:
+    """
+    Escribe una fila JSON por línea.
+    """
+
+    def __init__(self, dimensions: List[str], stream: Optional[TextIO] = None):
+        self.dimensions = dimensions
+        self.stream = stream or sys.stdout
+
+    def write(self, rows: Iterable[Dict[str, Any]]) -> None:
+        self.stream.writelines(
+            json.dumps(row, ensure_ascii=False) + "\n" for row in rows
+        )
+        self.stream.flush()
+
+    def close(self) -> None:
+        self.stream.flush()
+
+
+class CSVWriter:
+    """
+    Escribe las filas como CSV con cabecera: dimensiones seguidas de las métricas.
+    """
+
+    def __init__(self, dimensions: List[str], stream: Optional[TextIO] = None):
+        self.dimensions = dimensions
+        self.stream = stream or sys.stdout
+        self.columns = [*dimensions, *METRICS]
+        self._writer = csv.writer(self.stream, lineterminator="\n")
+        self._writer.writerow(self.columns)
+
+    def write(self, rows: Iterable[Dict[str, Any]]) -> None:
+        columns = self.columns
+        self._writer.writerows([row.get(col) for col in columns] for row in rows)
+        self.stream.flush()
+
+    def close(self) -> None:
+        self.stream.flush()
+
+
+STREAM_FORMATS = {
+    "ndjson": NDJSONWriter,
+    "csv": CSVWriter,
+}
+
+
+def get_writer(fmt: str, dimensions: List[str], stream: Optional[TextIO] = None):
+    """
+    Devuelve el escritor para el formato indicado.
+
+    Args:
+        fmt: Formato de salida (ndjson, csv)
+        dimensions: Dimensiones de las filas, en orden
+        stream: Destino de la salida (por defecto: stdout)
+    """
+    if fmt not in STREAM_FORMATS:
+        raise ValueError(
+            f"Formato de salida inválido {fmt}. Debe ser uno de: {', '.join(STREAM_FORMATS)}"
+        )
+    return STREAM_FORMATS[fmt](dimensions, stream)
+
+
+def _import_pyarrow():
+    try:
+        import pyarrow
+    except ImportError:
+        raise RuntimeError(
+            "La exportación a Parquet/Arrow requiere pyarrow: uv pip install pyarrow"
+        )
+    return pyarrow
+
+
+class _ArrowBatchWriter:
+    """
+    Base de los escritores columnares: cada llamada a write() añade un lote
+    (record batch) con columnas tipadas. Las dimensiones se codifican como
+    diccionario de strings que crece entre lotes, y las métricas como
+    enteros (clicks, impressions) y flotantes (ctr, position).
+    """
+
+    def __init__(self, path: Union[str, Path], dimensions: List[str]):
+        self.pa = _import_pyarrow()
+        pa = self.pa
+        self.path = Path(path)
+        self.dimensions = dimensions
+        self.schema = pa.schema(
+            [pa.field(dim, pa.dictionary(pa.int32(), pa.string())) for dim in dimensions]
+            + [
+                pa.field("clicks", pa.int64()),
+                pa.field("impressions", pa.int64()),
+                pa.field("ctr", pa.float64()),
+                pa.field("position", pa.float64()),
+            ]
+        )
+        self._codes: Dict[str, Dict[str, int]] = {dim: {} for dim in dimensions}
+        self._dictionaries = {dim: pa.array([], pa.string()) for dim in dimensions}
+        self.rows_written = 0
+        self._writer = self._open()
+
+    def _open(self):
+        raise NotImplementedError
+
+    def _encode(self, dim: str, values: List[Optional[str]]):
+        pa = self.pa
+        codes = self._codes[dim]
+        new_values = []
+        indices = []
+        for value in values:
+            if value is None:
+                indices.append(None)
+                continue
+            code = codes.get(value)
+            if code is None:
+                code = codes[value] = len(codes)
+                new_values.append(value)
+            indices.append(code)
+        if new_values:
+            self._dictionaries[dim] = pa.concat_arrays(
+                [self._dictionaries[dim], pa.array(new_values, pa.string())]
+            )
+        return pa.DictionaryArray.from_arrays(
+            pa.array(indices, pa.int32()), self._dictionaries[dim]
+        )
+
+    def write(self, rows: Iterable[Dict[str, Any]]) -> None:
+        pa = self.pa
+        rows = rows if isinstance(rows, list) else list(rows)
+        if not rows:
+            return
+        arrays = [self._encode(dim, [row.get(dim) for row in rows]) for dim in self.dimensions]
+        arrays += [
+            pa.array([row.get("clicks", 0) for row in rows], pa.int64()),
+            pa.array([row.get("impressions", 0) for row in rows], pa.int64()),
+            pa.array([row.get("ctr", 0.0) for row in rows], pa.float64()),
+            pa.array([row.get("position", 0.0) for row in rows], pa.float64()),
+        ]
+        self._writer.write_batch(pa.RecordBatch.from_arrays(arrays, schema=self.schema))
+        self.rows_written += len(rows)
+
+    def close(self) -> None:
+        self._writer.close()
+
+
+class ParquetWriter(_ArrowBatchWriter):
+    """
+    Escribe las filas en un fichero Parquet, un grupo de filas por lote.
+    """
+
+    def _open(self):
+        import pyarrow.parquet as pq
+
+        return pq.ParquetWriter(str(self.path), self.schema, compression="zstd")
+
+
+class ArrowIPCWriter(_ArrowBatchWriter):
+    """
+    Escribe las filas en un fichero Arrow IPC (Feather v2).
+    """
+
+    def _open(self):
+        pa = self.pa
+        self._sink = pa.OSFile(str(self.path), "wb")
+        # Los diccionarios crecen entre lotes: se emiten solo los valores nuevos
+        options = pa.ipc.IpcWriteOptions(emit_dictionary_deltas=True)
+        return pa.ipc.new_file(self._sink, self.schema, options=options)
+
+    def close(self) -> None:
+        super().close()
+        self._sink.close()
+
+
+FILE_FORMATS = {
+    ".parquet": ParquetWriter,
+    ".arrow": ArrowIPCWriter,
+    ".feather": ArrowIPCWriter,
+    ".ipc": ArrowIPCWriter,
+}
+
+
+def get_file_writer(path: Union[str, Path], dimensions: List[str]):
+    """
+    Devuelve el escritor columnar según la extensión del fichero.
+
+    Args:
+        path: Fichero de salida (.parquet, .arrow, .feather o .ipc)
+        dimensions: Dimensiones de las filas, en orden
+    """
+    suffix = Path(path).suffix.lower()
+    if suffix not in FILE_FORMATS:
+        raise ValueError(
+            f"Extensión de salida inválida {suffix or path}. Debe ser una de: {', '.join(FILE_FORMATS)}"
+        )
+    return FILE_FORMATS[suffix](path, dimensions)
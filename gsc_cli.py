@@ -6,68 +6,472 @@ import argparse
 import asyncio
 import json
 import sys
+from datetime import date, timedelta
 from pathlib import Path
 from dotenv import load_dotenv
 
-from config import Config
-from gsc_client import GSCClient
+# Solo módulos ligeros: config (pydantic), gsc_client (googleapiclient, google-auth)
+# y los almacenes SQLite se importan en los comandos que los usan, para que
+# --help, los errores de argumentos y list-sites desde la instantánea arranquen rápido.
+from compact_rows import SearchAnalyticsRows
+from exporters import get_file_writer, get_writer
+from multi_site import fan_out, select_sites, tag_rows
+from period_compare import COMPARE_MODES, top_changes
+from query_planner import SHARD_ROW_LIMIT
+from row_ops import SORT_ORDERS, parse_filter, post_process
+from seo_analysis import analyze
+from site_inventory import SiteInventory
 
 load_dotenv(override=True)
 
 def print_json(data):
     print(json.dumps(data, indent=2, ensure_ascii=False))
 
+def print_result(result, fmt, dimensions, output=None):
+    if output:
+        writer = get_file_writer(output, dimensions)
+        writer.write(result["rows"])
+        writer.close()
+        print(f"{writer.rows_written} filas escritas en {output}", file=sys.stderr)
+        return
+    if fmt == "json":
+        print_json(result.to_dict() if isinstance(result, SearchAnalyticsRows) else result)
+        return
+    writer = get_writer(fmt, dimensions)
+    writer.write(result["rows"])
+    writer.close()
+
+def load_config():
+    from config import Config
+    return Config()
+
 def get_config():
-    config = Config()
-    creds = config.google_credentials
-    if not creds:
+    config = load_config()
+    if not config.has_backend:
         print("No se encontró el archivo de credenciales de Google.", file=sys.stderr)
         sys.exit(1)
-    return creds
+    return config
+
+def get_client(args):
+    from gsc_client import GSCClient
+    from response_cache import ResponseCache
+
+    config = get_config()
+    client = GSCClient.from_config(config, use_cache=not args.no_cache)
+    if args.clear_cache:
+        if client.cache is not None:
+            removed = client.cache.clear()
+        else:
+            removed = ResponseCache(config.cache_path).clear()
+        print(f"Caché vaciada ({removed} respuestas eliminadas).", file=sys.stderr)
+    return client
+
+def get_inventory(client, config):
+    return SiteInventory(
+        client, ttl=config.sites_ttl, snapshot_path=config.sites_snapshot_path
+    )
 
 async def cmd_list_sites(args):
-    creds = get_config()
-    client = GSCClient(creds)
-    result = await client.list_sites()
+    config = get_config()
+    inventory = get_inventory(None, config)
+    if inventory.is_fresh and not args.refresh and not args.clear_cache:
+        # La instantánea en disco está vigente: no hace falta crear el cliente
+        print_json(await inventory.list_sites())
+        return
+    async with get_client(args) as client:
+        result = await get_inventory(client, config).list_sites(refresh=args.refresh)
     print_json(result)
 
-async def cmd_search_analytics(args):
-    creds = get_config()
-    client = GSCClient(creds)
-    dimensions = [d.strip() for d in (args.dimensions or '').split(',') if d.strip()]
-    result = await client.get_search_analytics(
+def parse_dimensions(value):
+    return [d.strip() for d in (value or '').split(',') if d.strip()]
+
+def filter_arg(value):
+    try:
+        return parse_filter(value)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+
+def post_process_options(args):
+    """
+    Agrupación, orden y top-N locales de search-analytics, o {} si no se pide
+    ninguno (otros comandos no tienen estas opciones).
+    """
+    options = {
+        "group_by": parse_dimensions(getattr(args, 'group_by', None)),
+        "sort_by": getattr(args, 'sort_by', None),
+        "top": getattr(args, 'top_rows', None),
+    }
+    if not any(options.values()):
+        return {}
+    options["sort_order"] = getattr(args, 'sort_order', None) or "descending"
+    return options
+
+def query_store(args, config):
+    """
+    Resultado de search-analytics desde el almacén local, o None si no cubre el
+    rango o hay filtros (el almacén no los aplica).
+    """
+    from analytics_store import AnalyticsStore
+
+    if getattr(args, 'filters', None):
+        return None
+    dimensions = parse_dimensions(args.dimensions)
+    store = AnalyticsStore(config.store_path)
+    try:
+        if not store.covers(args.site_url, args.start_date, args.end_date, dimensions, args.type):
+            return None
+        result = store.query(
+            site_url=args.site_url,
+            start_date=args.start_date,
+            end_date=args.end_date,
+            dimensions=dimensions,
+            search_type=args.type,
+            row_limit=args.row_limit,
+        )
+    finally:
+        store.close()
+    options = post_process_options(args)
+    if options:
+        return post_process(SearchAnalyticsRows.from_rows(result["rows"], dimensions), **options)
+    return result
+
+async def query_search_analytics(client, args, config):
+    """Ejecuta search-analytics contra la API con un cliente ya creado."""
+    dimensions = parse_dimensions(args.dimensions)
+    filters = getattr(args, 'filters', None)
+    options = post_process_options(args)
+    if args.complete:
+        result = await client.get_search_analytics_complete(
+            site_url=args.site_url,
+            start_date=args.start_date,
+            end_date=args.end_date,
+            dimensions=dimensions or None,
+            search_type=args.type,
+            aggregation_type=args.aggregation_type,
+            row_limit=args.row_limit,
+            shard_size=args.shard_size,
+            shard_concurrency=config.shard_concurrency,
+            page_concurrency=args.concurrency or config.page_concurrency,
+            compact=True,
+            filters=filters,
+        )
+        result = post_process(result, **options)
+        return result if args.compact else result.to_dict()
+    return await client.get_search_analytics(
         site_url=args.site_url,
         start_date=args.start_date,
         end_date=args.end_date,
         dimensions=dimensions or None,
         search_type=args.type,
         aggregation_type=args.aggregation_type,
-        row_limit=args.row_limit,
+        row_limit=args.row_limit or 1000,
         fetch_all=getattr(args, 'fetch_all', False),
+        page_concurrency=args.concurrency or config.page_concurrency,
+        compact=args.compact,
+        filters=filters,
+        **options,
+    )
+
+async def run_command(client, args, config=None):
+    """
+    Ejecuta list-sites o search-analytics con un cliente ya creado y devuelve el
+    resultado como dict, sin imprimirlo. Permite usar la CLI dentro del proceso.
+    """
+    config = config or load_config()
+    if args.command == "list-sites":
+        return await get_inventory(client, config).list_sites(refresh=args.refresh)
+    if args.command == "search-analytics" and not args.site_url:
+        sites = []
+        async for site_url, result, error in query_sites(client, args, config):
+            if error is not None:
+                sites.append({"siteUrl": site_url, "error": str(error)})
+            else:
+                sites.append({"siteUrl": site_url, **(result.to_dict() if isinstance(result, SearchAnalyticsRows) else result)})
+        return {"sites": sites, "errors": sum(1 for site in sites if "error" in site)}
+    if args.command == "search-analytics":
+        result = query_store(args, config) if args.from_store else None
+        if result is None:
+            result = await query_search_analytics(client, args, config)
+        return result.to_dict() if isinstance(result, SearchAnalyticsRows) else result
+    if args.command == "compare":
+        result = await query_compare(client, args, config)
+        result["rows"] = top_changes(result["rows"], args.top) if args.top else list(result["rows"])
+        return result
+    if args.command == "analyze":
+        result = query_store(args, config) if args.from_store else None
+        if result is None:
+            result = await query_search_analytics(client, args, config)
+        return analyze_result(result, args)
+    raise ValueError(f"Comando no soportado dentro del proceso: {args.command}")
+
+async def query_sites(client, args, config):
+    """
+    Ejecuta search-analytics en todas las propiedades (--all-sites) o en las que
+    coinciden con --site-pattern, con como máximo --site-concurrency a la vez.
+    Entrega (propiedad, resultado, error) según termina cada una.
+    """
+    site_urls = select_sites(
+        await get_inventory(client, config).site_urls(), args.site_pattern
     )
+    if not site_urls:
+        raise ValueError("Ninguna propiedad coincide con el patrón indicado")
+
+    async def fetch(site_url):
+        site_args = argparse.Namespace(**{**vars(args), "site_url": site_url})
+        result = query_store(site_args, config) if args.from_store else None
+        if result is None:
+            result = await query_search_analytics(client, site_args, config)
+        return result
+
+    async for item in fan_out(site_urls, fetch, args.site_concurrency or config.site_concurrency):
+        yield item
+
+async def cmd_search_analytics_sites(args, config, dimensions):
+    """
+    search-analytics sobre varias propiedades; los fallos se informan por propiedad.
+    `dimensions` son las columnas de la tabla combinada (las de --group-by si se indica).
+    """
+    writer = None
+    if args.output:
+        writer = get_file_writer(args.output, ["siteUrl", *dimensions])
+    elif args.format != "json":
+        writer = get_writer(args.format, ["siteUrl", *dimensions])
+    sites = []
+    total = errors = 0
+    async with get_client(args) as client:
+        async for site_url, result, error in query_sites(client, args, config):
+            total += 1
+            if error is not None:
+                errors += 1
+                print(f"Error en {site_url}: {error}", file=sys.stderr)
+                sites.append({"siteUrl": site_url, "error": str(error)})
+            elif writer is not None:
+                # Tabla combinada: cada propiedad se escribe en cuanto termina
+                writer.write(tag_rows(result["rows"], site_url))
+            else:
+                sites.append({"siteUrl": site_url, **(result.to_dict() if isinstance(result, SearchAnalyticsRows) else result)})
+    print(f"{total - errors} de {total} propiedades consultadas correctamente.", file=sys.stderr)
+    if writer is not None:
+        writer.close()
+        if args.output:
+            print(f"{writer.rows_written} filas escritas en {args.output}", file=sys.stderr)
+        return
+    print_json({"sites": sites, "errors": errors})
+
+async def cmd_search_analytics(args):
+    config = load_config()
+    dimensions = parse_dimensions(args.dimensions)
+    # Con --group-by las filas solo tienen las dimensiones agrupadas
+    output_dimensions = parse_dimensions(args.group_by) or dimensions
+    if not args.site_url:
+        await cmd_search_analytics_sites(args, config, output_dimensions)
+        return
+    if args.from_store:
+        result = query_store(args, config)
+        if result is not None:
+            print_result(result, args.format, output_dimensions, args.output)
+            return
+        print("El almacén local no cubre ese rango o hay filtros; se consulta la API.", file=sys.stderr)
+    async with get_client(args) as client:
+        if not args.complete and not post_process_options(args) and (args.output or args.format != "json"):
+            # Salida en streaming: cada página se escribe en cuanto llega
+            if args.output:
+                writer = get_file_writer(args.output, dimensions)
+            else:
+                writer = get_writer(args.format, dimensions)
+            async for rows in client.iter_search_analytics(
+                site_url=args.site_url,
+                start_date=args.start_date,
+                end_date=args.end_date,
+                dimensions=dimensions or None,
+                search_type=args.type,
+                aggregation_type=args.aggregation_type,
+                row_limit=args.row_limit or 1000,
+                fetch_all=getattr(args, 'fetch_all', False),
+                page_concurrency=args.concurrency or config.page_concurrency,
+                filters=args.filters,
+            ):
+                writer.write(rows)
+            writer.close()
+            if args.output:
+                print(f"{writer.rows_written} filas escritas en {args.output}", file=sys.stderr)
+            return
+        result = await query_search_analytics(client, args, config)
+    print_result(result, args.format, output_dimensions, args.output)
+
+async def query_compare(client, args, config):
+    """Ejecuta compare con un cliente ya creado; las filas se devuelven como generador."""
+    return await client.compare_periods(
+        site_url=args.site_url,
+        start_date=args.start_date,
+        end_date=args.end_date,
+        compare_start_date=args.compare_start_date,
+        compare_end_date=args.compare_end_date,
+        compare_to=args.compare_to,
+        dimensions=parse_dimensions(args.dimensions) or None,
+        search_type=args.type,
+        row_limit=args.row_limit,
+        complete=args.complete,
+        shard_size=args.shard_size,
+        shard_concurrency=config.shard_concurrency,
+        page_concurrency=config.page_concurrency,
+    )
+
+async def cmd_compare(args):
+    config = load_config()
+    async with get_client(args) as client:
+        result = await query_compare(client, args, config)
+    if args.top:
+        result["rows"] = top_changes(result["rows"], args.top)
+    if args.format == "ndjson":
+        # Una línea por clave según se genera, sin construir la lista completa
+        for row in result["rows"]:
+            sys.stdout.write(json.dumps(row, ensure_ascii=False) + "\n")
+        return
+    result["rows"] = list(result["rows"])
     print_json(result)
 
-def main():
+def analyze_result(result, args):
+    return analyze(
+        result,
+        min_impressions=args.min_impressions,
+        min_share=args.min_share,
+        max_position=args.max_position,
+        top_n=args.top,
+    )
+
+async def cmd_analyze(args):
+    config = load_config()
+    if args.from_store:
+        result = query_store(args, config)
+        if result is not None:
+            print_json(analyze_result(result, args))
+            return
+        print("El almacén local no cubre ese rango; se consulta la API.", file=sys.stderr)
+    async with get_client(args) as client:
+        result = await query_search_analytics(client, args, config)
+    print_json(analyze_result(result, args))
+
+async def cmd_sync(args):
+    from analytics_store import AnalyticsStore
+
+    config = get_config()
+    dimensions = parse_dimensions(args.dimensions)
+    end_date = args.end_date or (date.today() - timedelta(days=2)).isoformat()
+    start_date = args.start_date or (
+        date.fromisoformat(end_date) - timedelta(days=args.days - 1)
+    ).isoformat()
+    store = AnalyticsStore(config.store_path)
+    try:
+        async with get_client(args) as client:
+            result = await store.sync(
+                client,
+                site_url=args.site_url,
+                start_date=start_date,
+                end_date=end_date,
+                dimensions=dimensions or None,
+                search_type=args.type,
+                concurrency=config.shard_concurrency,
+                page_concurrency=config.page_concurrency,
+            )
+    finally:
+        store.close()
+    print_json(result)
+
+def build_parser():
     parser = argparse.ArgumentParser(description="CLI para Google Search Console (MCP)")
     subparsers = parser.add_subparsers(dest="command", required=True)
 
+    # Opciones comunes de la caché en disco
+    cache_options = argparse.ArgumentParser(add_help=False)
+    cache_options.add_argument("--no-cache", action="store_true", help="No leer ni guardar respuestas en la caché en disco")
+    cache_options.add_argument("--clear-cache", action="store_true", help="Vaciar la caché en disco antes de ejecutar el comando")
+
     # list-sites
-    parser_ls = subparsers.add_parser("list-sites", help="Lista los sitios en Google Search Console")
+    parser_ls = subparsers.add_parser("list-sites", parents=[cache_options], help="Lista los sitios en Google Search Console")
+    parser_ls.add_argument("--refresh", action="store_true", help="Volver a pedir la lista a la API aunque la copia guardada siga vigente")
     parser_ls.set_defaults(func=cmd_list_sites)
 
     # search-analytics
-    parser_sa = subparsers.add_parser("search-analytics", help="Consulta Search Analytics")
-    parser_sa.add_argument("--site-url", required=True, help="URL del sitio a consultar")
+    parser_sa = subparsers.add_parser("search-analytics", parents=[cache_options], help="Consulta Search Analytics")
+    sites_sa = parser_sa.add_mutually_exclusive_group(required=True)
+    sites_sa.add_argument("--site-url", help="URL del sitio a consultar")
+    sites_sa.add_argument("--all-sites", action="store_true", help="Consultar todas las propiedades de list-sites")
+    sites_sa.add_argument("--site-pattern", help="Consultar las propiedades que coinciden con un patrón glob (ej: '*tienda*') o una expresión regular con prefijo re: (ej: 're:^sc-domain:')")
     parser_sa.add_argument("--start-date", required=True, help="Fecha de inicio (YYYY-MM-DD)")
     parser_sa.add_argument("--end-date", required=True, help="Fecha de fin (YYYY-MM-DD)")
     parser_sa.add_argument("--dimensions", help="Dimensiones separadas por coma (ej: query,page)")
     parser_sa.add_argument("--type", help="Tipo de búsqueda (web, image, video, discover, googleNews)")
     parser_sa.add_argument("--aggregation-type", help="Tipo de agregación (auto, byPage, byQuery, byNewsShowcasePanel)")
-    parser_sa.add_argument("--row-limit", type=int, default=1000, help="Límite de filas (default: 1000)")
+    parser_sa.add_argument("--row-limit", type=int, help="Límite de filas (default: 1000; sin límite con --complete)")
     parser_sa.add_argument("--fetch-all", action="store_true", help="Obtener todos los resultados posibles (más de 1000, puede ser lento)")
+    parser_sa.add_argument("--concurrency", type=int, help="Páginas que se piden a la vez con --fetch-all (default: GSC_PAGE_CONCURRENCY o 4; 1 = secuencial)")
+    parser_sa.add_argument("--complete", action="store_true", help="Modo completo: divide el rango por días o semanas, consulta los fragmentos en paralelo y combina los resultados")
+    parser_sa.add_argument("--shard-size", choices=["day", "week"], default="day", help="Tamaño de los fragmentos en modo completo (default: day)")
+    parser_sa.add_argument("--format", choices=["json", "ndjson", "csv"], default="json", help="Formato de salida; ndjson y csv se escriben en streaming página a página (default: json)")
+    parser_sa.add_argument("--output", help="Exportar a un fichero columnar con tipos, escrito por lotes: .parquet o Arrow IPC (.arrow, .feather). Requiere pyarrow")
+    parser_sa.add_argument("--compact", action="store_true", help="Guardar el resultado en memoria por columnas en lugar de un dict por fila (menos memoria en resultados grandes)")
+    parser_sa.add_argument("--from-store", action="store_true", help="Responder desde el almacén local (ver comando sync) si cubre el rango")
+    parser_sa.add_argument("--filter", dest="filters", action="append", type=filter_arg, help="Filtro que aplica la API: 'dimensión [operador] expresión', ej: 'page contains /blog/' o 'country esp' (se puede repetir; se cumplen todos)")
+    parser_sa.add_argument("--group-by", help="Agrupar en local por estas dimensiones (subconjunto de --dimensions), con la posición ponderada por impresiones")
+    parser_sa.add_argument("--sort-by", help="Ordenar en local por una métrica (clicks, impressions, ctr, position) o una dimensión")
+    parser_sa.add_argument("--sort-order", choices=SORT_ORDERS, default="descending", help="Orden de --sort-by (default: descending)")
+    parser_sa.add_argument("--top", dest="top_rows", type=int, help="Filas que se devuelven tras agrupar y ordenar")
+    parser_sa.add_argument("--site-concurrency", type=int, help="Propiedades que se consultan a la vez con --all-sites o --site-pattern (default: GSC_SITE_CONCURRENCY o 4)")
     parser_sa.set_defaults(func=cmd_search_analytics)
 
-    args = parser.parse_args()
+    # compare
+    parser_cmp = subparsers.add_parser("compare", parents=[cache_options], help="Compara un periodo con el anterior o con el del año pasado, clave a clave")
+    parser_cmp.add_argument("--site-url", required=True, help="URL del sitio a consultar")
+    parser_cmp.add_argument("--start-date", required=True, help="Fecha de inicio del periodo actual (YYYY-MM-DD)")
+    parser_cmp.add_argument("--end-date", required=True, help="Fecha de fin del periodo actual (YYYY-MM-DD)")
+    parser_cmp.add_argument("--compare-to", choices=COMPARE_MODES, default="previous", help="previous: los mismos días justo antes; year: las mismas fechas del año anterior (default: previous)")
+    parser_cmp.add_argument("--compare-start-date", help="Inicio de un periodo de comparación explícito (YYYY-MM-DD)")
+    parser_cmp.add_argument("--compare-end-date", help="Fin de un periodo de comparación explícito (YYYY-MM-DD)")
+    parser_cmp.add_argument("--dimensions", help="Dimensiones por las que se comparan los periodos, separadas por coma (ej: query,page)")
+    parser_cmp.add_argument("--type", help="Tipo de búsqueda (web, image, video, discover, googleNews)")
+    parser_cmp.add_argument("--row-limit", type=int, default=SHARD_ROW_LIMIT, help=f"Filas máximas de cada periodo (default: {SHARD_ROW_LIMIT})")
+    parser_cmp.add_argument("--complete", action="store_true", help="Modo completo: consulta cada periodo por fragmentos de fechas")
+    parser_cmp.add_argument("--shard-size", choices=["day", "week"], default="day", help="Tamaño de los fragmentos en modo completo (default: day)")
+    parser_cmp.add_argument("--top", type=int, help="Mostrar solo las N claves con mayor variación de clics")
+    parser_cmp.add_argument("--format", choices=["json", "ndjson"], default="json", help="Formato de salida; ndjson escribe cada clave según se calcula (default: json)")
+    parser_cmp.set_defaults(func=cmd_compare)
+
+    # analyze
+    parser_an = subparsers.add_parser("analyze", parents=[cache_options], help="Busca canibalizaciones y oportunidades de CTR en las filas query × page")
+    parser_an.add_argument("--site-url", required=True, help="URL del sitio a analizar")
+    parser_an.add_argument("--start-date", required=True, help="Fecha de inicio (YYYY-MM-DD)")
+    parser_an.add_argument("--end-date", required=True, help="Fecha de fin (YYYY-MM-DD)")
+    parser_an.add_argument("--type", help="Tipo de búsqueda (web, image, video, discover, googleNews)")
+    parser_an.add_argument("--row-limit", type=int, default=SHARD_ROW_LIMIT, help=f"Filas máximas a analizar (default: {SHARD_ROW_LIMIT})")
+    parser_an.add_argument("--complete", action="store_true", help="Modo completo: divide el rango por días o semanas y combina los resultados")
+    parser_an.add_argument("--shard-size", choices=["day", "week"], default="day", help="Tamaño de los fragmentos en modo completo (default: day)")
+    parser_an.add_argument("--from-store", action="store_true", help="Analizar desde el almacén local (ver comando sync) si cubre el rango")
+    parser_an.add_argument("--min-impressions", type=int, default=100, help="Impresiones mínimas de una consulta para analizarla (default: 100)")
+    parser_an.add_argument("--min-share", type=float, default=0.1, help="Parte mínima de las impresiones de la consulta para que una página cuente como canibalización (default: 0.1)")
+    parser_an.add_argument("--max-position", type=float, default=20.0, help="Posición media máxima de las oportunidades de CTR (default: 20)")
+    parser_an.add_argument("--top", type=int, default=50, help="Consultas a mostrar en cada lista (default: 50)")
+    # Siempre se piden todas las filas query,page en formato compacto
+    parser_an.set_defaults(
+        func=cmd_analyze, dimensions="query,page", aggregation_type=None,
+        fetch_all=True, concurrency=None, compact=True,
+    )
+
+    # sync
+    parser_sync = subparsers.add_parser("sync", help="Sincroniza en el almacén local los días que faltan o aún no son definitivos")
+    parser_sync.add_argument("--site-url", required=True, help="URL del sitio a sincronizar")
+    parser_sync.add_argument("--start-date", help="Fecha de inicio (YYYY-MM-DD, default: --days días antes de --end-date)")
+    parser_sync.add_argument("--end-date", help="Fecha de fin (YYYY-MM-DD, default: hace 2 días)")
+    parser_sync.add_argument("--days", type=int, default=180, help="Días a sincronizar si no se indica --start-date (default: 180)")
+    parser_sync.add_argument("--dimensions", help="Dimensiones que se guardan por día, separadas por coma (ej: query,page)")
+    parser_sync.add_argument("--type", help="Tipo de búsqueda (web, image, video, discover, googleNews)")
+    # El almacén ya guarda los datos: no tiene sentido duplicarlos en la caché
+    parser_sync.set_defaults(func=cmd_sync, no_cache=True, clear_cache=False)
+
+    return parser
+
+def main():
+    args = build_parser().parse_args()
     asyncio.run(args.func(args))
 
 if __name__ == "__main__":
@@ -1,30 +1,163 @@
 # API client de Google Search Console
 
+import asyncio
 import json
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Union
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Hashable, List, Optional, Union
 
 from google.oauth2 import service_account
-from googleapiclient.discovery import build
+from google_auth_httplib2 import AuthorizedHttp
+from googleapiclient.errors import HttpError
+
+from compact_rows import SearchAnalyticsRows
+from period_compare import compare_rows, comparison_period, period_totals
+from query_planner import SHARD_ROW_LIMIT, merge_rows, plan_date_shards, shard_dimensions
+from rate_limiter import GSCError, RateLimiter, backoff_delay
+from response_cache import ResponseCache, cache_key, is_settled
+from row_ops import build_filter_groups, post_process
+from service_factory import authorized_http, get_service, load_credentials, refresh_credentials
+
+
+# Recibe el avance de una consulta larga: (hecho, total o None si no se conoce)
+ProgressCallback = Callable[[int, Optional[int]], Awaitable[None]]
+
+
+async def _gather(*aws):
+    """
+    Como asyncio.gather, pero si una llamada falla cancela las que siguen pendientes.
+    """
+    tasks = [asyncio.ensure_future(aw) for aw in aws]
+    try:
+        return await asyncio.gather(*tasks)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        raise
+
 
 class GSCClient:
     """
     Cliente para la API de Google Search Console
     """
 
-    def __init__(self, credentials_path:  Path):
+    # Máximo de filas que se paginan por fragmento en el modo completo
+    SHARD_ROW_LIMIT = SHARD_ROW_LIMIT
+    # Máximo de llamadas que admite la API en una petición batch
+    BATCH_LIMIT = 1000
+
+    def __init__(
+        self,
+        credentials_path:  Path,
+        max_workers: int = 8,
+        request_timeout: float = 60.0,
+        cache: Optional[ResponseCache] = None,
+        rate_limiter: Optional[RateLimiter] = None,
+        max_retries: int = 5,
+        service=None,
+    ):
         """
         Inicalizar la API de google Search Consonle
         
         Args:
             credentials_path: Path al archivo de los credenciales de Google Cloud
+            max_workers: Número máximo de llamadas a la API ejecutándose a la vez
+            request_timeout: Tiempo máximo en segundos para cada llamada a la API
+            cache: Caché en disco de las respuestas de Search Analytics (opcional)
+            rate_limiter: Limitador de cuotas y concurrencia compartido (por defecto
+                uno propio con las cuotas estándar de la API)
+            max_retries: Reintentos ante errores 429/5xx o de cuota, con backoff exponencial
+            service: Servicio ya construido (por ejemplo stub_gsc.StubService); sin él
+                se cargan las credenciales y se usa el servicio de la API
         """
         self.credentials_path = credentials_path
-        self.credentials = self._get_credentials()
-        self.service = build(
-            "searchconsole", "v1", credentials=self.credentials, cache_discovery=False
+        self.cache = cache
+        if service is not None:
+            self.credentials = None
+            self.service = service
+        else:
+            # Credenciales y servicio se comparten entre los clientes del proceso
+            self.credentials = self._get_credentials()
+            self.service = get_service(self.credentials)
+        self.request_timeout = request_timeout
+        self.rate_limiter = rate_limiter or RateLimiter(max_concurrency=max_workers)
+        self.max_retries = max_retries
+        # Las llamadas de googleapiclient son bloqueantes: se ejecutan en un pool
+        # acotado para no congelar el event loop del servidor MCP.
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="gsc-api"
         )
+        # La caché en disco (zlib, JSON y SQLite) tampoco corre en el event loop;
+        # va en un pool propio para no quitar huecos a las llamadas a la API
+        self._cache_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="gsc-cache")
+
+    @classmethod
+    def from_config(cls, config, use_cache: bool = True) -> "GSCClient":
+        """
+        Crea un cliente con los parámetros de la configuración.
+
+        Args:
+            config: Configuración del servidor (Config)
+            use_cache: Usar la caché en disco si está habilitada en la configuración
+        """
+        service = None
+        if config.stub_gsc:
+            from stub_gsc import StubService
+
+            service = StubService()
+        cache = None
+        if use_cache and config.cache_enabled:
+            cache = ResponseCache(
+                config.cache_path,
+                max_bytes=config.cache_max_bytes,
+                fresh_ttl=config.cache_fresh_ttl,
+            )
+        return cls(
+            config.google_credentials if service is None else None,
+            max_workers=config.max_workers,
+            request_timeout=config.request_timeout,
+            cache=cache,
+            rate_limiter=RateLimiter(
+                project_qpm=config.project_qpm,
+                site_qpm=config.site_qpm,
+                max_concurrency=config.max_workers,
+            ),
+            max_retries=config.max_retries,
+            service=service,
+        ).warm_up()
+
+    def warm_up(self) -> "GSCClient":
+        """
+        Pide el token de acceso en segundo plano, para que la primera llamada a la
+        API no tenga que esperarlo.
+        """
+        if self.credentials is not None:
+            self._executor.submit(refresh_credentials, self.credentials)
+        return self
+
+    async def __aenter__(self) -> "GSCClient":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """
+        Libera el pool de hilos, cancelando las llamadas que aún no han empezado.
+        """
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        # Las escrituras en caché ya encoladas terminan antes de cerrarla
+        self._cache_executor.shutdown(wait=True)
+        if self.cache is not None:
+            self.cache.close()
+
+    async def _in_cache_thread(self, func: Callable[..., Any], *args: Any) -> Any:
+        """
+        Ejecuta una operación de la caché en disco fuera del event loop.
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._cache_executor, func, *args)
 
     def _get_credentials(self) -> service_account.Credentials:
         """
@@ -33,19 +166,86 @@ class GSCClient:
         Returns:
             Credentials: Credenciales de Google Cloud
         """
-        return service_account.Credentials.from_service_account_file(
-            str(self.credentials_path)
-        )
-        
-    async def list_sites(self) -> Dict[str, Any]:
+        return load_credentials(self.credentials_path)
+
+    def _get_http(self) -> Optional[AuthorizedHttp]:
+        """
+        Devuelve la conexión HTTP autorizada del hilo actual, creándola si no existe.
+        """
+        if self.credentials is None:
+            # Servicio inyectado (stub): no necesita conexión autorizada
+            return None
+        return authorized_http(self.credentials, self.request_timeout)
+
+    def _execute_blocking(self, request) -> Dict[str, Any]:
+        """
+        Ejecuta una petición de googleapiclient en el hilo actual.
+        """
+        return request.execute(http=self._get_http())
+
+    async def _execute(
+        self,
+        request,
+        timeout: Optional[float] = None,
+        site_url: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """
+        Ejecuta una petición de la API en el pool de hilos sin bloquear el event loop.
+
+        Cada intento espera turno en el limitador (cuotas del proyecto y de la
+        propiedad, concurrencia adaptativa). Los errores 429/5xx y de cuota se
+        reintentan con backoff exponencial y jitter, y reducen la concurrencia.
+
+        Si la tarea que espera se cancela o se supera el tiempo límite, la petición
+        se descarta; si aún no había empezado, no llega a enviarse.
+
+        Args:
+            request: Petición de googleapiclient (HttpRequest) sin ejecutar
+            timeout: Tiempo máximo en segundos de cada intento (por defecto: request_timeout)
+            site_url: Propiedad a la que se cuenta la petición en su cuota
+
+        Returns:
+            Dict[str, Any]: Respuesta cruda de la API
+
+        Raises:
+            GSCError: Si la API responde con error y no quedan reintentos
+        """
+        timeout = timeout if timeout is not None else self.request_timeout
+        loop = asyncio.get_running_loop()
+        attempt = 0
+        while True:
+            async with self.rate_limiter.slot(site_url):
+                future = loop.run_in_executor(self._executor, self._execute_blocking, request)
+                try:
+                    response = await asyncio.wait_for(future, timeout=timeout)
+                except asyncio.TimeoutError:
+                    raise TimeoutError(
+                        f"La llamada a la API de Search Console superó el tiempo límite de {timeout} s"
+                    )
+                except HttpError as e:
+                    error = GSCError.from_http_error(e)
+                    if not error.retryable or attempt >= self.max_retries:
+                        raise error from e
+                    self.rate_limiter.record_throttle()
+                else:
+                    self.rate_limiter.record_success()
+                    return response
+            # La espera se hace fuera del limitador para no ocupar un hueco
+            await asyncio.sleep(backoff_delay(attempt))
+            attempt += 1
+
+    async def list_sites(self, timeout: Optional[float] = None) -> Dict[str, Any]:
         """
         Listar los sitios en Google Search Console
 
+        Args:
+            timeout: Tiempo máximo en segundos para la llamada (por defecto: request_timeout)
+
         Returns:
             Dict[str, Any]: Diccionario con la lista de sitios
         """
         try:
-            response = self.service.sites().list().execute()
+            response = await self._execute(self.service.sites().list(), timeout=timeout)
 
             sites = response.get('siteEntry', [])
             formatted_sites = []
@@ -62,8 +262,10 @@ class GSCClient:
                 "total_sites": len(formatted_sites)
             }
         
+        except GSCError as e:
+            raise GSCError(f"Error al listar los sitios: {str(e)}", status=e.status, reason=e.reason) from e
         except Exception as e:
-            raise Exception(f"Error al listar los sitios: {str(e)}")
+            raise GSCError(f"Error al listar los sitios: {str(e)}") from e
 
     async def get_search_analytics (
         self,
@@ -75,7 +277,16 @@ class GSCClient:
         aggregation_type: Optional[str] = None,
         row_limit: int = 1000,
         fetch_all: bool = False,
-    ) -> Dict[str, Any]:
+        timeout: Optional[float] = None,
+        page_concurrency: int = 1,
+        compact: bool = False,
+        on_progress: Optional[ProgressCallback] = None,
+        filters: Optional[List[Dict[str, Any]]] = None,
+        group_by: Optional[List[str]] = None,
+        sort_by: Optional[str] = None,
+        sort_order: str = "descending",
+        top: Optional[int] = None,
+    ) -> Union[Dict[str, Any], SearchAnalyticsRows]:
         """
         Toma os datos de search console e retorna as métricas solicitadas.
 
@@ -87,73 +298,556 @@ class GSCClient:
             search_type: Tipo de búsqueda (web, imagen, video)
             aggregation_type: Tipo de agregación (auto, byPage, byQuery)
             row_limit: Límite de filas a retornar
+            fetch_all: Paginar hasta obtener todos los resultados (hasta row_limit)
+            timeout: Tiempo máximo en segundos para cada llamada (por defecto: request_timeout)
+            page_concurrency: Páginas que se piden a la vez con fetch_all (1 = secuencial)
+            compact: Devolver un SearchAnalyticsRows (por columnas) en lugar del dict
+            on_progress: Se llama tras cada página con las filas recibidas hasta el momento
+            filters: Filtros {dimension, operator, expression} que aplica la API
+                (page, query, country, device, searchAppearance)
+            group_by: Dimensiones por las que agrupar en local las filas recibidas
+            sort_by: Métrica o dimensión por la que ordenar en local
+            sort_order: descending o ascending
+            top: Filas que se devuelven tras agrupar y ordenar
 
         Returns:
             Dict[str, Any]: Diccionario con los datos de métricas solicitadas
         """
+        request_body = self._build_request_body(
+            start_date, end_date, dimensions, search_type, aggregation_type, filters
+        )
+
+        if group_by or sort_by or top:
+            if top and not group_by and sort_by in (None, "clicks") and sort_order == "descending":
+                # La API ya devuelve las filas por clics descendentes: basta con pedir `top`
+                row_limit = min(row_limit, top)
+            result = SearchAnalyticsRows(dimensions)
+            async for rows in self._iter_pages(
+                site_url, request_body, row_limit, fetch_all, page_concurrency, timeout
+            ):
+                result.extend_raw(rows)
+                if on_progress is not None:
+                    await on_progress(len(result), None)
+            result = post_process(result, group_by, sort_by, sort_order, top)
+            return result if compact else result.to_dict()
+
+        if compact:
+            result = SearchAnalyticsRows(dimensions)
+            async for rows in self._iter_pages(
+                site_url, request_body, row_limit, fetch_all, page_concurrency, timeout
+            ):
+                result.extend_raw(rows)
+                if on_progress is not None:
+                    await on_progress(len(result), None)
+            return result
+
+        all_rows = []
+        async for rows in self._iter_pages(
+            site_url, request_body, row_limit, fetch_all, page_concurrency, timeout
+        ):
+            all_rows.extend(rows)
+            if on_progress is not None:
+                await on_progress(len(all_rows), None)
+
+        # Formatear la respuesta
+        formatted_response = self._format_search_analytics({"rows": all_rows}, dimensions or [])
+        return formatted_response
+
+    async def iter_search_analytics(
+        self,
+        site_url: str,
+        start_date: str,
+        end_date: str,
+        dimensions: Optional[List[str]] = None,
+        search_type: Optional[str] = None,
+        aggregation_type: Optional[str] = None,
+        row_limit: int = 1000,
+        fetch_all: bool = False,
+        timeout: Optional[float] = None,
+        page_concurrency: int = 1,
+        filters: Optional[List[Dict[str, Any]]] = None,
+    ) -> AsyncIterator[List[Dict[str, Any]]]:
+        """
+        Igual que get_search_analytics, pero entrega las filas formateadas página a
+        página según llegan de la API, sin acumular el resultado completo.
+
+        Yields:
+            List[Dict[str, Any]]: Filas formateadas de cada página, en orden
+        """
+        request_body = self._build_request_body(
+            start_date, end_date, dimensions, search_type, aggregation_type, filters
+        )
+        async for rows in self._iter_pages(
+            site_url, request_body, row_limit, fetch_all, page_concurrency, timeout
+        ):
+            yield self._format_search_analytics({"rows": rows}, dimensions or [])["rows"]
+
+    async def get_search_analytics_complete(
+        self,
+        site_url: str,
+        start_date: str,
+        end_date: str,
+        dimensions: Optional[List[str]] = None,
+        search_type: Optional[str] = None,
+        aggregation_type: Optional[str] = None,
+        row_limit: Optional[int] = None,
+        shard_size: str = "day",
+        shard_concurrency: int = 4,
+        page_concurrency: int = 1,
+        timeout: Optional[float] = None,
+        compact: bool = False,
+        on_progress: Optional[ProgressCallback] = None,
+        filters: Optional[List[Dict[str, Any]]] = None,
+    ) -> Union[Dict[str, Any], SearchAnalyticsRows]:
+        """
+        Modo "completo": divide el rango en fragmentos por día o semana, los consulta
+        en paralelo paginando cada uno hasta el final y combina los resultados. Así se
+        evita el recorte de filas que aplica la API a rangos largos.
+
+        Args:
+            site_url: URL del sitio para el que se desean obtener los datos
+            start_date: Fecha de inicio para el rango de fechas
+            end_date: Fecha de fin para el rango de fechas
+            dimensions: Dimensiones por las que se desea segmentar la información
+            search_type: Tipo de búsqueda (web, imagen, video)
+            aggregation_type: Tipo de agregación (auto, byPage, byQuery)
+            row_limit: Límite de filas del resultado combinado (None = sin límite)
+            shard_size: Tamaño de cada fragmento (day, week)
+            shard_concurrency: Fragmentos que se consultan a la vez
+            page_concurrency: Páginas que se piden a la vez dentro de cada fragmento
+            timeout: Tiempo máximo en segundos para cada llamada (por defecto: request_timeout)
+            compact: Devolver un SearchAnalyticsRows (por columnas) en lugar del dict
+            on_progress: Se llama al terminar cada fragmento con (fragmentos hechos, total)
+            filters: Filtros {dimension, operator, expression} que aplica la API
+
+        Returns:
+            Dict[str, Any]: Diccionario con los datos combinados y el número de fragmentos
+        """
+        shards = plan_date_shards(start_date, end_date, shard_size)
+        query_dimensions = shard_dimensions(dimensions, shard_size)
+        semaphore = asyncio.Semaphore(max(1, shard_concurrency))
+        done = 0
+
+        async def fetch_shard(shard_start: str, shard_end: str) -> SearchAnalyticsRows:
+            nonlocal done
+            async with semaphore:
+                # Cada fragmento se guarda por columnas hasta combinarlos
+                rows = await self.get_search_analytics(
+                    site_url=site_url,
+                    start_date=shard_start,
+                    end_date=shard_end,
+                    dimensions=query_dimensions or None,
+                    search_type=search_type,
+                    aggregation_type=aggregation_type,
+                    row_limit=self.SHARD_ROW_LIMIT,
+                    fetch_all=True,
+                    timeout=timeout,
+                    page_concurrency=page_concurrency,
+                    compact=True,
+                    filters=filters,
+                )
+            done += 1
+            if on_progress is not None:
+                await on_progress(done, len(shards))
+            return rows
+
+        shard_rows = await _gather(*(fetch_shard(*shard) for shard in shards))
+        rows = merge_rows(shard_rows, dimensions)
+        if row_limit and len(rows) > row_limit:
+            rows = rows[:row_limit]
+        if compact:
+            return SearchAnalyticsRows.from_rows(rows, dimensions, aggregation_type or "")
+        return {
+            "rows": rows,
+            "responseAggregationType": aggregation_type or "",
+            "shards": len(shards),
+        }
+
+    async def compare_periods(
+        self,
+        site_url: str,
+        start_date: str,
+        end_date: str,
+        compare_start_date: Optional[str] = None,
+        compare_end_date: Optional[str] = None,
+        compare_to: str = "previous",
+        dimensions: Optional[List[str]] = None,
+        search_type: Optional[str] = None,
+        row_limit: int = SHARD_ROW_LIMIT,
+        complete: bool = False,
+        shard_size: str = "day",
+        shard_concurrency: int = 4,
+        page_concurrency: int = 1,
+        timeout: Optional[float] = None,
+    ) -> Dict[str, Any]:
+        """
+        Consulta a la vez un periodo y su periodo de comparación y los une por las
+        claves de dimensiones.
+
+        Args:
+            site_url: URL del sitio para el que se desean obtener los datos
+            start_date: Fecha de inicio del periodo actual
+            end_date: Fecha de fin del periodo actual
+            compare_start_date: Inicio del periodo de comparación (por defecto según compare_to)
+            compare_end_date: Fin del periodo de comparación (por defecto según compare_to)
+            compare_to: previous (los mismos días justo antes) o year (un año antes)
+            dimensions: Dimensiones por las que se unen los dos periodos
+            search_type: Tipo de búsqueda (web, imagen, video)
+            row_limit: Límite de filas de cada periodo (se pagina hasta alcanzarlo)
+            complete: Consultar cada periodo en modo completo (por fragmentos de fechas)
+            shard_size: Tamaño de los fragmentos en modo completo (day, week)
+            shard_concurrency: Fragmentos que se consultan a la vez en modo completo
+            page_concurrency: Páginas que se piden a la vez
+            timeout: Tiempo máximo en segundos para cada llamada (por defecto: request_timeout)
+
+        Returns:
+            Dict[str, Any]: Periodos comparados, totales y `rows`, un generador con
+            una fila por clave (ver period_compare.compare_rows)
+        """
+        if compare_start_date and compare_end_date:
+            previous_period = (compare_start_date, compare_end_date)
+        else:
+            previous_period = comparison_period(start_date, end_date, compare_to)
+
+        async def fetch(period_start: str, period_end: str) -> SearchAnalyticsRows:
+            if complete:
+                return await self.get_search_analytics_complete(
+                    site_url=site_url,
+                    start_date=period_start,
+                    end_date=period_end,
+                    dimensions=dimensions,
+                    search_type=search_type,
+                    row_limit=row_limit,
+                    shard_size=shard_size,
+                    shard_concurrency=shard_concurrency,
+                    page_concurrency=page_concurrency,
+                    timeout=timeout,
+                    compact=True,
+                )
+            return await self.get_search_analytics(
+                site_url=site_url,
+                start_date=period_start,
+                end_date=period_end,
+                dimensions=dimensions,
+                search_type=search_type,
+                row_limit=row_limit,
+                fetch_all=True,
+                timeout=timeout,
+                page_concurrency=page_concurrency,
+                compact=True,
+            )
+
+        current, previous = await _gather(
+            fetch(start_date, end_date), fetch(*previous_period)
+        )
+        return {
+            "period": {"startDate": start_date, "endDate": end_date},
+            "previousPeriod": {"startDate": previous_period[0], "endDate": previous_period[1]},
+            "totals": period_totals(current, previous),
+            "rows": compare_rows(current, previous, dimensions),
+        }
+
+    async def query_many(
+        self,
+        site_url: str,
+        queries: Dict[Hashable, Dict[str, Any]],
+        batch_size: int = 100,
+        timeout: Optional[float] = None,
+        compact: bool = False,
+        return_exceptions: bool = False,
+    ) -> Dict[Hashable, Any]:
+        """
+        Ejecuta muchas consultas pequeñas de Search Analytics agrupándolas en
+        peticiones batch de la API (una sola ida y vuelta HTTP por lote).
+
+        Cada consulta es el cuerpo de searchanalytics.query tal como lo espera la
+        API (startDate, endDate, dimensions, dimensionFilterGroups, rowLimit...) y
+        devuelve una sola página. Las respuestas se guardan en la caché en disco, y
+        las llamadas de un lote que fallan por cuota o 5xx se reintentan en otro lote.
+
+        Args:
+            site_url: URL del sitio para el que se desean obtener los datos
+            queries: Cuerpos de consulta por clave del llamador
+            batch_size: Consultas por lote (la API admite como máximo 1000)
+            timeout: Tiempo máximo en segundos de cada lote (por defecto: request_timeout)
+            compact: Devolver SearchAnalyticsRows en lugar de dicts
+            return_exceptions: Devolver los GSCError como valores en lugar de lanzar
+                el primero, como asyncio.gather
+
+        Returns:
+            Dict[Hashable, Any]: Resultado formateado de cada consulta, por su clave
+        """
+        if not 1 <= batch_size <= self.BATCH_LIMIT:
+            raise ValueError(f"batch_size debe estar entre 1 y {self.BATCH_LIMIT}")
+        for body in queries.values():
+            if "startDate" not in body or "endDate" not in body:
+                raise ValueError("Cada consulta necesita startDate y endDate")
+
+        def format_response(body: Dict[str, Any], response: Dict[str, Any]) -> Any:
+            dimensions = body.get("dimensions") or []
+            if compact:
+                rows = SearchAnalyticsRows(dimensions, response.get("responseAggregationType", ""))
+                rows.extend_raw(response.get("rows", []))
+                return rows
+            return self._format_search_analytics(response, dimensions)
+
+        def cached_responses() -> Dict[Hashable, Optional[Dict[str, Any]]]:
+            return {key: self.cache.get(cache_key(site_url, body)) for key, body in queries.items()}
+
+        cached_by_key = await self._in_cache_thread(cached_responses) if self.cache is not None else {}
+        results: Dict[Hashable, Any] = {}
+        pending: Dict[Hashable, Dict[str, Any]] = {}
+        for key, body in queries.items():
+            cached = cached_by_key.get(key)
+            if cached is not None:
+                results[key] = format_response(body, cached)
+            else:
+                pending[key] = body
+
+        attempt = 0
+        while pending:
+            keys = list(pending)
+            chunks = [keys[i:i + batch_size] for i in range(0, len(keys), batch_size)]
+            outcomes = await _gather(*(
+                self._execute_batch(site_url, {key: pending[key] for key in chunk}, timeout)
+                for chunk in chunks
+            ))
+            retry: Dict[Hashable, Dict[str, Any]] = {}
+            for outcome in outcomes:
+                for key, (response, error) in outcome.items():
+                    body = pending[key]
+                    if error is None:
+                        if self.cache is not None:
+                            await self._in_cache_thread(
+                                self.cache.set, cache_key(site_url, body), site_url, response,
+                                is_settled(body["endDate"]),
+                            )
+                        results[key] = format_response(body, response)
+                    elif error.retryable and attempt < self.max_retries:
+                        retry[key] = body
+                    elif return_exceptions:
+                        results[key] = error
+                    else:
+                        raise error
+            pending = retry
+            if pending:
+                self.rate_limiter.record_throttle()
+                await asyncio.sleep(backoff_delay(attempt))
+                attempt += 1
+        return {key: results[key] for key in queries}
+
+    def _execute_batch_blocking(self, requests: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Envía en el hilo actual una petición batch con las peticiones indicadas.
+
+        Returns:
+            Dict[str, Any]: (respuesta, excepción) de cada petición por su id
+        """
+        outcomes: Dict[str, Any] = {}
 
+        def callback(request_id, response, exception):
+            outcomes[request_id] = (response, exception)
+
+        batch = self.service.new_batch_http_request(callback=callback)
+        for request_id, request in requests.items():
+            batch.add(request, request_id=request_id)
+        batch.execute(http=self._get_http())
+        return outcomes
+
+    async def _execute_batch(
+        self,
+        site_url: str,
+        bodies: Dict[Hashable, Dict[str, Any]],
+        timeout: Optional[float] = None,
+    ) -> Dict[Hashable, Any]:
+        """
+        Ejecuta un lote de consultas en el pool de hilos, contando cada consulta
+        en las cuotas del limitador.
+
+        Returns:
+            Dict[Hashable, Any]: (respuesta, GSCError o None) de cada consulta por su clave
+        """
+        timeout = timeout if timeout is not None else self.request_timeout
+        # Los ids de un batch deben ser strings: se usa la posición de cada clave
+        keys = list(bodies)
+        requests = {
+            str(i): self.service.searchanalytics().query(siteUrl=site_url, body=bodies[key])
+            for i, key in enumerate(keys)
+        }
+        loop = asyncio.get_running_loop()
+        async with self.rate_limiter.slot(site_url, calls=len(requests)):
+            future = loop.run_in_executor(self._executor, self._execute_batch_blocking, requests)
+            try:
+                outcomes = await asyncio.wait_for(future, timeout=timeout)
+            except asyncio.TimeoutError:
+                raise TimeoutError(
+                    f"El lote de consultas a Search Console superó el tiempo límite de {timeout} s"
+                )
+            except HttpError as e:
+                # Falla el lote completo: todas sus consultas comparten el error
+                error = GSCError.from_http_error(e)
+                if not error.retryable:
+                    raise error from e
+                return {key: (None, error) for key in keys}
+
+        results = {}
+        for i, key in enumerate(keys):
+            response, exception = outcomes.get(str(i), (None, None))
+            if exception is None and response is None:
+                exception = GSCError("La petición batch no devolvió respuesta para una consulta")
+            if isinstance(exception, HttpError):
+                exception = GSCError.from_http_error(exception)
+            elif exception is not None and not isinstance(exception, GSCError):
+                exception = GSCError(str(exception))
+            results[key] = (response, exception)
+        if any(error is not None and error.retryable for _, error in results.values()):
+            self.rate_limiter.record_throttle()
+        else:
+            self.rate_limiter.record_success()
+        return results
+
+    def _build_request_body(
+        self,
+        start_date: str,
+        end_date: str,
+        dimensions: Optional[List[str]],
+        search_type: Optional[str],
+        aggregation_type: Optional[str],
+        filters: Optional[List[Dict[str, Any]]] = None,
+    ) -> Dict[str, Any]:
+        """
+        Valida los parámetros y construye el cuerpo base de la consulta (sin paginación).
+
+        Returns:
+            Dict[str, Any]: Cuerpo de la petición a searchanalytics.query
+        """
         #Validar datos
         try:
             datetime.strptime(start_date, "%Y-%m-%d")
             datetime.strptime(end_date, "%Y-%m-%d")
         except ValueError:
             raise ValueError("Las fechas deben estar en formato YYYY-MM-DD")
-        
-        # Soporte para paginación
-        all_rows = []
-        start_row = 0
-        max_rows_per_request = min(row_limit, 25000)  # GSC API limita a 25,000 por request
-        total_fetched = 0
-        keep_fetching = True
-
-        while keep_fetching:
-            request_body = {
-                "startDate": start_date,
-                "endDate": end_date,
-                "dimensions": dimensions,
-                "rowLimit": max_rows_per_request,
-                "startRow": start_row,
-            }
 
-            #Añadir campos opcionales si se proporcionan.
-            if search_type:
-                valid_types = ['web', 'image', 'video', 'discover', 'googleNews']
-                if search_type not in valid_types:
-                    raise ValueError(f"Tipo de búsqueda inválido {search_type}. Debe ser uno de: {', '.join(valid_types)}")
-                request_body['searchType'] = search_type
+        request_body = {
+            "startDate": start_date,
+            "endDate": end_date,
+            "dimensions": dimensions,
+        }
+
+        #Añadir campos opcionales si se proporcionan.
+        if search_type:
+            valid_types = ['web', 'image', 'video', 'discover', 'googleNews']
+            if search_type not in valid_types:
+                raise ValueError(f"Tipo de búsqueda inválido {search_type}. Debe ser uno de: {', '.join(valid_types)}")
+            request_body['searchType'] = search_type
 
-            if aggregation_type:
-                valid_aggregations = ['auto', 'byPage', 'byQuery',"byNewsShowcasePanel"]
-                if aggregation_type not in valid_aggregations:
-                    raise ValueError(f"Tipo de agregación inválido {aggregation_type}. Debe ser uno de: {', '.join(valid_types)}")
-                request_body['aggregationType'] = aggregation_type
+        if aggregation_type:
+            valid_aggregations = ['auto', 'byPage', 'byQuery',"byNewsShowcasePanel"]
+            if aggregation_type not in valid_aggregations:
+                raise ValueError(f"Tipo de agregación inválido {aggregation_type}. Debe ser uno de: {', '.join(valid_aggregations)}")
+            request_body['aggregationType'] = aggregation_type
 
-            response = self.service.searchanalytics().query(
+        filter_groups = build_filter_groups(filters)
+        if filter_groups:
+            request_body['dimensionFilterGroups'] = filter_groups
+
+        return request_body
+
+    async def _query_page(
+        self,
+        site_url: str,
+        request_body: Dict[str, Any],
+        start_row: int,
+        row_limit: int,
+        timeout: Optional[float] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Pide una página de resultados a partir de start_row, usando la caché en
+        disco si está disponible.
+
+        Returns:
+            List[Dict[str, Any]]: Filas crudas de la API
+        """
+        body = dict(request_body, rowLimit=row_limit, startRow=start_row)
+        key = None
+        if self.cache is not None:
+            key = cache_key(site_url, body)
+            cached = await self._in_cache_thread(self.cache.get, key)
+            if cached is not None:
+                return cached.get('rows', [])
+
+        response = await self._execute(
+            self.service.searchanalytics().query(
                 siteUrl=site_url,
-                body=request_body,
-            ).execute()
+                body=body,
+            ),
+            timeout=timeout,
+            site_url=site_url,
+        )
+        if key is not None:
+            await self._in_cache_thread(
+                self.cache.set, key, site_url, response, is_settled(body["endDate"])
+            )
+        return response.get('rows', [])
 
-            rows = response.get('rows', [])
-            all_rows.extend(rows)
-            fetched = len(rows)
-            total_fetched += fetched
-
-            # Condición de parada:
-            # - Si no se pide fetch_all, solo una iteración (como antes)
-            # - Si se pide fetch_all, seguir hasta que la respuesta traiga menos de max_rows_per_request
-            if not fetch_all or fetched < max_rows_per_request or (row_limit and total_fetched >= row_limit):
-                keep_fetching = False
+    async def _iter_pages(
+        self,
+        site_url: str,
+        request_body: Dict[str, Any],
+        row_limit: int,
+        fetch_all: bool = False,
+        page_concurrency: int = 1,
+        timeout: Optional[float] = None,
+    ) -> AsyncIterator[List[Dict[str, Any]]]:
+        """
+        Recorre las páginas de una consulta y entrega sus filas crudas en orden,
+        sin pasar de row_limit.
+
+        Sin fetch_all se pide una sola página. Con fetch_all y page_concurrency > 1
+        se pide la primera página y, si viene llena, se lanzan a la vez las
+        siguientes `page_concurrency` ventanas de startRow; la paginación se detiene
+        en la primera página incompleta.
+
+        Yields:
+            List[Dict[str, Any]]: Filas crudas de cada página
+        """
+        page_size = min(row_limit, 25000)  # GSC API limita a 25,000 por request
+        remaining = row_limit
+        next_start = 0
+        last_page_full = True
+
+        while last_page_full and remaining > 0:
+            if fetch_all and page_concurrency > 1 and next_start > 0:
+                pending_pages = -(-remaining // page_size)
+                starts = [
+                    next_start + i * page_size
+                    for i in range(min(page_concurrency, pending_pages))
+                ]
+                pages = await _gather(*(
+                    self._query_page(site_url, request_body, start, page_size, timeout)
+                    for start in starts
+                ))
             else:
-                start_row += fetched
+                starts = [next_start]
+                pages = [await self._query_page(
+                    site_url, request_body, next_start, page_size, timeout
+                )]
 
-        # Limitar a row_limit si es necesario
-        if row_limit and len(all_rows) > row_limit:
-            all_rows = all_rows[:row_limit]
+            for rows in pages:
+                # Las ventanas posteriores a una página incompleta están vacías
+                last_page_full = bool(rows) and len(rows) == page_size
+                rows = rows[:remaining]
+                remaining -= len(rows)
+                if rows:
+                    yield rows
+                if not last_page_full or remaining <= 0:
+                    break
+
+            # Condición de parada: sin fetch_all, solo una página (como antes)
+            if not fetch_all:
+                break
+            next_start = starts[-1] + page_size
 
-        # Formatear la respuesta
-        formatted_response = self._format_search_analytics({"rows": all_rows}, dimensions or [])
-        return formatted_response
-    
     def _format_search_analytics(
             self, response: Dict[str, Any], dimensions: List[str]
     ) -> Dict[str, Any]:
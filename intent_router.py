@@ -0,0 +1,239 @@
+# Enrutador determinista de preguntas frecuentes a comandos de gsc_cli
+
+import re
+import unicodedata
+from datetime import date, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+# Los datos de Search Console llegan con unos dos días de retraso
+DATA_DELAY_DAYS = 2
+DEFAULT_MONTHS = 6
+
+MONTHS = {
+    "enero": 1, "febrero": 2, "marzo": 3, "abril": 4, "mayo": 5, "junio": 6,
+    "julio": 7, "agosto": 8, "septiembre": 9, "setiembre": 9, "octubre": 10,
+    "noviembre": 11, "diciembre": 12,
+    "january": 1, "february": 2, "march": 3, "april": 4, "may": 5, "june": 6,
+    "july": 7, "august": 8, "september": 9, "october": 10, "november": 11,
+    "december": 12,
+}
+
+NUMBERS = {
+    "un": 1, "una": 1, "uno": 1, "dos": 2, "tres": 3, "cuatro": 4, "cinco": 5,
+    "seis": 6, "siete": 7, "ocho": 8, "nueve": 9, "diez": 10, "once": 11, "doce": 12,
+    "one": 1, "two": 2, "three": 3, "four": 4, "five": 5, "six": 6, "twelve": 12,
+}
+
+# Días que se cuentan por cada unidad en "últimos N <unidad>"
+UNITS = {
+    "dia": 1, "dias": 1, "day": 1, "days": 1,
+    "semana": 7, "semanas": 7, "week": 7, "weeks": 7,
+    "mes": 30, "meses": 30, "month": 30, "months": 30,
+    "ano": 365, "anos": 365, "year": 365, "years": 365,
+}
+
+# Palabras que identifican cada dimensión de la API
+DIMENSION_WORDS = [
+    ("query", ("queries", "query", "consultas", "consulta", "keywords", "keyword", "palabras clave", "busquedas", "terminos")),
+    ("page", ("paginas", "pagina", "pages", "page", "urls", "url")),
+    ("country", ("paises", "pais", "countries", "country")),
+    ("device", ("dispositivos", "dispositivo", "devices", "device")),
+    ("date", ("por dia", "diario", "diaria", "evolucion", "tendencia", "daily", "per day", "trend")),
+]
+
+SEARCH_TYPE_WORDS = [
+    ("image", ("imagenes", "images", "image search")),
+    ("video", ("videos", "video")),
+    ("googleNews", ("google news", "noticias", "news")),
+    ("discover", ("discover",)),
+]
+
+# Peticiones que el enrutador no sabe traducir (filtros, comparativas...):
+# se dejan al LLM
+AMBIGUOUS_WORDS = (
+    "compar", " vs ", "versus", "frente a", "contenga", "contengan", "contain",
+    "incluya", "incluyan", "filtr", "excepto", "sin contar", "que empiece",
+    "por que", "why", "movil", "mobile", "desktop", "escritorio", "tablet",
+)
+
+# Rankings por variación o umbrales de métricas: el enrutador solo sabe pedir
+# las filas tal cual, así que también se dejan al LLM
+METRIC_FILTER_WORDS = (
+    "caido", "caida", "caidas", "subido", "subida", "bajado", "crecido", "perdido", "ganado",
+    "mas de", "menos de", "mayor", "menor", "clics", "clicks", "impresiones", "impressions",
+    "ctr", "posicion", "position", "dropped", "drop", "fell", "grown", "lost", "gained",
+    "more than", "less than",
+)
+
+# La frase entera tiene que ser una petición de la lista: verbo al principio,
+# el sustantivo tras artículos o posesivos, y como mucho un final tipo "tengo"
+_LIST_SITES = re.compile(
+    r"^(?:list(?:ar|a|ame)?|muestra(?:me)?|ver|dame|cuales|que|show|which|what|enumera)"
+    r"(?:\s+(?:me|el|la|los|las|mi|mis|tu|tus|todos|todas|son|hay|all|my|the|are))*"
+    r"\s+(?:sites?|sitios?|propiedades|properties|dominios)"
+    r"(?:\s+(?:tengo|hay|disponibles|do|i|have|available|en|de|in|search|console|gsc))*$"
+)
+# Menciones de fechas; si parse_date_range no entiende ninguna, la pregunta va
+# al LLM en lugar de usar el rango por defecto
+_DATE_HINT = re.compile(
+    r"\b(?:" + "|".join(list(MONTHS) + list(UNITS)) + r"|(?:19|20)\d{2}|ayer|hoy|yesterday|today|trimestre|quarter)\b"
+)
+# Palabras de la dimensión date que no hablan de un rango
+_DATE_DIMENSION = re.compile(r"\b(?:por dia|per day)\b")
+_LAST_N = re.compile(r"\b(?:ultim[oa]s?|last|past|pasad[oa]s?)\s+(\d+|[a-z]+)?\s*(" + "|".join(UNITS) + r")\b")
+_RANGE = re.compile(
+    r"\b(?:de|desde|entre|from)?\s*([a-z]+)\s+(?:de(?:l)?\s+)?(\d{4})\s+(?:a|al|hasta|y|to|-)\s+([a-z]+)\s+(?:de(?:l)?\s+)?(\d{4})\b"
+)
+_MONTH = re.compile(r"\b([a-z]+)\s+(?:de(?:l)?\s+)?(\d{4})\b")
+_TOP_N = re.compile(r"\b(?:top|primer[oa]s|mejores|best)\s+(\d+)\b|\b(\d+)\s+(?:mejores|primer[oa]s)\b")
+
+
+def normalize_text(text: str) -> str:
+    """
+    Texto en minúsculas y sin tildes, para comparar palabras clave.
+    """
+    text = unicodedata.normalize("NFKD", text.lower())
+    return "".join(c for c in text if not unicodedata.combining(c))
+
+
+def _today(today: Optional[date]) -> date:
+    return today or date.today()
+
+
+def default_date_range(today: Optional[date] = None) -> Tuple[str, str]:
+    """
+    Últimos 6 meses, terminando hace 2 días.
+    """
+    end = _today(today) - timedelta(days=DATA_DELAY_DAYS)
+    start = end - timedelta(days=DEFAULT_MONTHS * 30)
+    return (start.isoformat(), end.isoformat())
+
+
+def _month_end(year: int, month: int) -> date:
+    if month == 12:
+        return date(year, 12, 31)
+    return date(year, month + 1, 1) - timedelta(days=1)
+
+
+def parse_date_range(text: str, today: Optional[date] = None) -> Optional[Tuple[str, str]]:
+    """
+    Rango de fechas mencionado en lenguaje natural, o None si no hay ninguno.
+
+    Entiende "últimos 3 meses", "last 2 weeks", "de enero 2025 a marzo 2025" y
+    "en febrero de 2025". El final del rango nunca pasa de hace 2 días.
+
+    Returns:
+        Optional[Tuple[str, str]]: (start_date, end_date) en formato YYYY-MM-DD
+    """
+    text = normalize_text(text)
+    max_end = _today(today) - timedelta(days=DATA_DELAY_DAYS)
+
+    match = _LAST_N.search(text)
+    if match:
+        amount = match.group(1)
+        if amount is None:
+            count = 1
+        elif amount.isdigit():
+            count = int(amount)
+        elif amount in NUMBERS:
+            count = NUMBERS[amount]
+        else:
+            count = None
+        if count:
+            start = max_end - timedelta(days=count * UNITS[match.group(2)])
+            return (start.isoformat(), max_end.isoformat())
+
+    match = _RANGE.search(text)
+    if match and match.group(1) in MONTHS and match.group(3) in MONTHS:
+        start = date(int(match.group(2)), MONTHS[match.group(1)], 1)
+        end = _month_end(int(match.group(4)), MONTHS[match.group(3)])
+        if start <= end:
+            return (start.isoformat(), min(end, max_end).isoformat())
+
+    for month_name, year in _MONTH.findall(text):
+        if month_name in MONTHS:
+            start = date(int(year), MONTHS[month_name], 1)
+            end = _month_end(int(year), MONTHS[month_name])
+            return (start.isoformat(), min(end, max_end).isoformat())
+    return None
+
+
+def _contains(text: str, words) -> bool:
+    return any(re.search(r"\b" + re.escape(word) + r"\b", text) for word in words)
+
+
+def parse_dimensions(text: str) -> List[str]:
+    """
+    Dimensiones mencionadas en el texto, en el orden de DIMENSION_WORDS.
+    """
+    text = normalize_text(text)
+    return [dim for dim, words in DIMENSION_WORDS if _contains(text, words)]
+
+
+def route(
+    text: str,
+    site_url: Optional[str] = None,
+    today: Optional[date] = None,
+) -> Optional[Dict[str, Any]]:
+    """
+    Traduce una pregunta frecuente a los argumentos de un comando de gsc_cli
+    sin pasar por el LLM.
+
+    Args:
+        text: Pregunta del usuario
+        site_url: Propiedad seleccionada; sin ella solo se reconoce list-sites
+        today: Fecha de referencia para los rangos relativos
+
+    Returns:
+        Optional[Dict[str, Any]]: Argumentos del comando (clave "command" más
+        los flags), o None si la pregunta es ambigua y debe resolverla el LLM
+    """
+    normalized = f" {normalize_text(text)} "
+    if any(word in normalized for word in AMBIGUOUS_WORDS) or _contains(normalized, METRIC_FILTER_WORDS):
+        return None
+    date_range = parse_date_range(normalized, today)
+    if date_range is None and _DATE_HINT.search(_DATE_DIMENSION.sub(" ", normalized)):
+        return None
+    words = " ".join(re.findall(r"[a-z0-9]+", normalized))
+    if _LIST_SITES.match(words):
+        return {"command": "list-sites"}
+    if not site_url:
+        return None
+
+    dimensions = parse_dimensions(normalized)
+    if not dimensions or dimensions == ["date"]:
+        return None
+
+    search_type = "web"
+    for value, words in SEARCH_TYPE_WORDS:
+        if _contains(normalized, words):
+            search_type = value
+            break
+
+    start_date, end_date = date_range or default_date_range(today)
+    intent: Dict[str, Any] = {
+        "command": "search-analytics",
+        "site_url": site_url,
+        "start_date": start_date,
+        "end_date": end_date,
+        "dimensions": dimensions,
+        "type": search_type,
+    }
+    top = _TOP_N.search(normalized)
+    if top:
+        intent["row_limit"] = int(top.group(1) or top.group(2))
+    return intent
+
+
+def to_command(intent: Dict[str, Any]) -> str:
+    """
+    Línea de comando de gsc_cli equivalente a los argumentos de route().
+    """
+    parts = [intent["command"]]
+    for key, value in intent.items():
+        if key == "command" or value is None:
+            continue
+        if isinstance(value, list):
+            value = ",".join(value)
+        parts.append(f"--{key.replace('_', '-')} {value}")
+    return " ".join(parts)
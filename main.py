@@ -8,9 +8,6 @@ from typing import Optional
 
 import typer
 
-from config import Config
-from server import GSCMCPServer
-
 
 app = typer.Typer(
     name="mcp-server-gsc",
@@ -27,6 +24,30 @@ def main(
         help="Path to the Google Cloud credentials file. If not provided, "
         "the GOOGLE_APPLICATION_CREDENTIALS environment variable will be used.",
     ),
+    transport: str = typer.Option(
+        "stdio",
+        "--transport",
+        "-t",
+        help="Transport: stdio (one client) or http (streamable HTTP on /mcp and SSE "
+        "on /sse, many concurrent sessions sharing one process).",
+    ),
+    host: Optional[str] = typer.Option(
+        None,
+        "--host",
+        help="Interface for the http transport (default: GSC_SERVER_HOST or 127.0.0.1).",
+    ),
+    port: Optional[int] = typer.Option(
+        None,
+        "--port",
+        "-p",
+        help="Port for the http transport (default: GSC_SERVER_PORT or 8080).",
+    ),
+    stub: bool = typer.Option(
+        False,
+        "--stub",
+        help="Answer from the local fake backend in stub_gsc.py instead of the API; "
+        "no credentials needed.",
+    ),
     verbose: bool = typer.Option(
         False,
         "--verbose",
@@ -35,13 +56,26 @@ def main(
     ),
 ) -> None:
     """Run the MCP server."""
+    # Imported here so that --help and option errors don't load pydantic,
+    # the Google API client and the MCP stack
+    from config import Config
+    from server import TRANSPORTS, GSCMCPServer
+
+    if transport not in TRANSPORTS:
+        typer.echo(f"Error: transport must be one of: {', '.join(TRANSPORTS)}", err=True)
+        raise typer.Exit(code=1)
+
     # Create server configuration
     config = Config(
         google_credentials_path=(str(credentials_path) if credentials_path else None),
+        **({"stub_gsc": True} if stub else {}),
     )
     
     # Check for credentials
-    if not config.google_credentials:
+    if config.stub_gsc:
+        if verbose:
+            typer.echo("Starting MCP server with the stub GSC backend", err=True)
+    elif not config.google_credentials:
         typer.echo(
             "Error: No se han encontrado las credenciales de GSC. "
             "Establezca la variable de entorno GOOGLE_APPLICATION_CREDENTIALS "
@@ -49,22 +83,20 @@ def main(
             err=True,
         )
         raise typer.Exit(code=1)
-    
-    if not config.google_credentials.exists():
+    elif not config.google_credentials.exists():
         typer.echo(
             f"Error: Credentials file not found: {config.google_credentials}",
             err=True,
         )
         raise typer.Exit(code=1)
-    
-    if verbose:
+    elif verbose:
         typer.echo(f"Starting MCP server with credentials: {config.google_credentials}")
     
     # Create server instance
     server = GSCMCPServer(config)
     
     # Run the server
-    asyncio.run(server.run())
+    asyncio.run(server.run(transport, host, port))
 
 
 if __name__ == "__main__":
@@ -0,0 +1,69 @@
+# Consultas repartidas entre varias propiedades de Search Console
+
+import asyncio
+import fnmatch
+import re
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+
+def select_sites(site_urls: Iterable[str], pattern: Optional[str] = None) -> List[str]:
+    """
+    Propiedades que coinciden con un patrón.
+
+    Args:
+        site_urls: URLs de las propiedades (por ejemplo de SiteInventory.site_urls)
+        pattern: Patrón glob (`*tienda*`, `sc-domain:*`) o expresión regular con el
+            prefijo `re:` (`re:^https://(www\\.)?ejemplo`). Sin patrón se devuelven todas.
+
+    Returns:
+        List[str]: Propiedades seleccionadas, en el orden recibido
+    """
+    site_urls = list(site_urls)
+    if not pattern:
+        return site_urls
+    if pattern.startswith("re:"):
+        try:
+            regex = re.compile(pattern[3:], re.IGNORECASE)
+        except re.error as e:
+            raise ValueError(f"Expresión regular inválida {pattern[3:]}: {e}")
+        return [site for site in site_urls if regex.search(site)]
+    return [site for site in site_urls if fnmatch.fnmatchcase(site.lower(), pattern.lower())]
+
+
+async def fan_out(
+    site_urls: List[str],
+    fetch: Callable[[str], Awaitable[Any]],
+    concurrency: int = 4,
+) -> AsyncIterator[Tuple[str, Any, Optional[Exception]]]:
+    """
+    Ejecuta `fetch` para cada propiedad con como máximo `concurrency` a la vez y
+    entrega los resultados según terminan. El error de una propiedad no detiene
+    las demás: se entrega junto a su URL.
+
+    Yields:
+        Tuple[str, Any, Optional[Exception]]: (propiedad, resultado, error)
+    """
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async def run(site_url: str) -> Tuple[str, Any, Optional[Exception]]:
+        async with semaphore:
+            try:
+                return site_url, await fetch(site_url), None
+            except Exception as e:
+                return site_url, None, e
+
+    tasks = [asyncio.ensure_future(run(site_url)) for site_url in site_urls]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        # Si quien consume deja de iterar, no seguir consultando el resto
+        for task in tasks:
+            task.cancel()
+
+
+def tag_rows(rows: Iterable[Dict[str, Any]], site_url: str) -> Iterable[Dict[str, Any]]:
+    """
+    Añade la propiedad (`siteUrl`) a cada fila, para combinar varias en una tabla.
+    """
+    return ({"siteUrl": site_url, **row} for row in rows)
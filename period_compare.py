@@ -0,0 +1,132 @@
+# Comparación de dos periodos de Search Analytics por claves de dimensiones
+
+import heapq
+from datetime import date, timedelta
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from compact_rows import SearchAnalyticsRows
+
+COMPARE_MODES = ("previous", "year")
+
+
+def _parse(value: str) -> date:
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise ValueError("Las fechas deben estar en formato YYYY-MM-DD")
+
+
+def _year_before(day: date) -> date:
+    try:
+        return day.replace(year=day.year - 1)
+    except ValueError:
+        # 29 de febrero
+        return day.replace(year=day.year - 1, day=28)
+
+
+def comparison_period(start_date: str, end_date: str, compare_to: str = "previous") -> Tuple[str, str]:
+    """
+    Periodo con el que comparar un rango de fechas.
+
+    Args:
+        start_date: Fecha de inicio (YYYY-MM-DD)
+        end_date: Fecha de fin (YYYY-MM-DD), incluida
+        compare_to: previous (los mismos días justo antes) o year (las mismas
+            fechas del año anterior)
+
+    Returns:
+        Tuple[str, str]: (inicio, fin) del periodo de comparación
+    """
+    if compare_to not in COMPARE_MODES:
+        raise ValueError(
+            f"Comparación inválida {compare_to}. Debe ser una de: {', '.join(COMPARE_MODES)}"
+        )
+    start = _parse(start_date)
+    end = _parse(end_date)
+    if start > end:
+        raise ValueError("La fecha de inicio no puede ser posterior a la fecha de fin")
+    if compare_to == "year":
+        return (_year_before(start).isoformat(), _year_before(end).isoformat())
+    length = end - start + timedelta(days=1)
+    return ((start - length).isoformat(), (end - length).isoformat())
+
+
+def _key_columns(rows: SearchAnalyticsRows, dimensions: List[str]):
+    columns = [rows.columns[dim] for dim in dimensions]
+    if not columns:
+        return iter([()] * len(rows))
+    return zip(*columns)
+
+
+def _side(rows: SearchAnalyticsRows, index: Optional[int]) -> Tuple[int, int, Optional[float], Optional[float]]:
+    if index is None:
+        return (0, 0, None, None)
+    return (rows.clicks[index], rows.impressions[index], rows.ctr[index], rows.position[index])
+
+
+def _delta(current: Optional[float], previous: Optional[float]) -> Optional[float]:
+    if current is None or previous is None:
+        return None
+    return current - previous
+
+
+def compare_rows(
+    current: SearchAnalyticsRows,
+    previous: SearchAnalyticsRows,
+    dimensions: Optional[List[str]] = None,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Une dos resultados por sus claves de dimensiones (hash join) y entrega una
+    fila por clave con las métricas de ambos periodos y sus diferencias.
+
+    Solo se indexa el periodo anterior; el actual se recorre por columnas y las
+    filas se generan de una en una, así que se pueden escribir en streaming.
+    Primero salen las claves del periodo actual, en su orden (status "both" o
+    "new"), y después las que solo estaban en el anterior (status "lost").
+
+    Yields:
+        Dict[str, Any]: Fila con las dimensiones, cada métrica, su valor anterior
+        (`<métrica>Previous`), su diferencia (`<métrica>Delta`) y el status
+    """
+    dimensions = list(dimensions or [])
+    index = {key: i for i, key in enumerate(_key_columns(previous, dimensions))}
+    matched = bytearray(len(previous))
+
+    def build(key, now, before, status):
+        row = dict(zip(dimensions, key))
+        for metric, value, previous_value in zip(("clicks", "impressions", "ctr", "position"), now, before):
+            row[metric] = value
+            row[f"{metric}Previous"] = previous_value
+            row[f"{metric}Delta"] = _delta(value, previous_value) if metric in ("ctr", "position") else value - previous_value
+        row["status"] = status
+        return row
+
+    for i, key in enumerate(_key_columns(current, dimensions)):
+        j = index.get(key)
+        if j is not None:
+            matched[j] = 1
+        yield build(key, _side(current, i), _side(previous, j), "both" if j is not None else "new")
+
+    for key, j in index.items():
+        if not matched[j]:
+            yield build(key, _side(current, None), _side(previous, j), "lost")
+
+
+def period_totals(current: SearchAnalyticsRows, previous: SearchAnalyticsRows) -> Dict[str, Any]:
+    """
+    Totales de clics e impresiones de cada periodo y su diferencia.
+    """
+    totals = {}
+    for metric in ("clicks", "impressions"):
+        now = sum(getattr(current, metric))
+        before = sum(getattr(previous, metric))
+        totals[metric] = {"current": now, "previous": before, "delta": now - before}
+    return totals
+
+
+def top_changes(rows: Iterator[Dict[str, Any]], top_n: int) -> List[Dict[str, Any]]:
+    """
+    Las `top_n` filas con mayor variación de clics (en valor absoluto), sin
+    materializar el resto.
+    """
+    return heapq.nlargest(top_n, rows, key=lambda row: (abs(row["clicksDelta"]), abs(row["impressionsDelta"])))
@@ -0,0 +1,100 @@
+# Planificador de consultas por fragmentos de fechas para Search Analytics
+
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+SHARD_SIZES = {"day": 1, "week": 7}
+# Máximo de filas que se paginan por fragmento en el modo completo
+SHARD_ROW_LIMIT = 1_000_000
+
+
+def plan_date_shards(
+    start_date: str, end_date: str, shard_size: str = "day"
+) -> List[Tuple[str, str]]:
+    """
+    Divide un rango de fechas en fragmentos consecutivos.
+
+    Args:
+        start_date: Fecha de inicio (YYYY-MM-DD)
+        end_date: Fecha de fin (YYYY-MM-DD), incluida
+        shard_size: Tamaño de cada fragmento (day, week)
+
+    Returns:
+        List[Tuple[str, str]]: Pares (inicio, fin) de cada fragmento, ambos incluidos
+    """
+    if shard_size not in SHARD_SIZES:
+        raise ValueError(
+            f"Tamaño de fragmento inválido {shard_size}. Debe ser uno de: {', '.join(SHARD_SIZES)}"
+        )
+    try:
+        start = datetime.strptime(start_date, "%Y-%m-%d").date()
+        end = datetime.strptime(end_date, "%Y-%m-%d").date()
+    except ValueError:
+        raise ValueError("Las fechas deben estar en formato YYYY-MM-DD")
+    if start > end:
+        raise ValueError("La fecha de inicio no puede ser posterior a la fecha de fin")
+
+    step = timedelta(days=SHARD_SIZES[shard_size])
+    shards = []
+    current = start
+    while current <= end:
+        shard_end = min(current + step - timedelta(days=1), end)
+        shards.append((current.isoformat(), shard_end.isoformat()))
+        current = shard_end + timedelta(days=1)
+    return shards
+
+
+def shard_dimensions(dimensions: Optional[List[str]], shard_size: str) -> List[str]:
+    """
+    Dimensiones que se piden en cada fragmento.
+
+    En fragmentos de más de un día se añade la dimensión `date`, de modo que la API
+    devuelve las filas principales de cada día y no solo las de la semana completa.
+    """
+    dimensions = list(dimensions or [])
+    if SHARD_SIZES[shard_size] > 1 and "date" not in dimensions:
+        dimensions.append("date")
+    return dimensions
+
+
+def merge_rows(
+    shards: Iterable[Iterable[Dict[str, Any]]],
+    dimensions: Optional[List[str]],
+) -> List[Dict[str, Any]]:
+    """
+    Une filas formateadas de varios fragmentos agrupando por las dimensiones pedidas.
+
+    Los clics e impresiones se suman; el CTR se recalcula como clics / impresiones
+    y la posición es la media ponderada por impresiones.
+
+    Args:
+        shards: Filas formateadas de cada fragmento
+        dimensions: Dimensiones que identifican cada fila del resultado
+
+    Returns:
+        List[Dict[str, Any]]: Filas combinadas, ordenadas por clics descendentes
+    """
+    dimensions = list(dimensions or [])
+    totals: Dict[Tuple, List[float]] = {}
+    for rows in shards:
+        for row in rows:
+            key = tuple(row.get(dim) for dim in dimensions)
+            impressions = row.get("impressions", 0)
+            acc = totals.get(key)
+            if acc is None:
+                totals[key] = [row.get("clicks", 0), impressions, row.get("position", 0.0) * impressions]
+            else:
+                acc[0] += row.get("clicks", 0)
+                acc[1] += impressions
+                acc[2] += row.get("position", 0.0) * impressions
+
+    merged = []
+    for key, (clicks, impressions, weighted_position) in totals.items():
+        row = dict(zip(dimensions, key))
+        row["clicks"] = clicks
+        row["impressions"] = impressions
+        row["ctr"] = clicks / impressions if impressions else 0.0
+        row["position"] = weighted_position / impressions if impressions else 0.0
+        merged.append(row)
+    merged.sort(key=lambda r: (r["clicks"], r["impressions"]), reverse=True)
+    return merged
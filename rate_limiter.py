@@ -0,0 +1,208 @@
+# Limitador de peticiones a la API de Search Console: cuotas, concurrencia adaptativa y reintentos
+
+import asyncio
+import json
+import random
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, List, Optional
+
+from googleapiclient.errors import HttpError
+
+# Estados HTTP que indican saturación temporal y se reintentan
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+# Motivos de un 403 que son límites de cuota (y no falta de permisos)
+RATE_LIMIT_REASONS = {"rateLimitExceeded", "userRateLimitExceeded", "quotaExceeded"}
+
+
+def _normalize_reason(reason: str) -> str:
+    # rateLimitExceeded (errors[]) y RATE_LIMIT_EXCEEDED (ErrorInfo de details[]) son el mismo motivo
+    return reason.replace("_", "").lower()
+
+
+_RATE_LIMIT_KEYS = {_normalize_reason(reason) for reason in RATE_LIMIT_REASONS}
+
+
+def _error_reasons(error: HttpError) -> List[str]:
+    """
+    Motivos de un error de la API: primero los de error.errors[] del cuerpo JSON
+    y después los de error_details (que googleapiclient toma de error.details,
+    donde Google pone el google.rpc.ErrorInfo).
+    """
+    reasons = []
+    try:
+        body = json.loads(error.content.decode("utf-8") if isinstance(error.content, bytes) else error.content)
+        reasons += [item["reason"] for item in body["error"]["errors"] if isinstance(item, dict) and item.get("reason")]
+    except (AttributeError, KeyError, TypeError, ValueError):
+        pass
+    details = getattr(error, "error_details", None)
+    if isinstance(details, list):
+        reasons += [item["reason"] for item in details if isinstance(item, dict) and item.get("reason")]
+    return reasons
+
+
+class GSCError(Exception):
+    """
+    Error de una llamada a la API de Search Console.
+
+    Attributes:
+        status: Código HTTP de la respuesta, si lo hay
+        reason: Motivo indicado por la API (por ejemplo rateLimitExceeded)
+    """
+
+    def __init__(self, message: str, status: Optional[int] = None, reason: Optional[str] = None):
+        super().__init__(message)
+        self.status = status
+        self.reason = reason
+
+    @property
+    def retryable(self) -> bool:
+        return self.status in RETRYABLE_STATUS or (
+            self.status == 403 and self.reason is not None and _normalize_reason(self.reason) in _RATE_LIMIT_KEYS
+        )
+
+    @classmethod
+    def from_http_error(cls, error: HttpError) -> "GSCError":
+        status = getattr(error, "status_code", None) or int(getattr(error.resp, "status", 0) or 0) or None
+        reasons = _error_reasons(error)
+        # Si alguno de los motivos es de cuota, ese es el que decide si se reintenta
+        reason = next(
+            (reason for reason in reasons if _normalize_reason(reason) in _RATE_LIMIT_KEYS),
+            reasons[0] if reasons else None,
+        )
+        message = error.reason if hasattr(error, "reason") and error.reason else str(error)
+        return cls(f"Error {status} de la API de Search Console: {message}", status=status, reason=reason)
+
+
+def backoff_delay(attempt: int, base: float = 1.0, cap: float = 32.0) -> float:
+    """
+    Espera antes del reintento `attempt` (0, 1, 2...): backoff exponencial con
+    jitter completo, para que los reintentos simultáneos no se sincronicen.
+    """
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+class TokenBucket:
+    """
+    Cubo de tokens: permite ráfagas de hasta `capacity` peticiones y un ritmo
+    sostenido de `rate` peticiones por segundo.
+    """
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        # Las esperas se atienden por orden de llegada
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self, tokens: float = 1.0) -> None:
+        """
+        Espera a que haya `tokens` disponibles y los consume. Una petición mayor
+        que la capacidad (por ejemplo un lote) espera a que el cubo esté lleno y
+        deja el saldo en negativo, de modo que las siguientes esperan la diferencia.
+        """
+        needed = min(tokens, self.capacity)
+        async with self._lock:
+            self._refill()
+            while self._tokens < needed:
+                await asyncio.sleep((needed - self._tokens) / self.rate)
+                self._refill()
+            self._tokens -= tokens
+
+
+class AdaptiveConcurrency:
+    """
+    Límite de peticiones en curso que se ajusta con AIMD: crece en una unidad por
+    cada "ventana" de respuestas correctas y se reduce a la mitad al recibir un
+    error de cuota (como mucho una vez por `cooldown` segundos, para que una
+    ráfaga de 429 de la misma ventana cuente como una sola señal).
+    """
+
+    def __init__(self, initial: int, minimum: int = 1, maximum: Optional[int] = None, cooldown: float = 1.0):
+        self.minimum = max(1, minimum)
+        self.maximum = max(self.minimum, maximum if maximum is not None else initial)
+        self.limit = float(min(max(initial, self.minimum), self.maximum))
+        self.cooldown = cooldown
+        self.in_flight = 0
+        self._last_decrease = 0.0
+        self._condition = asyncio.Condition()
+
+    async def acquire(self) -> None:
+        async with self._condition:
+            await self._condition.wait_for(lambda: self.in_flight < int(self.limit))
+            self.in_flight += 1
+
+    async def release(self) -> None:
+        async with self._condition:
+            self.in_flight -= 1
+            self._condition.notify_all()
+
+    def on_success(self) -> None:
+        self.limit = min(self.maximum, self.limit + 1 / self.limit)
+
+    def on_throttle(self) -> None:
+        now = time.monotonic()
+        if now - self._last_decrease >= self.cooldown:
+            self.limit = max(self.minimum, self.limit / 2)
+            self._last_decrease = now
+
+
+class RateLimiter:
+    """
+    Limitador compartido por todas las llamadas de un GSCClient: un cubo de tokens
+    por proyecto, uno por propiedad y la concurrencia adaptativa.
+    """
+
+    def __init__(
+        self,
+        project_qpm: float = 40000,
+        site_qpm: float = 1200,
+        max_concurrency: int = 8,
+    ):
+        """
+        Args:
+            project_qpm: Peticiones por minuto del proyecto de Google Cloud
+            site_qpm: Peticiones por minuto a cada propiedad
+            max_concurrency: Peticiones en curso como máximo (el límite adaptativo
+                empieza aquí y baja al recibir errores de cuota)
+        """
+        self.site_qpm = site_qpm
+        self.project_bucket = TokenBucket(project_qpm / 60)
+        self._site_buckets: Dict[str, TokenBucket] = {}
+        self.concurrency = AdaptiveConcurrency(max_concurrency, maximum=max_concurrency)
+
+    def _site_bucket(self, site_url: str) -> TokenBucket:
+        bucket = self._site_buckets.get(site_url)
+        if bucket is None:
+            bucket = self._site_buckets[site_url] = TokenBucket(self.site_qpm / 60)
+        return bucket
+
+    @asynccontextmanager
+    async def slot(self, site_url: Optional[str] = None, calls: int = 1) -> AsyncIterator[None]:
+        """
+        Espera a que la petición quepa en las cuotas y en el límite de concurrencia.
+
+        Args:
+            site_url: Propiedad a la que se cuenta la petición
+            calls: Llamadas a la API que incluye la petición (más de una en un lote)
+        """
+        if site_url:
+            await self._site_bucket(site_url).acquire(calls)
+        await self.project_bucket.acquire(calls)
+        await self.concurrency.acquire()
+        try:
+            yield
+        finally:
+            await self.concurrency.release()
+
+    def record_success(self) -> None:
+        self.concurrency.on_success()
+
+    def record_throttle(self) -> None:
+        self.concurrency.on_throttle()
@@ -0,0 +1,159 @@
+# Caché persistente en disco de las respuestas de Search Analytics
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+import zlib
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+# Los datos de GSC se consideran definitivos a partir de este número de días
+SETTLED_AFTER_DAYS = 3
+
+
+def cache_key(site_url: str, request_body: Dict[str, Any]) -> str:
+    """
+    Clave normalizada de una consulta: hash del siteUrl y del cuerpo de la petición,
+    ignorando los campos vacíos y el orden de las claves.
+    """
+    body = {k: v for k, v in request_body.items() if v not in (None, [], "")}
+    payload = json.dumps(
+        {"siteUrl": site_url, "body": body}, sort_keys=True, separators=(",", ":")
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def is_settled(end_date: str, today: Optional[date] = None) -> bool:
+    """
+    Indica si todos los días hasta end_date son ya definitivos en Search Console.
+    """
+    today = today or date.today()
+    end = datetime.strptime(end_date, "%Y-%m-%d").date()
+    return end <= today - timedelta(days=SETTLED_AFTER_DAYS)
+
+
+class ResponseCache:
+    """
+    Caché SQLite de respuestas crudas de la API con expulsión LRU por tamaño.
+
+    Las respuestas de días ya definitivos se guardan sin caducidad; las que incluyen
+    días recientes caducan tras `fresh_ttl` segundos.
+    """
+
+    def __init__(self, path: Path, max_bytes: int = 256 * 1024 * 1024, fresh_ttl: float = 3600):
+        """
+        Args:
+            path: Ruta al fichero SQLite de la caché
+            max_bytes: Tamaño máximo (comprimido) de las respuestas guardadas
+            fresh_ttl: Segundos de validez de las respuestas con días no definitivos
+        """
+        self.path = Path(path).expanduser()
+        self.max_bytes = max_bytes
+        self.fresh_ttl = fresh_ttl
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), timeout=10, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                site_url TEXT NOT NULL,
+                payload BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                expires_at REAL,
+                last_access REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS responses_last_access ON responses (last_access)"
+        )
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        Devuelve la respuesta guardada para la clave, o None si no existe o ha caducado.
+        """
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT payload, expires_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            payload, expires_at = row
+            if expires_at is not None and expires_at <= now:
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._conn.commit()
+                return None
+            self._conn.execute(
+                "UPDATE responses SET last_access = ? WHERE key = ?", (now, key)
+            )
+            self._conn.commit()
+        return json.loads(zlib.decompress(payload))
+
+    def set(self, key: str, site_url: str, response: Dict[str, Any], settled: bool) -> None:
+        """
+        Guarda una respuesta y expulsa las menos usadas si se supera max_bytes.
+
+        Args:
+            key: Clave de la consulta (ver cache_key)
+            site_url: Sitio al que pertenece la respuesta
+            response: Respuesta cruda de la API
+            settled: True si la respuesta solo contiene días definitivos
+        """
+        now = time.time()
+        payload = zlib.compress(json.dumps(response, separators=(",", ":")).encode("utf-8"))
+        expires_at = None if settled else now + self.fresh_ttl
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, site_url, payload, size, expires_at, last_access) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, site_url, payload, len(payload), expires_at, now),
+            )
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self) -> None:
+        """
+        Elimina las entradas caducadas y, si hace falta, las de acceso más antiguo.
+        """
+        self._conn.execute(
+            "DELETE FROM responses WHERE expires_at IS NOT NULL AND expires_at <= ?",
+            (time.time(),),
+        )
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        to_delete = []
+        for key, size in self._conn.execute(
+            "SELECT key, size FROM responses ORDER BY last_access"
+        ):
+            to_delete.append((key,))
+            total -= size
+            if total <= self.max_bytes:
+                break
+        self._conn.executemany("DELETE FROM responses WHERE key = ?", to_delete)
+
+    def clear(self, site_url: Optional[str] = None) -> int:
+        """
+        Vacía la caché completa o solo la de un sitio.
+
+        Returns:
+            int: Número de respuestas eliminadas
+        """
+        with self._lock:
+            if site_url:
+                cursor = self._conn.execute("DELETE FROM responses WHERE site_url = ?", (site_url,))
+            else:
+                cursor = self._conn.execute("DELETE FROM responses")
+            self._conn.commit()
+        return cursor.rowcount
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,165 @@
+# Resultados recientes de Search Analytics en memoria, para paginarlos y publicarlos
+# como recursos MCP sin volver a consultar la API
+
+import base64
+import secrets
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, quote, unquote, urlsplit
+
+from compact_rows import SearchAnalyticsRows
+
+RESOURCE_SCHEME = "gsc"
+# Plantilla de las URIs de los resultados publicados como recursos MCP
+RESOURCE_TEMPLATE = "gsc://{site}/{range}/{dimensions}"
+# Segmento de dimensiones de un resultado sin dimensiones (solo totales)
+NO_DIMENSIONS = "totals"
+
+# Bytes aproximados por fila sin contar los textos: 4 métricas de 8 bytes y la
+# referencia de cada dimensión en su lista
+ROW_BYTES = 32
+REFERENCE_BYTES = 8
+
+
+def estimate_bytes(rows: SearchAnalyticsRows) -> int:
+    """
+    Memoria aproximada de un resultado compacto. Los textos de las dimensiones
+    están internados, así que cada valor distinto se cuenta una sola vez.
+    """
+    size = len(rows) * (ROW_BYTES + REFERENCE_BYTES * len(rows.dimensions))
+    for column in rows.columns.values():
+        size += sum(len(value) for value in set(column) if value)
+    return size
+
+
+def encode_cursor(result_id: str, offset: int) -> str:
+    """
+    Cursor opaco que apunta a la fila `offset` de un resultado guardado.
+    """
+    return base64.urlsafe_b64encode(f"{result_id}:{offset}".encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[str, int]:
+    """
+    Devuelve (id del resultado, fila) de un cursor de encode_cursor.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        result_id, offset = base64.urlsafe_b64decode(padded.encode()).decode().rsplit(":", 1)
+        return result_id, int(offset)
+    except (ValueError, UnicodeDecodeError):
+        raise ValueError(f"Cursor inválido: {cursor}")
+
+
+def resource_uri(
+    site_url: str,
+    start_date: str,
+    end_date: str,
+    dimensions: Optional[List[str]] = None,
+    search_type: Optional[str] = None,
+) -> str:
+    """
+    URI de recurso de un resultado: gsc://{site}/{inicio}..{fin}/{dimensiones},
+    con la propiedad codificada y ?type= si no es una búsqueda web.
+    """
+    uri = (
+        f"{RESOURCE_SCHEME}://{quote(site_url, safe='')}/{start_date}..{end_date}/"
+        f"{','.join(dimensions) if dimensions else NO_DIMENSIONS}"
+    )
+    if search_type and search_type != "web":
+        uri += f"?type={quote(search_type, safe='')}"
+    return uri
+
+
+def parse_resource_uri(uri: str) -> Dict[str, Any]:
+    """
+    Parámetros de consulta (siteUrl, startDate, endDate, dimensions, type) de una
+    URI de resource_uri.
+    """
+    parts = urlsplit(uri)
+    segments = parts.path.strip("/").split("/")
+    if parts.scheme != RESOURCE_SCHEME or not parts.netloc or len(segments) != 2 or ".." not in segments[0]:
+        raise ValueError(f"URI de recurso inválida {uri}: debe ser {RESOURCE_TEMPLATE}")
+    start_date, end_date = segments[0].split("..", 1)
+    dimensions = [] if segments[1] == NO_DIMENSIONS else [dim for dim in segments[1].split(",") if dim]
+    search_type = parse_qs(parts.query).get("type", [None])[0]
+    return {
+        "siteUrl": unquote(parts.netloc),
+        "startDate": start_date,
+        "endDate": end_date,
+        "dimensions": dimensions,
+        "type": search_type,
+    }
+
+
+class ResultStore:
+    """
+    Resultados compactos (SearchAnalyticsRows) por clave, con caducidad y un
+    límite de memoria aproximada: al superarlo se descartan los menos usados.
+    """
+
+    def __init__(self, max_bytes: int = 256 * 1024 * 1024, ttl: float = 3600):
+        """
+        Args:
+            max_bytes: Memoria aproximada máxima de los resultados guardados
+            ttl: Segundos durante los que se conserva cada resultado
+        """
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.total_bytes = 0
+        # clave -> (filas, bytes, momento en que se guardó)
+        self._entries: "OrderedDict[str, Tuple[SearchAnalyticsRows, int, float]]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: str) -> bool:
+        return self.get(key) is not None
+
+    def put(self, rows: SearchAnalyticsRows, key: Optional[str] = None) -> str:
+        """
+        Guarda un resultado y devuelve su clave (una nueva aleatoria si no se indica).
+        Un resultado mayor que max_bytes no se guarda, pero se devuelve su clave.
+        """
+        key = key or secrets.token_urlsafe(9)
+        self.discard(key)
+        size = estimate_bytes(rows)
+        if size <= self.max_bytes:
+            self._entries[key] = (rows, size, time.monotonic())
+            self.total_bytes += size
+            self._evict()
+        return key
+
+    def get(self, key: str) -> Optional[SearchAnalyticsRows]:
+        """
+        Resultado guardado con esa clave, o None si no existe o ha caducado.
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        rows, _, stored_at = entry
+        if time.monotonic() - stored_at > self.ttl:
+            self.discard(key)
+            return None
+        self._entries.move_to_end(key)
+        return rows
+
+    def keys(self, prefix: str = "") -> List[str]:
+        """
+        Claves vigentes que empiezan por `prefix`, de la más a la menos usada.
+        """
+        now = time.monotonic()
+        for key in [key for key, (_, _, stored_at) in self._entries.items() if now - stored_at > self.ttl]:
+            self.discard(key)
+        return [key for key in reversed(self._entries) if key.startswith(prefix)]
+
+    def discard(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.total_bytes -= entry[1]
+
+    def _evict(self) -> None:
+        while self.total_bytes > self.max_bytes and self._entries:
+            _, (_, size, _) = self._entries.popitem(last=False)
+            self.total_bytes -= size
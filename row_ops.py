@@ -0,0 +1,127 @@
+# Filtros de la API y post-proceso local (agrupar, ordenar, top-N) de filas de Search Analytics
+
+import heapq
+from typing import Any, Dict, List, Optional
+
+from compact_rows import SearchAnalyticsRows
+from query_planner import merge_rows
+
+# Dimensiones y operadores que admite dimensionFilterGroups
+FILTER_DIMENSIONS = ("page", "query", "country", "device", "searchAppearance")
+FILTER_OPERATORS = ("equals", "notEquals", "contains", "notContains", "includingRegex", "excludingRegex")
+METRICS = ("clicks", "impressions", "ctr", "position")
+SORT_ORDERS = ("descending", "ascending")
+
+
+def build_filter_groups(filters: Optional[List[Dict[str, Any]]]) -> Optional[List[Dict[str, Any]]]:
+    """
+    Convierte filtros {dimension, operator, expression} en el dimensionFilterGroups
+    de la API (un grupo "and"), para que Search Console solo devuelva las filas
+    que cumplen todos.
+
+    Args:
+        filters: Filtros; operator es equals si no se indica
+
+    Returns:
+        Optional[List[Dict[str, Any]]]: Grupos de filtros, o None sin filtros
+    """
+    if not filters:
+        return None
+    api_filters = []
+    for item in filters:
+        dimension = item.get("dimension")
+        operator = item.get("operator") or "equals"
+        expression = item.get("expression")
+        if dimension not in FILTER_DIMENSIONS:
+            raise ValueError(f"Dimensión de filtro inválida {dimension}. Debe ser una de: {', '.join(FILTER_DIMENSIONS)}")
+        if operator not in FILTER_OPERATORS:
+            raise ValueError(f"Operador de filtro inválido {operator}. Debe ser uno de: {', '.join(FILTER_OPERATORS)}")
+        if not isinstance(expression, str) or not expression:
+            raise ValueError(f"El filtro de {dimension} necesita una expresión")
+        # La API espera los países en ISO 3166-1 alfa-3 en minúsculas y los dispositivos en mayúsculas
+        if dimension == "country":
+            expression = expression.lower()
+        elif dimension == "device":
+            expression = expression.upper()
+        api_filters.append({"dimension": dimension, "operator": operator, "expression": expression})
+    return [{"groupType": "and", "filters": api_filters}]
+
+
+def parse_filter(value: str) -> Dict[str, str]:
+    """
+    Filtro escrito como "dimensión operador expresión" (por ejemplo
+    "page contains /blog/") o "dimensión expresión" para equals.
+    """
+    parts = value.split(None, 2)
+    if len(parts) == 2:
+        return {"dimension": parts[0], "operator": "equals", "expression": parts[1]}
+    if len(parts) == 3 and parts[1] in FILTER_OPERATORS:
+        return {"dimension": parts[0], "operator": parts[1], "expression": parts[2]}
+    raise ValueError(f"Filtro inválido '{value}': usa 'dimensión [operador] expresión'")
+
+
+def _take(rows: SearchAnalyticsRows, indexes: List[int]) -> SearchAnalyticsRows:
+    result = SearchAnalyticsRows(rows.dimensions, rows.response_aggregation_type)
+    for dim in rows.dimensions:
+        column = rows.columns[dim]
+        result.columns[dim] = [column[i] for i in indexes]
+    for metric in METRICS:
+        source = getattr(rows, metric)
+        target = getattr(result, metric)
+        target.extend(source[i] for i in indexes)
+    return result
+
+
+def group_rows(rows: SearchAnalyticsRows, group_by: List[str]) -> SearchAnalyticsRows:
+    """
+    Agrupa las filas por un subconjunto de sus dimensiones: suma clics e
+    impresiones, recalcula el CTR y pondera la posición por impresiones.
+    """
+    unknown = [dim for dim in group_by if dim not in rows.dimensions]
+    if unknown:
+        raise ValueError(f"No se puede agrupar por {', '.join(unknown)}: no está entre las dimensiones consultadas")
+    return SearchAnalyticsRows.from_rows(merge_rows([rows], group_by), group_by, rows.response_aggregation_type)
+
+
+def post_process(
+    rows: SearchAnalyticsRows,
+    group_by: Optional[List[str]] = None,
+    sort_by: Optional[str] = None,
+    sort_order: str = "descending",
+    top: Optional[int] = None,
+) -> SearchAnalyticsRows:
+    """
+    Agrupa, ordena y recorta un resultado en local, en ese orden.
+
+    Args:
+        rows: Resultado compacto
+        group_by: Dimensiones por las que agrupar (subconjunto de las consultadas)
+        sort_by: Métrica o dimensión por la que ordenar (por defecto: clics)
+        sort_order: descending o ascending
+        top: Filas que se conservan tras ordenar
+
+    Returns:
+        SearchAnalyticsRows: Resultado procesado
+    """
+    if sort_order not in SORT_ORDERS:
+        raise ValueError(f"Orden inválido {sort_order}. Debe ser uno de: {', '.join(SORT_ORDERS)}")
+    if group_by:
+        rows = group_rows(rows, group_by)
+    if not sort_by and not top:
+        return rows
+    sort_by = sort_by or "clicks"
+    if sort_by in METRICS:
+        column = getattr(rows, sort_by)
+    elif sort_by in rows.dimensions:
+        # Las filas sin valor de la dimensión van al final
+        column = [value or "" for value in rows.columns[sort_by]]
+    else:
+        raise ValueError(f"No se puede ordenar por {sort_by}: usa una métrica o una dimensión consultada")
+    indexes = range(len(rows))
+    if top and top < len(rows):
+        # Sin ordenar el resultado entero: solo las `top` filas
+        select = heapq.nlargest if sort_order == "descending" else heapq.nsmallest
+        ordered = select(top, indexes, key=column.__getitem__)
+    else:
+        ordered = sorted(indexes, key=column.__getitem__, reverse=sort_order == "descending")
+    return _take(rows, ordered)
@@ -0,0 +1,156 @@
+# Análisis local de canibalizaciones y oportunidades sobre filas query × page
+
+import heapq
+from operator import itemgetter
+from typing import Any, Dict, List, Union
+
+from compact_rows import SearchAnalyticsRows
+
+# CTR orientativo de los resultados orgánicos según la posición media (redondeada)
+EXPECTED_CTR = {
+    1: 0.28, 2: 0.15, 3: 0.11, 4: 0.08, 5: 0.06,
+    6: 0.05, 7: 0.04, 8: 0.035, 9: 0.03, 10: 0.025,
+}
+EXPECTED_CTR_PAGE_2 = 0.01
+
+
+def expected_ctr(position: float) -> float:
+    """
+    CTR esperado para una posición media, según la curva EXPECTED_CTR.
+    """
+    return EXPECTED_CTR.get(max(1, round(position)), EXPECTED_CTR_PAGE_2)
+
+
+def _as_columns(result: Union[SearchAnalyticsRows, Dict[str, Any], List[Dict[str, Any]]]) -> SearchAnalyticsRows:
+    if isinstance(result, SearchAnalyticsRows):
+        return result
+    rows = result.get("rows", []) if isinstance(result, dict) else result
+    if isinstance(rows, SearchAnalyticsRows):
+        return rows
+    if rows and ("query" not in rows[0] or "page" not in rows[0]):
+        raise ValueError("El análisis necesita las dimensiones query y page")
+    return SearchAnalyticsRows.from_rows(rows, ["query", "page"])
+
+
+def _metrics(clicks: int, impressions: int, weighted_position: float) -> Dict[str, Any]:
+    return {
+        "clicks": clicks,
+        "impressions": impressions,
+        "ctr": clicks / impressions if impressions else 0.0,
+        "position": weighted_position / impressions if impressions else 0.0,
+    }
+
+
+def analyze(
+    result: Union[SearchAnalyticsRows, Dict[str, Any], List[Dict[str, Any]]],
+    min_impressions: int = 100,
+    min_share: float = 0.1,
+    max_position: float = 20.0,
+    top_n: int = 50,
+) -> Dict[str, Any]:
+    """
+    Busca canibalizaciones y oportunidades de CTR en un resultado con las
+    dimensiones query y page.
+
+    Las filas se agrupan por consulta recorriendo las columnas de
+    SearchAnalyticsRows, sin crear un dict por fila; los dicts del resultado
+    solo se construyen para las `top_n` consultas de cada lista.
+
+    Args:
+        result: Resultado de get_search_analytics (compacto, dict o lista de filas)
+        min_impressions: Impresiones mínimas de una consulta para tenerla en cuenta
+        min_share: Parte mínima de las impresiones de la consulta que debe tener
+            una página para contar como página que compite
+        max_position: Posición media máxima de las consultas con oportunidad
+        top_n: Número máximo de consultas en cada lista
+
+    Returns:
+        Dict[str, Any]: Resumen, consultas canibalizadas y oportunidades, ordenadas
+        por impresiones y por clics perdidos respectivamente
+    """
+    rows = _as_columns(result)
+    if "query" not in rows.dimensions or "page" not in rows.dimensions:
+        raise ValueError("El análisis necesita las dimensiones query y page")
+    query_column = rows.columns["query"]
+    page_column = rows.columns["page"]
+    clicks = rows.clicks
+    impressions = rows.impressions
+    position = rows.position
+
+    # Índices de las filas de cada consulta. Las filas de la API (y las de
+    # merge_rows o del almacén) tienen una sola fila por consulta y página.
+    by_query: Dict[str, List[int]] = {}
+    for index, query in enumerate(query_column):
+        indexes = by_query.get(query)
+        if indexes is None:
+            by_query[query] = [index]
+        else:
+            indexes.append(index)
+
+    cannibalized = []
+    opportunities = []
+    for query, indexes in by_query.items():
+        query_impressions = [impressions[i] for i in indexes]
+        total_impressions = sum(query_impressions)
+        if total_impressions < min_impressions:
+            continue
+        total_clicks = sum([clicks[i] for i in indexes])
+        avg_position = sum([position[i] * impressions[i] for i in indexes]) / total_impressions
+
+        if len(indexes) > 1:
+            threshold = total_impressions * min_share
+            competing = [i for i, value in zip(indexes, query_impressions) if value >= threshold]
+            if len(competing) > 1:
+                cannibalized.append((total_impressions, query, total_clicks, avg_position, competing))
+
+        if avg_position <= max_position:
+            target_ctr = expected_ctr(avg_position)
+            missed_clicks = total_impressions * target_ctr - total_clicks
+            if missed_clicks > 0:
+                best_page = indexes[query_impressions.index(max(query_impressions))]
+                opportunities.append((missed_clicks, query, total_clicks, total_impressions, avg_position, target_ctr, best_page))
+
+    # Solo se construyen los dicts de las consultas que se devuelven
+    def page_metrics(i: int, total_impressions: int) -> Dict[str, Any]:
+        return {
+            "page": page_column[i],
+            **_metrics(clicks[i], impressions[i], position[i] * impressions[i]),
+            "share": impressions[i] / total_impressions,
+        }
+
+    cannibalization = [
+        {
+            "query": query,
+            **_metrics(total_clicks, total_impressions, avg_position * total_impressions),
+            "pages": [
+                page_metrics(i, total_impressions)
+                for i in sorted(competing, key=impressions.__getitem__, reverse=True)
+            ],
+        }
+        for total_impressions, query, total_clicks, avg_position, competing in heapq.nlargest(
+            top_n, cannibalized, key=itemgetter(0)
+        )
+    ]
+    top_opportunities = [
+        {
+            "query": query,
+            **_metrics(total_clicks, total_impressions, avg_position * total_impressions),
+            "expectedCtr": target_ctr,
+            "missedClicks": round(missed_clicks),
+            "page": page_column[best_page],
+        }
+        for missed_clicks, query, total_clicks, total_impressions, avg_position, target_ctr, best_page in heapq.nlargest(
+            top_n, opportunities, key=itemgetter(0)
+        )
+    ]
+    return {
+        "summary": {
+            "rows": len(rows),
+            "queries": len(by_query),
+            "pages": len(set(page_column)),
+            "cannibalizedQueries": len(cannibalized),
+            "opportunities": len(opportunities),
+        },
+        "cannibalization": cannibalization,
+        "opportunities": top_opportunities,
+    }
@@ -1,5 +1,7 @@
 # Implementación del Servidor del CMP de Google Search Console
 
+import asyncio
+import contextlib
 import json
 import os
 import sys
@@ -9,10 +11,65 @@ from typing import Any, Dict, Optional, Tuple, cast
 from mcp.server.models import InitializationOptions
 import mcp.types as types
 from mcp.server import Server, NotificationOptions
+from mcp.server.lowlevel.helper_types import ReadResourceContents
+from pydantic import AnyUrl
 import mcp.server.stdio
 
+from analytics_store import AnalyticsStore
+from compact_rows import SearchAnalyticsRows
 from config import Config
-from gsc_client import GSCClient
+from gsc_client import GSCClient, ProgressCallback
+from period_compare import COMPARE_MODES, top_changes
+from result_store import (
+    RESOURCE_SCHEME,
+    RESOURCE_TEMPLATE,
+    ResultStore,
+    decode_cursor,
+    encode_cursor,
+    parse_resource_uri,
+    resource_uri,
+)
+from row_ops import FILTER_DIMENSIONS, FILTER_OPERATORS, SORT_ORDERS, post_process
+from seo_analysis import analyze
+from site_inventory import SiteInventory
+from wire_format import RESPONSE_FORMATS, response_format, serialize
+
+SERVER_NAME = "google-search-console"
+SERVER_VERSION = "0.1.0"
+TRANSPORTS = ("stdio", "http")
+# Rutas del transporte HTTP: streamable HTTP y SSE (clientes anteriores a 2025-03-26)
+MCP_PATH = "/mcp"
+SSE_PATH = "/sse"
+MESSAGES_PATH = "/messages/"
+
+# Filas por página cuando se pagina con cursor sin indicar pageSize
+DEFAULT_PAGE_SIZE = 1000
+# Filas máximas de cada página de la API
+API_PAGE_ROWS = 25000
+# Filas que se piden al leer un recurso que no está en memoria
+RESOURCE_ROW_LIMIT = 25000
+
+RESPONSE_FORMAT_SCHEMA = {
+    "type": "string",
+    "enum": list(RESPONSE_FORMATS),
+    "description": "Formato de la respuesta: json (con sangría), json-min (sin espacios), "
+    "columns (filas como {columns, data}), csv o tsv (cabecera y una línea por fila; "
+    "el resto de campos en una primera línea '# {json}'). Por defecto: json",
+}
+
+
+class _StreamableHTTPEndpoint:
+    """
+    Aplicación ASGI de la ruta /mcp. Starlette trata las clases invocables como
+    aplicaciones ASGI (no como vistas), así /mcp no redirige a /mcp/.
+    """
+
+    def __init__(self, session_manager):
+        self.session_manager = session_manager
+
+    async def __call__(self, scope, receive, send) -> None:
+        await self.session_manager.handle_request(scope, receive, send)
+
 
 class GSCMCPServer:
     """
@@ -26,12 +83,32 @@ class GSCMCPServer:
             config (Config): La configuración del servidor.
         """
         self.config = config
-        self.gsc_client = GSCClient(config.google_credentials)
-        self.server = Server(config.server_port)
+        self.server = Server(SERVER_NAME, version=SERVER_VERSION)
+        # El transporte HTTP crea las opciones de cada sesión con este método
+        self.server.create_initialization_options = self._initialization_options
 
         #Inicializando el GSC client si las credenciales son válidas
-        if self.config.google_credentials:
-            self.gsc_client = GSCClient(self.config.google_credentials)
+        if not self.config.has_backend:
+            raise ValueError(
+                "No se han encontrado las credenciales de Google: usa --credentials o GOOGLE_APPLICATION_CREDENTIALS"
+            )
+        self.gsc_client = GSCClient.from_config(self.config)
+
+        # Lista de propiedades compartida entre llamadas (TTL + instantánea en disco)
+        self.site_inventory = SiteInventory(
+            self.gsc_client,
+            ttl=self.config.sites_ttl,
+            snapshot_path=self.config.sites_snapshot_path,
+        )
+
+        # Resultados guardados para servir páginas con cursor y recursos gsc://
+        # sin volver a la API
+        self.result_store = ResultStore(
+            max_bytes=self.config.result_store_max_bytes,
+            ttl=self.config.result_ttl,
+        )
+        # Sesiones suscritas a cada recurso, para avisarles cuando se actualiza
+        self._subscribers: Dict[str, set] = {}
 
         #Configurar controladores
         self._setup_handlers()
@@ -48,7 +125,13 @@ class GSCMCPServer:
                     description="Lista los sitios en Google Search Console",
                     inputSchema={
                         "type": "object",
-                        "properties": {},
+                        "properties": {
+                            "refresh": {
+                                "type": "boolean",
+                                "description": "Volver a pedir la lista a la API aunque la copia guardada siga vigente (por defecto: false)"
+                            },
+                            "responseFormat": RESPONSE_FORMAT_SCHEMA,
+                        },
                         "additionalProperties": False
                     },
                 ),
@@ -84,9 +167,183 @@ class GSCMCPServer:
                             },
                             "rowLimit": {
                                 "type": "integer",
-                                "description": "El límite de filas a retornar (por defecto: 1000)"
+                                "description": "El límite de filas a retornar (por defecto: 1000; sin límite en modo complete)"
+                            },
+                            "fetchAll": {
+                                "type": "boolean",
+                                "description": "Paginar hasta obtener todos los resultados, hasta rowLimit (por defecto: false)"
+                            },
+                            "mode": {
+                                "type": "string",
+                                "enum": ["standard", "complete"],
+                                "description": "standard: una consulta; complete: divide el rango por días o semanas, consulta los fragmentos en paralelo y combina los resultados (por defecto: standard)"
+                            },
+                            "useStore": {
+                                "type": "boolean",
+                                "description": "Responder desde el almacén local sincronizado con 'gsc_cli.py sync' si cubre el rango; si no, o con filters o un aggregationType distinto de auto, se consulta la API (por defecto: false)"
+                            },
+                            "shardSize": {
+                                "type": "string",
+                                "enum": ["day", "week"],
+                                "description": "Tamaño de los fragmentos en modo complete (por defecto: day)"
+                            },
+                            "filters": {
+                                "type": "array",
+                                "description": "Filtros que aplica Search Console antes de devolver las filas (se cumplen todos)",
+                                "items": {
+                                    "type": "object",
+                                    "properties": {
+                                        "dimension": {
+                                            "type": "string",
+                                            "enum": list(FILTER_DIMENSIONS),
+                                        },
+                                        "operator": {
+                                            "type": "string",
+                                            "enum": list(FILTER_OPERATORS),
+                                            "description": "Por defecto: equals"
+                                        },
+                                        "expression": {
+                                            "type": "string",
+                                            "description": "Valor a comparar: URL o parte de ella, consulta, país ISO 3166-1 alfa-3 (esp), dispositivo (MOBILE, DESKTOP, TABLET) o expresión regular"
+                                        },
+                                    },
+                                    "required": ["dimension", "expression"],
+                                },
+                            },
+                            "groupBy": {
+                                "type": "string",
+                                "description": "Dimensiones por las que agrupar en el servidor, separadas por coma (subconjunto de dimensions); la posición se pondera por impresiones"
+                            },
+                            "sortBy": {
+                                "type": "string",
+                                "description": "Métrica (clicks, impressions, ctr, position) o dimensión por la que ordenar en el servidor (por defecto: clicks)"
+                            },
+                            "sortOrder": {
+                                "type": "string",
+                                "enum": list(SORT_ORDERS),
+                                "description": "Orden de sortBy (por defecto: descending)"
+                            },
+                            "top": {
+                                "type": "integer",
+                                "description": "Filas que se devuelven tras agrupar y ordenar"
+                            },
+                            "responseFormat": RESPONSE_FORMAT_SCHEMA,
+                            "pageSize": {
+                                "type": "integer",
+                                "description": "Devolver el resultado por páginas de este número de filas, con un nextCursor para pedir la siguiente"
+                            },
+                            "cursor": {
+                                "type": "string",
+                                "description": "nextCursor de una respuesta anterior: devuelve la página siguiente del mismo resultado sin volver a consultar Search Console (el resto de argumentos se ignoran salvo pageSize)"
+                            },
+                        },
+                    },
+                ),
+                types.Tool(
+                    name="analyze_query_pages",
+                    description="Busca canibalizaciones (consultas con varias páginas compitiendo) y oportunidades de CTR (muchas impresiones y CTR por debajo del esperado para su posición) en las filas query × page de un sitio",
+                    inputSchema={
+                        "type": "object",
+                        "properties": {
+                            "siteUrl": {
+                                "type": "string",
+                                "description": "La URL del sitio a analizar"
+                            },
+                            "startDate": {
+                                "type": "string",
+                                "description": "La fecha de inicio (YYYY-MM-DD)"
+                            },
+                            "endDate": {
+                                "type": "string",
+                                "description": "La fecha de fin (YYYY-MM-DD)"
+                            },
+                            "type": {
+                                "type": "string",
+                                "description": "El tipo de búsqueda"
+                            },
+                            "mode": {
+                                "type": "string",
+                                "enum": ["standard", "complete"],
+                                "description": "standard: una consulta paginada; complete: divide el rango por días o semanas y combina los resultados (por defecto: standard)"
+                            },
+                            "useStore": {
+                                "type": "boolean",
+                                "description": "Analizar desde el almacén local si cubre el rango (por defecto: false)"
+                            },
+                            "minImpressions": {
+                                "type": "integer",
+                                "description": "Impresiones mínimas de una consulta para analizarla (por defecto: 100)"
+                            },
+                            "minShare": {
+                                "type": "number",
+                                "description": "Parte mínima de las impresiones de la consulta para que una página cuente como canibalización (por defecto: 0.1)"
+                            },
+                            "maxPosition": {
+                                "type": "number",
+                                "description": "Posición media máxima de las oportunidades de CTR (por defecto: 20)"
+                            },
+                            "top": {
+                                "type": "integer",
+                                "description": "Consultas a devolver en cada lista (por defecto: 50)"
+                            },
+                        },
+                        "required": ["siteUrl", "startDate", "endDate"],
+                    },
+                ),
+                types.Tool(
+                    name="compare_periods",
+                    description="Compara un periodo con el anterior o con el del año pasado: une ambos por las dimensiones y devuelve las variaciones de clics, impresiones, CTR y posición, y las claves nuevas o perdidas",
+                    inputSchema={
+                        "type": "object",
+                        "properties": {
+                            "siteUrl": {
+                                "type": "string",
+                                "description": "La URL del sitio a consultar"
+                            },
+                            "startDate": {
+                                "type": "string",
+                                "description": "La fecha de inicio del periodo actual (YYYY-MM-DD)"
+                            },
+                            "endDate": {
+                                "type": "string",
+                                "description": "La fecha de fin del periodo actual (YYYY-MM-DD)"
+                            },
+                            "compareTo": {
+                                "type": "string",
+                                "enum": list(COMPARE_MODES),
+                                "description": "previous: los mismos días justo antes; year: las mismas fechas del año anterior (por defecto: previous)"
+                            },
+                            "compareStartDate": {
+                                "type": "string",
+                                "description": "Inicio de un periodo de comparación explícito (YYYY-MM-DD)"
+                            },
+                            "compareEndDate": {
+                                "type": "string",
+                                "description": "Fin de un periodo de comparación explícito (YYYY-MM-DD)"
+                            },
+                            "dimensions": {
+                                "type": "string",
+                                "description": "Las dimensiones por las que se comparan los periodos (ej: query,page)"
+                            },
+                            "type": {
+                                "type": "string",
+                                "description": "El tipo de búsqueda"
+                            },
+                            "rowLimit": {
+                                "type": "integer",
+                                "description": "Filas máximas de cada periodo (por defecto: 25000)"
+                            },
+                            "mode": {
+                                "type": "string",
+                                "enum": ["standard", "complete"],
+                                "description": "complete consulta cada periodo por fragmentos de fechas (por defecto: standard)"
+                            },
+                            "top": {
+                                "type": "integer",
+                                "description": "Claves con mayor variación de clics que se devuelven (por defecto: 100)"
                             },
                         },
+                        "required": ["siteUrl", "startDate", "endDate"],
                     },
                 ),
             ]
@@ -100,11 +357,13 @@ class GSCMCPServer:
                 raise RuntimeError("GSC client no inicializado")
             if name == "list_sites":
                 try:
-                    result = await self.gsc_client.list_sites()
+                    refresh = bool((arguments or {}).get("refresh", False))
+                    fmt = response_format(arguments)
+                    result = await self.site_inventory.list_sites(refresh=refresh)
                     return [
                         types.TextContent(
                             type="text",
-                            text=json.dumps(result, indent=2)
+                            text=serialize(result, fmt, table_key="sites")
                         )
                     ]
                 except Exception as e:
@@ -113,6 +372,17 @@ class GSCMCPServer:
                 try:
                     if not arguments:
                         raise ValueError("No se proporcionaron argumentos para search_analytics")
+                    page_size = arguments.get("pageSize")
+                    fmt = response_format(arguments)
+                    if arguments.get("cursor"):
+                        result_id, offset = decode_cursor(arguments["cursor"])
+                        page = self._result_page(result_id, offset, DEFAULT_PAGE_SIZE if page_size is None else page_size)
+                        return [
+                            types.TextContent(
+                                type="text",
+                                text=serialize(page, fmt)
+                            )
+                        ]
                     site_url = arguments.get("siteUrl")
                     start_date = arguments.get("startDate")
                     end_date = arguments.get("endDate")
@@ -120,34 +390,388 @@ class GSCMCPServer:
                         raise ValueError("siteUrl, startDate y endDate son obligatorios")
                     dimensions_str = arguments.get("dimensions", "")
                     dimensions = [dim.strip() for dim in dimensions_str.split(",")] if dimensions_str else None
-                    search_type = arguments.get("type")
-                    aggregation_type = arguments.get("aggregationType")
-                    row_limit = arguments.get("rowLimit", 1000)
-                    result = await self.gsc_client.search_analytics(
-                        site_url=site_url,
-                        start_date=start_date,
-                        end_date=end_date,
-                        dimensions=dimensions,
-                        type=search_type,
-                        aggregation_type=aggregation_type,
-                        row_limit=row_limit
+                    group_by = [dim.strip() for dim in arguments.get("groupBy", "").split(",") if dim.strip()]
+                    options = {}
+                    if group_by or arguments.get("sortBy") or arguments.get("top"):
+                        options = {
+                            "group_by": group_by,
+                            "sort_by": arguments.get("sortBy"),
+                            "sort_order": arguments.get("sortOrder", "descending"),
+                            "top": arguments.get("top"),
+                        }
+                    result = await self._search_analytics(
+                        arguments,
+                        dimensions,
+                        row_limit=arguments.get("rowLimit"),
+                        fetch_all=bool(arguments.get("fetchAll", False)),
+                        on_progress=self._progress_callback(),
+                        options=options,
                     )
+                    if page_size is not None:
+                        rows = self._as_rows(result, dimensions)
+                        # La primera página sale de las filas obtenidas, aunque no quepan en memoria
+                        result = self._result_page(self.result_store.put(rows), 0, page_size, rows)
                     return [
                         types.TextContent(
                             type="text",
-                            text=json.dumps(result, indent=2)
+                            text=serialize(result, fmt)
                         )
                     ]
                 except Exception as e:
                     raise RuntimeError(f"Error al llamar a search_analytics: {e}")
+            elif name == "analyze_query_pages":
+                try:
+                    if not arguments:
+                        raise ValueError("No se proporcionaron argumentos para analyze_query_pages")
+                    if not arguments.get("siteUrl") or not arguments.get("startDate") or not arguments.get("endDate"):
+                        raise ValueError("siteUrl, startDate y endDate son obligatorios")
+                    result = await self._search_analytics(
+                        arguments,
+                        ["query", "page"],
+                        row_limit=GSCClient.SHARD_ROW_LIMIT,
+                        fetch_all=True,
+                        on_progress=self._progress_callback(),
+                    )
+                    analysis = analyze(
+                        result,
+                        min_impressions=arguments.get("minImpressions", 100),
+                        min_share=arguments.get("minShare", 0.1),
+                        max_position=arguments.get("maxPosition", 20.0),
+                        top_n=arguments.get("top", 50),
+                    )
+                    return [
+                        types.TextContent(
+                            type="text",
+                            text=json.dumps(analysis, indent=2)
+                        )
+                    ]
+                except Exception as e:
+                    raise RuntimeError(f"Error al llamar a analyze_query_pages: {e}")
+            elif name == "compare_periods":
+                try:
+                    if not arguments:
+                        raise ValueError("No se proporcionaron argumentos para compare_periods")
+                    if not arguments.get("siteUrl") or not arguments.get("startDate") or not arguments.get("endDate"):
+                        raise ValueError("siteUrl, startDate y endDate son obligatorios")
+                    dimensions_str = arguments.get("dimensions", "")
+                    result = await self.gsc_client.compare_periods(
+                        site_url=arguments["siteUrl"],
+                        start_date=arguments["startDate"],
+                        end_date=arguments["endDate"],
+                        compare_start_date=arguments.get("compareStartDate"),
+                        compare_end_date=arguments.get("compareEndDate"),
+                        compare_to=arguments.get("compareTo", "previous"),
+                        dimensions=[dim.strip() for dim in dimensions_str.split(",")] if dimensions_str else None,
+                        search_type=arguments.get("type"),
+                        row_limit=arguments.get("rowLimit", 25000),
+                        complete=arguments.get("mode", "standard") == "complete",
+                        shard_concurrency=self.config.shard_concurrency,
+                        page_concurrency=self.config.page_concurrency,
+                    )
+                    result["rows"] = top_changes(result["rows"], arguments.get("top", 100))
+                    return [
+                        types.TextContent(
+                            type="text",
+                            text=json.dumps(result, indent=2)
+                        )
+                    ]
+                except Exception as e:
+                    raise RuntimeError(f"Error al llamar a compare_periods: {e}")
             else:
                 raise ValueError(f"Herramienta desconocida: {name}")
 
+        @self.server.list_resources()
+        async def handle_list_resources() -> list[types.Resource]:
+            resources = []
+            for uri in self.result_store.keys(f"{RESOURCE_SCHEME}://"):
+                rows = self.result_store.get(uri)
+                if rows is None:
+                    continue
+                params = parse_resource_uri(uri)
+                resources.append(
+                    types.Resource(
+                        uri=AnyUrl(uri),
+                        name=f"{params['siteUrl']} {params['startDate']}..{params['endDate']} "
+                        f"{','.join(params['dimensions']) or 'totales'}",
+                        description=f"Último resultado de Search Analytics en memoria ({len(rows)} filas)",
+                        mimeType="application/json",
+                    )
+                )
+            return resources
+
+        @self.server.list_resource_templates()
+        async def handle_list_resource_templates() -> list[types.ResourceTemplate]:
+            return [
+                types.ResourceTemplate(
+                    uriTemplate=RESOURCE_TEMPLATE,
+                    name="search_analytics",
+                    description="Filas de Search Analytics de una propiedad (URL codificada), un rango "
+                    "inicio..fin (YYYY-MM-DD..YYYY-MM-DD) y unas dimensiones separadas por coma "
+                    "(o 'totals'); ?type= para otros tipos de búsqueda. Se sirven desde memoria "
+                    f"si ya se consultaron; si no, se piden hasta {RESOURCE_ROW_LIMIT} filas a la API",
+                    mimeType="application/json",
+                )
+            ]
+
+        @self.server.read_resource()
+        async def handle_read_resource(uri: AnyUrl) -> list[ReadResourceContents]:
+            uri = str(uri)
+            rows = self.result_store.get(uri)
+            if rows is None:
+                params = parse_resource_uri(uri)
+                rows = await self.gsc_client.get_search_analytics(
+                    site_url=params["siteUrl"],
+                    start_date=params["startDate"],
+                    end_date=params["endDate"],
+                    dimensions=params["dimensions"] or None,
+                    search_type=params["type"],
+                    row_limit=RESOURCE_ROW_LIMIT,
+                    fetch_all=True,
+                    page_concurrency=self.config.page_concurrency,
+                    compact=True,
+                )
+                # Si se ha llegado al límite, el resultado puede estar recortado: se
+                # devuelve, pero no se guarda como el recurso completo
+                if len(rows) < RESOURCE_ROW_LIMIT:
+                    await self._publish(uri, rows)
+            return [ReadResourceContents(json.dumps(rows.to_dict(), indent=2), "application/json")]
+
+        @self.server.subscribe_resource()
+        async def handle_subscribe_resource(uri: AnyUrl) -> None:
+            self._subscribers.setdefault(str(uri), set()).add(self.server.request_context.session)
+
+        @self.server.unsubscribe_resource()
+        async def handle_unsubscribe_resource(uri: AnyUrl) -> None:
+            sessions = self._subscribers.get(str(uri))
+            if sessions is not None:
+                sessions.discard(self.server.request_context.session)
+                if not sessions:
+                    del self._subscribers[str(uri)]
 
-    async def run(self):
+    async def _publish(self, uri: str, rows: SearchAnalyticsRows) -> None:
+        """
+        Guarda un resultado como recurso y lo notifica: resources/updated a las
+        sesiones suscritas si ya existía, o list_changed a la sesión actual si es nuevo.
+        Si el almacén no lo admite (supera max_bytes) no se avisa a nadie.
+        """
+        existed = uri in self.result_store
+        self.result_store.put(rows, key=uri)
+        if uri not in self.result_store:
+            return
+        if existed:
+            for session in list(self._subscribers.get(uri, ())):
+                try:
+                    await session.send_resource_updated(AnyUrl(uri))
+                except Exception:
+                    # La sesión se ha cerrado: deja de estar suscrita
+                    self._subscribers[uri].discard(session)
+            return
+        try:
+            await self.server.request_context.session.send_resource_list_changed()
+        except Exception:
+            # Fuera de una petición o con la sesión cerrada: el aviso no es imprescindible
+            pass
+
+    async def _search_analytics(
+        self,
+        arguments: dict[str, Any],
+        dimensions: Optional[list[str]],
+        row_limit: Optional[int],
+        fetch_all: bool,
+        on_progress: Optional[ProgressCallback] = None,
+        options: Optional[Dict[str, Any]] = None,
+    ) -> Any:
+        """
+        Obtiene filas de Search Analytics desde el almacén local (useStore), en
+        modo completo o con una consulta paginada, según los argumentos de la herramienta.
+        Lo obtenido de la API se publica como recurso gsc:// solo si está completo,
+        es decir, si rowLimit no lo ha recortado.
+
+        `options` (group_by, sort_by, sort_order, top) se pasan a la consulta
+        paginada, que con top pide a la API solo las filas necesarias; el almacén
+        y el modo completo los aplican en local sobre lo obtenido.
+        """
+        options = options or {}
+        site_url = arguments["siteUrl"]
+        start_date = arguments["startDate"]
+        end_date = arguments["endDate"]
+        search_type = arguments.get("type")
+        aggregation_type = arguments.get("aggregationType")
+        filters = arguments.get("filters")
+        # El almacén local no aplica filtros y solo agrega de una forma (auto):
+        # en otro caso se consulta la API
+        if arguments.get("useStore") and not filters and aggregation_type in (None, "auto"):
+            # SQLite agrega todo el rango: fuera del event loop para no parar las demás sesiones
+            result = await asyncio.to_thread(
+                self._query_store, site_url, start_date, end_date, dimensions, search_type, row_limit
+            )
+            if result is not None:
+                return post_process(self._as_rows(result, dimensions), **options) if options else result
+        complete_mode = arguments.get("mode", "standard") == "complete"
+        if complete_mode:
+            result = await self.gsc_client.get_search_analytics_complete(
+                site_url=site_url,
+                start_date=start_date,
+                end_date=end_date,
+                dimensions=dimensions,
+                search_type=search_type,
+                aggregation_type=aggregation_type,
+                row_limit=row_limit,
+                shard_size=arguments.get("shardSize", "day"),
+                shard_concurrency=self.config.shard_concurrency,
+                page_concurrency=self.config.page_concurrency,
+                compact=True,
+                on_progress=on_progress,
+                filters=filters,
+            )
+        else:
+            result = await self.gsc_client.get_search_analytics(
+                site_url=site_url,
+                start_date=start_date,
+                end_date=end_date,
+                dimensions=dimensions,
+                search_type=search_type,
+                aggregation_type=aggregation_type,
+                row_limit=row_limit or 1000,
+                fetch_all=fetch_all,
+                page_concurrency=self.config.page_concurrency,
+                compact=True,
+                on_progress=on_progress,
+                filters=filters,
+                **options,
+            )
+        # Filas que caben en lo pedido: sin fetch_all la API da una sola página
+        if complete_mode:
+            cap = row_limit
+        else:
+            cap = (row_limit or 1000) if fetch_all else min(row_limit or 1000, API_PAGE_ROWS)
+        truncated = cap is not None and len(result) >= cap
+        # Un resultado recortado por rowLimit no puede sustituir al completo de la
+        # URI, y los agregados por página, filtrados o ya agrupados/ordenados por
+        # la consulta paginada no son el mismo resultado
+        publishable = complete_mode or not options
+        if publishable and not truncated and not filters and (not aggregation_type or aggregation_type == "auto"):
+            await self._publish(resource_uri(site_url, start_date, end_date, dimensions, search_type), result)
+        if complete_mode and options:
+            result = post_process(result, **options)
+        return result
+
+    @staticmethod
+    def _as_rows(result: Any, dimensions: Optional[list[str]]) -> SearchAnalyticsRows:
+        """
+        Resultado en formato compacto (el almacén local devuelve un dict).
+        """
+        if isinstance(result, SearchAnalyticsRows):
+            return result
+        return SearchAnalyticsRows.from_rows(
+            result["rows"], dimensions, result.get("responseAggregationType", "")
+        )
+
+    def _result_page(
+        self,
+        result_id: str,
+        offset: int,
+        page_size: int,
+        rows: Optional[SearchAnalyticsRows] = None,
+    ) -> Dict[str, Any]:
+        """
+        Página de un resultado guardado, con el cursor de la siguiente si quedan filas.
+        Con `rows` (la primera página de una consulta) la página sale de ellas; si el
+        resultado no cupo en el almacén, no hay cursor y se devuelve un aviso.
+        """
+        if page_size < 1:
+            raise ValueError("pageSize debe ser mayor que 0")
+        if rows is None:
+            rows = self.result_store.get(result_id)
+            if rows is None:
+                raise ValueError("El cursor ha caducado o no existe; repite la consulta sin cursor")
+            stored = True
+        else:
+            stored = result_id in self.result_store
+        end = min(offset + page_size, len(rows))
+        page = {
+            "rows": rows[offset:end],
+            "responseAggregationType": rows.response_aggregation_type,
+            "totalRows": len(rows),
+            "offset": offset,
+            "nextCursor": encode_cursor(result_id, end) if end < len(rows) and stored else None,
+        }
+        if end < len(rows) and not stored:
+            page["warning"] = (
+                "El resultado supera la memoria para resultados (GSC_RESULT_STORE_MB) y no se ha "
+                "guardado: no hay cursor para las páginas siguientes. Reduce rowLimit o usa filtros."
+            )
+        return page
+
+    def _progress_callback(self) -> Optional[ProgressCallback]:
+        """
+        Callback que envía notificaciones de progreso MCP durante la petición en
+        curso, o None si el cliente no ha pedido progreso (sin progressToken).
+        """
+        try:
+            context = self.server.request_context
+        except LookupError:
+            return None
+        token = context.meta.progressToken if context.meta else None
+        if token is None:
+            return None
+
+        async def on_progress(done: int, total: Optional[int]) -> None:
+            message = f"{done} filas recibidas" if total is None else f"{done} de {total} fragmentos"
+            await context.session.send_progress_notification(
+                token, done, total, message=message, related_request_id=context.request_id
+            )
+
+        return on_progress
+
+    def _query_store(
+        self,
+        site_url: str,
+        start_date: str,
+        end_date: str,
+        dimensions: Optional[list[str]],
+        search_type: Optional[str],
+        row_limit: Optional[int],
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Consulta el almacén local; devuelve None si no cubre el rango pedido.
+        """
+        store = AnalyticsStore(self.config.store_path)
+        try:
+            if not store.covers(site_url, start_date, end_date, dimensions, search_type):
+                return None
+            return store.query(site_url, start_date, end_date, dimensions, search_type, row_limit)
+        finally:
+            store.close()
+
+    def _initialization_options(self) -> InitializationOptions:
+        """
+        Opciones con las que se inicializa cada sesión, en stdio o en HTTP.
+        """
+        capabilities = self.server.get_capabilities(
+            notification_options=NotificationOptions(resources_changed=True),
+            experimental_capabilities={},
+        )
+        # El SDK anuncia siempre subscribe=False, aunque haya controlador de suscripción
+        capabilities.resources.subscribe = True
+        return InitializationOptions(
+            server_name=SERVER_NAME,
+            server_version=SERVER_VERSION,
+            capabilities=capabilities,
+        )
+
+    async def run(self, transport: str = "stdio", host: Optional[str] = None, port: Optional[int] = None):
         """
         Ejecuta el servidor del MCP
+
+        Args:
+            transport: stdio (un cliente, el proceso que lo lanza) o http (streamable
+                HTTP en /mcp y SSE en /sse, con muchas sesiones a la vez)
+            host: Interfaz del transporte HTTP (por defecto: config.server_host)
+            port: Puerto del transporte HTTP (por defecto: config.server_port)
         """
+        if transport not in TRANSPORTS:
+            raise ValueError(f"Transporte inválido {transport}. Debe ser uno de: {', '.join(TRANSPORTS)}")
         if not self.gsc_client:
             print("Error, Google Search Console Credentials no han sido encontradas.", file=sys.stderr)
             return
@@ -158,16 +782,55 @@ class GSCMCPServer:
         except Exception as e:
             print(f"Error al inicializar Google Search Console: {e}", file=sys.stderr)
             return
+        # Las llamadas a la API se ejecutan en el pool del GSCClient, así que el
+        # servidor puede atender varias herramientas en paralelo.
+        try:
+            if transport == "http":
+                await self._run_http(host or self.config.server_host, port or self.config.server_port)
+            else:
+                await self._run_stdio()
+        finally:
+            self.gsc_client.close()
+
+    async def _run_stdio(self) -> None:
         async with mcp.server.stdio.stdio_server() as (read_stream, write_stream):
-            await self.server.run(
-                read_stream,
-                write_stream,
-                InitializationOptions(
-                    server_name="google-search-console", 
-                    server_version="0.1.0",
-                    capabilities=self.server.get_capabilities(
-                        notification_options=NotificationOptions(),
-                        experimental_capabilities={},
-                    ),
-                ),
-            )
\ No newline at end of file
+            await self.server.run(read_stream, write_stream, self._initialization_options())
+
+    async def _run_http(self, host: str, port: int) -> None:
+        """
+        Sirve el MCP por HTTP: todas las sesiones comparten este proceso, y con él
+        el GSCClient (pool, limitador de cuota y caché), la lista de propiedades y
+        los resultados guardados.
+        """
+        # Solo hacen falta con este transporte
+        import uvicorn
+        from mcp.server.sse import SseServerTransport
+        from mcp.server.streamable_http_manager import StreamableHTTPSessionManager
+        from starlette.applications import Starlette
+        from starlette.responses import Response
+        from starlette.routing import Mount, Route
+
+        session_manager = StreamableHTTPSessionManager(app=self.server)
+        sse = SseServerTransport(MESSAGES_PATH)
+
+        async def handle_sse(request):
+            async with sse.connect_sse(request.scope, request.receive, request._send) as (read_stream, write_stream):
+                await self.server.run(read_stream, write_stream, self._initialization_options())
+            return Response()
+
+        @contextlib.asynccontextmanager
+        async def lifespan(app):
+            async with session_manager.run():
+                print(f"Servidor MCP escuchando en http://{host}:{port}{MCP_PATH} (SSE en {SSE_PATH})", file=sys.stderr)
+                yield
+
+        app = Starlette(
+            routes=[
+                Route(MCP_PATH, endpoint=_StreamableHTTPEndpoint(session_manager)),
+                Route(SSE_PATH, endpoint=handle_sse, methods=["GET"]),
+                Mount(MESSAGES_PATH, app=sse.handle_post_message),
+            ],
+            lifespan=lifespan,
+        )
+        server = uvicorn.Server(uvicorn.Config(app, host=host, port=port, log_level="warning"))
+        await server.serve()
@@ -0,0 +1,100 @@
+# Credenciales, servicio de discovery y conexiones HTTP compartidos por todo el proceso
+
+import json
+import threading
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+import httplib2
+from google.auth.credentials import with_scopes_if_required
+from google.oauth2 import service_account
+from google_auth_httplib2 import AuthorizedHttp, Request
+from googleapiclient import discovery_cache
+from googleapiclient.discovery import build, build_from_document
+
+API_NAME = "searchconsole"
+API_VERSION = "v1"
+
+_lock = threading.Lock()
+_credentials: Dict[Tuple[str, int], service_account.Credentials] = {}
+_services: Dict[int, Any] = {}
+# Una conexión por hilo y por (credenciales, timeout): httplib2 no es thread-safe,
+# pero cada Http mantiene abiertas (keep-alive) sus conexiones con Google.
+_thread_local = threading.local()
+
+
+@lru_cache(maxsize=1)
+def discovery_document() -> Optional[Dict[str, Any]]:
+    """
+    Documento de discovery de Search Console incluido en google-api-python-client,
+    leído una sola vez. Sin él habría que descargarlo en cada arranque.
+    """
+    document = discovery_cache.get_static_doc(API_NAME, API_VERSION)
+    return json.loads(document) if document else None
+
+
+def _scopes() -> list:
+    document = discovery_document() or {}
+    return list(document.get("auth", {}).get("oauth2", {}).get("scopes", {}))
+
+
+def load_credentials(credentials_path: Path) -> service_account.Credentials:
+    """
+    Credenciales de la cuenta de servicio, compartidas por todos los clientes del
+    proceso mientras el archivo no cambie.
+
+    El token se renueva en segundo plano cuando le quedan menos de ~4 minutos
+    (refresco no bloqueante de google-auth), así que las llamadas no esperan a
+    la renovación ni fallan con un 401 por un token caducado.
+    """
+    path = Path(credentials_path).resolve()
+    key = (str(path), path.stat().st_mtime_ns)
+    with _lock:
+        credentials = _credentials.get(key)
+        if credentials is None:
+            credentials = service_account.Credentials.from_service_account_file(str(path))
+            credentials = with_scopes_if_required(credentials, _scopes())
+            credentials.with_non_blocking_refresh()
+            _credentials[key] = credentials
+        return credentials
+
+
+def get_service(credentials: service_account.Credentials):
+    """
+    Servicio de la API de Search Console para unas credenciales, construido a
+    partir del documento de discovery local y reutilizado en todo el proceso.
+    """
+    with _lock:
+        service = _services.get(id(credentials))
+        if service is None:
+            document = discovery_document()
+            if document is not None:
+                service = build_from_document(document, credentials=credentials)
+            else:
+                service = build(API_NAME, API_VERSION, credentials=credentials, cache_discovery=False)
+            _services[id(credentials)] = service
+        return service
+
+
+def authorized_http(credentials: service_account.Credentials, timeout: float) -> AuthorizedHttp:
+    """
+    Conexión HTTP autorizada del hilo actual, creándola si no existe.
+    """
+    pool = getattr(_thread_local, "pool", None)
+    if pool is None:
+        pool = _thread_local.pool = {}
+    key = (id(credentials), timeout)
+    http = pool.get(key)
+    if http is None:
+        http = pool[key] = AuthorizedHttp(credentials, http=httplib2.Http(timeout=timeout))
+    return http
+
+
+def refresh_credentials(credentials: service_account.Credentials) -> None:
+    """
+    Obtiene un token si el actual no es válido. Pensado para lanzarse en segundo
+    plano al crear el cliente, de modo que la primera llamada ya lo encuentre listo.
+    """
+    if not credentials.valid:
+        credentials.refresh(Request(httplib2.Http()))
@@ -0,0 +1,142 @@
+# Inventario de propiedades de Search Console con caché e índice de búsqueda
+
+import json
+import re
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+# Posibles menciones de una propiedad dentro de un texto libre
+_SITE_MENTION = re.compile(r"sc-domain:[\w.-]+|(?:https?://)?[\w-]+(?:\.[\w-]+)+(?:/[\w./-]*)?", re.IGNORECASE)
+
+
+def normalize_site(value: str) -> str:
+    """
+    Forma canónica de una propiedad para compararla: sin esquema, sin
+    `sc-domain:`, sin `www.`, en minúsculas y sin barra final.
+    """
+    value = value.strip().lower()
+    for prefix in ("sc-domain:", "https://", "http://"):
+        if value.startswith(prefix):
+            value = value[len(prefix):]
+    if value.startswith("www."):
+        value = value[4:]
+    return value.rstrip("/")
+
+
+class SiteInventory:
+    """
+    Lista de propiedades de GSCClient.list_sites con caché en memoria (TTL),
+    instantánea opcional en disco y un índice para resolver nombres de
+    propiedad escritos por el usuario (URL exacta, dominio o `sc-domain:`).
+    """
+
+    def __init__(self, client, ttl: float = 3600, snapshot_path: Optional[Path] = None):
+        """
+        Args:
+            client: GSCClient con el que listar los sitios
+            ttl: Segundos durante los que la lista se considera vigente
+            snapshot_path: Fichero JSON donde guardar la última lista (opcional)
+        """
+        self.client = client
+        self.ttl = ttl
+        self.snapshot_path = Path(snapshot_path).expanduser() if snapshot_path else None
+        self._sites: List[Dict[str, Any]] = []
+        self._fetched_at = 0.0
+        self._index: Dict[str, List[str]] = {}
+        self._load_snapshot()
+
+    def _load_snapshot(self) -> None:
+        if not self.snapshot_path or not self.snapshot_path.exists():
+            return
+        try:
+            data = json.loads(self.snapshot_path.read_text(encoding="utf-8"))
+            self._set_sites(data["sites"], data["fetched_at"])
+        except (OSError, ValueError, KeyError):
+            # Una instantánea dañada no impide arrancar: se vuelve a pedir a la API
+            pass
+
+    def _save_snapshot(self) -> None:
+        if not self.snapshot_path:
+            return
+        self.snapshot_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.snapshot_path.with_suffix(".tmp")
+        tmp_path.write_text(
+            json.dumps({"fetched_at": self._fetched_at, "sites": self._sites}, ensure_ascii=False),
+            encoding="utf-8",
+        )
+        tmp_path.replace(self.snapshot_path)
+
+    def _set_sites(self, sites: List[Dict[str, Any]], fetched_at: float) -> None:
+        self._sites = sites
+        self._fetched_at = fetched_at
+        index: Dict[str, List[str]] = {}
+        for site in sites:
+            site_url = site["siteUrl"]
+            for key in {site_url, normalize_site(site_url)}:
+                index.setdefault(key, []).append(site_url)
+        self._index = index
+
+    @property
+    def is_fresh(self) -> bool:
+        return bool(self._sites) and time.time() - self._fetched_at < self.ttl
+
+    async def refresh(self) -> Dict[str, Any]:
+        """
+        Vuelve a pedir la lista de sitios a la API y actualiza la instantánea.
+        """
+        result = await self.client.list_sites()
+        self._set_sites(result["sites"], time.time())
+        self._save_snapshot()
+        return result
+
+    async def list_sites(self, refresh: bool = False) -> Dict[str, Any]:
+        """
+        Lista de sitios con el mismo formato que GSCClient.list_sites, pidiéndola
+        a la API solo si no hay una copia vigente o se fuerza con refresh.
+        """
+        if refresh or not self.is_fresh:
+            return await self.refresh()
+        return {"sites": list(self._sites), "total_sites": len(self._sites)}
+
+    async def site_urls(self, refresh: bool = False) -> List[str]:
+        result = await self.list_sites(refresh=refresh)
+        return [site["siteUrl"] for site in result["sites"]]
+
+    def cached_site_urls(self) -> List[str]:
+        """
+        URLs de la última lista conocida (memoria o instantánea), sin llamar a la API.
+        """
+        return [site["siteUrl"] for site in self._sites]
+
+    def resolve(self, value: str) -> List[str]:
+        """
+        Propiedades que corresponden a un valor escrito por el usuario.
+
+        Se prueba, por este orden: la URL exacta, la forma normalizada (dominio,
+        `sc-domain:` o URL sin esquema) y, si nada coincide, una búsqueda parcial.
+        """
+        if value in self._index:
+            return list(self._index[value])
+        normalized = normalize_site(value)
+        if normalized in self._index:
+            return list(self._index[normalized])
+        if not normalized:
+            return []
+        return [
+            site["siteUrl"]
+            for site in self._sites
+            if normalized in normalize_site(site["siteUrl"])
+        ]
+
+    def find_in_text(self, text: str) -> Optional[str]:
+        """
+        Primera propiedad mencionada en un texto libre. Si un dominio corresponde
+        a varias propiedades (por ejemplo `sc-domain:` y la URL), gana la primera
+        de la lista, salvo que se mencione la URL exacta.
+        """
+        for mention in _SITE_MENTION.findall(text):
+            matches = self._index.get(mention) or self._index.get(normalize_site(mention))
+            if matches:
+                return matches[0]
+        return None
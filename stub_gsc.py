@@ -0,0 +1,120 @@
+# Backend falso de la API de Search Console para probar el servidor y la CLI sin credenciales
+
+import hashlib
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+# Propiedades que devuelve sites().list()
+STUB_SITES = [
+    {"siteUrl": "https://www.ejemplo.com/", "permissionLevel": "siteOwner"},
+    {"siteUrl": "sc-domain:ejemplo.es", "permissionLevel": "siteFullUser"},
+]
+# Filas que tiene cada consulta antes de paginar
+STUB_ROWS = 5000
+
+_VALUES = {
+    "country": ("esp", "mex", "arg", "col", "usa"),
+    "device": ("MOBILE", "DESKTOP", "TABLET"),
+}
+
+
+def _key(dimension: str, index: int, start_date: str) -> str:
+    if dimension in _VALUES:
+        values = _VALUES[dimension]
+        return values[index % len(values)]
+    if dimension == "date":
+        return start_date
+    if dimension == "page":
+        return f"https://www.ejemplo.com/pagina-{index % 400}/"
+    return f"{dimension} {index}"
+
+
+class _Request:
+    """
+    Petición ya construida, con la misma interfaz que las de googleapiclient.
+    """
+
+    def __init__(self, run: Callable[[], Dict[str, Any]], latency: float):
+        self._run = run
+        self._latency = latency
+
+    def execute(self, http=None, num_retries: int = 0) -> Dict[str, Any]:
+        if self._latency:
+            time.sleep(self._latency)
+        return self._run()
+
+
+class _SearchAnalytics:
+    def __init__(self, rows: int, latency: float):
+        self.rows = rows
+        self.latency = latency
+
+    def query(self, siteUrl: str, body: Dict[str, Any]) -> _Request:
+        def run() -> Dict[str, Any]:
+            dimensions = body.get("dimensions") or []
+            start_row = body.get("startRow", 0)
+            end_row = min(start_row + body.get("rowLimit", 1000), self.rows)
+            # Métricas deterministas por propiedad y rango: mismas respuestas en cada llamada
+            seed = int(hashlib.md5(f"{siteUrl}|{body.get('startDate')}|{body.get('endDate')}".encode()).hexdigest()[:8], 16)
+            rows = []
+            for i in range(start_row, end_row):
+                impressions = (seed + i * 7919) % 5000 + 1
+                # Las filas salen por clics descendentes, como en la API
+                clicks = max(0, (self.rows - i) // 10)
+                rows.append({
+                    "keys": [_key(dim, i, body.get("startDate", "")) for dim in dimensions],
+                    "clicks": min(clicks, impressions),
+                    "impressions": impressions,
+                    "ctr": min(clicks, impressions) / impressions,
+                    "position": 1 + (seed + i) % 500 / 10,
+                })
+            return {"rows": rows, "responseAggregationType": "byProperty"} if rows else {}
+
+        return _Request(run, self.latency)
+
+
+class _Sites:
+    def __init__(self, latency: float):
+        self.latency = latency
+
+    def list(self) -> _Request:
+        return _Request(lambda: {"siteEntry": [dict(site) for site in STUB_SITES]}, self.latency)
+
+
+class _Batch:
+    def __init__(self, callback: Optional[Callable]):
+        self._callback = callback
+        self._requests: List = []
+
+    def add(self, request: _Request, request_id: str) -> None:
+        self._requests.append((request_id, request))
+
+    def execute(self, http=None) -> None:
+        for request_id, request in self._requests:
+            self._callback(request_id, request.execute(), None)
+
+
+class StubService:
+    """
+    Sustituto del servicio de googleapiclient para searchconsole v1: responde en
+    local con filas deterministas, sin credenciales ni red. Útil para probar los
+    transportes MCP y medir el servidor sin gastar cuota.
+    """
+
+    def __init__(self, rows: int = STUB_ROWS, latency: float = 0.05):
+        """
+        Args:
+            rows: Filas que tiene cada consulta antes de paginar
+            latency: Segundos que tarda cada llamada, para simular la red
+        """
+        self._search_analytics = _SearchAnalytics(rows, latency)
+        self._sites = _Sites(latency)
+
+    def searchanalytics(self) -> _SearchAnalytics:
+        return self._search_analytics
+
+    def sites(self) -> _Sites:
+        return self._sites
+
+    def new_batch_http_request(self, callback: Optional[Callable] = None) -> _Batch:
+        return _Batch(callback)
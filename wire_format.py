@@ -0,0 +1,91 @@
+# Formatos de respuesta de las herramientas MCP: JSON legible o minificado, por columnas, CSV o TSV
+
+import csv
+import io
+import json
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from compact_rows import SearchAnalyticsRows
+
+RESPONSE_FORMATS = ("json", "json-min", "columns", "csv", "tsv")
+
+# Separadores de JSON sin espacios
+_MIN_SEPARATORS = (",", ":")
+
+
+def _table(rows: Any) -> Tuple[List[str], Iterable[List[Any]]]:
+    """
+    Columnas y filas (listas de valores) de un resultado. Un SearchAnalyticsRows
+    se recorre por columnas, sin crear un dict por fila.
+    """
+    if isinstance(rows, SearchAnalyticsRows):
+        columns = [*rows.dimensions, "clicks", "impressions", "ctr", "position"]
+        values = [rows.columns[dim] for dim in rows.dimensions]
+        values += [rows.clicks, rows.impressions, rows.ctr, rows.position]
+        return columns, (list(row) for row in zip(*values))
+    rows = list(rows)
+    columns: Dict[str, None] = {}
+    for row in rows:
+        # Unión de las claves en el orden en que aparecen (las filas pueden omitir alguna)
+        columns.update(dict.fromkeys(row))
+    names = list(columns)
+    return names, ([row.get(name) for name in names] for row in rows)
+
+
+def _plain(result: Dict[str, Any], table_key: str) -> Dict[str, Any]:
+    rows = result.get(table_key)
+    if isinstance(rows, SearchAnalyticsRows):
+        return {**result, table_key: list(rows)}
+    return result
+
+
+def serialize(result: Any, fmt: str = "json", table_key: str = "rows") -> str:
+    """
+    Serializa la respuesta de una herramienta en el formato pedido.
+
+    Args:
+        result: Respuesta (dict con la tabla en `table_key` y otros campos, o un
+            SearchAnalyticsRows)
+        fmt: json (con sangría, el formato de siempre), json-min (sin espacios),
+            columns (la tabla como {"columns": [...], "data": [[...], ...]}), csv o tsv
+            (la tabla con cabecera; el resto de campos en una primera línea `# {json}`)
+        table_key: Campo con la lista de filas (rows en search_analytics, sites en list_sites)
+
+    Returns:
+        str: Texto de la respuesta
+    """
+    if fmt not in RESPONSE_FORMATS:
+        raise ValueError(f"Formato de respuesta inválido {fmt}. Debe ser uno de: {', '.join(RESPONSE_FORMATS)}")
+    if isinstance(result, SearchAnalyticsRows):
+        result = {table_key: result, "responseAggregationType": result.response_aggregation_type}
+    if fmt == "json":
+        return json.dumps(_plain(result, table_key), indent=2)
+    if fmt == "json-min":
+        return json.dumps(_plain(result, table_key), ensure_ascii=False, separators=_MIN_SEPARATORS)
+
+    metadata = {key: value for key, value in result.items() if key != table_key}
+    columns, data = _table(result.get(table_key) or [])
+    if fmt == "columns":
+        return json.dumps(
+            {**metadata, table_key: {"columns": columns, "data": list(data)}},
+            ensure_ascii=False,
+            separators=_MIN_SEPARATORS,
+        )
+
+    buffer = io.StringIO()
+    if metadata:
+        buffer.write("# " + json.dumps(metadata, ensure_ascii=False, separators=_MIN_SEPARATORS) + "\n")
+    writer = csv.writer(buffer, delimiter="\t" if fmt == "tsv" else ",", lineterminator="\n")
+    writer.writerow(columns)
+    writer.writerows(data)
+    return buffer.getvalue()
+
+
+def response_format(arguments: Optional[Dict[str, Any]], default: str = "json") -> str:
+    """
+    Formato pedido en los argumentos de una herramienta (responseFormat).
+    """
+    fmt = (arguments or {}).get("responseFormat") or default
+    if fmt not in RESPONSE_FORMATS:
+        raise ValueError(f"Formato de respuesta inválido {fmt}. Debe ser uno de: {', '.join(RESPONSE_FORMATS)}")
+    return fmt